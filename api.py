@@ -0,0 +1,381 @@
+# HTTP/JSON API (Streamlit 없이 다른 사이트/서버에서 직접 호출)
+# - 생성 / 편집 4종 / 업스케일을 엔드포인트로 제공, 내부는 화면과 같은 작업 큐 핸들러(tasks.py)를 그대로 사용
+# - 요청은 작업으로 등록하고 바로 작업 ID를 돌려줌 (202), ?wait=초 를 주면 그 시간까지 완료를 기다림
+# - 결과 이미지는 아티팩트 파일에서 그대로 스트리밍 (메모리에 전부 올리지 않음)
+# - 히스토리 검색 결과 / 배치 작업 결과는 ZIP으로 만들면서 바로 스트리밍 (exports.py)
+# - 작업 상태는 SQLite, 이미지는 아티팩트 저장소에 있으므로 데이터 폴더를 공유하면 여러 프로세스로 늘릴 수 있음
+# 실행: python api.py --host 0.0.0.0 --port 8600  (또는 uvicorn api:app --workers 4)
+import argparse
+import asyncio
+import math
+import os
+import threading
+import time
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import settings
+import auth
+import exports
+import generation
+import history
+import jobs
+import metrics
+import prompts
+import tasks
+from artifacts import get_artifact_store
+from backends import get_backend
+from result_cache import IMAGE_MIME_TYPES
+
+PROVIDERS = ("google", "replicate")
+# 업스케일 백엔드 → 사용할 수 있는 제공자 키
+UPSCALE_BACKENDS = {"local": PROVIDERS, "replicate": ("replicate",)}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+_verified_keys = None
+_job_queue = None
+_api_lock = threading.Lock()
+
+
+def get_verified_key_cache():
+    global _verified_keys
+    with _api_lock:
+        if _verified_keys is None:
+            _verified_keys = auth.VerifiedKeyCache()
+        return _verified_keys
+
+
+def get_job_queue():
+    global _job_queue
+    with _api_lock:
+        if _job_queue is None:
+            _job_queue = tasks.create_job_queue(get_backend().result_cache(), get_backend().history_store())
+        return _job_queue
+
+
+# X-Provider + Authorization: Bearer <API 키> (검증된 키는 캐시되어 매 요청마다 제공자를 호출하지 않음)
+async def _authenticate(request):
+    provider = request.headers.get("x-provider", "")
+    if provider not in PROVIDERS:
+        raise ApiError(400, f"X-Provider 헤더는 {', '.join(PROVIDERS)} 중 하나여야 합니다")
+    scheme, _, api_key = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not api_key:
+        raise ApiError(401, "Authorization: Bearer <API 키> 헤더가 필요합니다")
+    verified, reason = await run_in_threadpool(auth.verify_api_key, provider, api_key, get_verified_key_cache())
+    if not verified:
+        raise ApiError(401, reason)
+    return provider, api_key
+
+
+def _validate_options(values):
+    options = {}
+    for spec in prompts.OPTION_SCHEMA:
+        value = values.get(spec.key, spec.choices_for(options)[0])
+        if value not in spec.choices_for(options):
+            raise ApiError(400, f"{spec.key}: '{value}'은(는) 선택할 수 없는 값입니다")
+        options[spec.key] = value
+    unknown = set(values) - set(prompts.OPTION_KEYS)
+    if unknown:
+        raise ApiError(400, f"알 수 없는 옵션: {', '.join(sorted(unknown))}")
+    return options
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ApiError(400, "JSON 본문이 필요합니다")
+    if not isinstance(body, dict):
+        raise ApiError(400, "JSON 객체가 필요합니다")
+    return body
+
+
+async def _read_files(form, names):
+    files = []
+    for name in names:
+        upload = form.get(name)
+        if upload is None or not hasattr(upload, "read"):
+            files.append(None)
+            continue
+        data = await upload.read()
+        if len(data) > settings.API_MAX_UPLOAD_BYTES:
+            raise ApiError(413, f"{name}: 파일이 {settings.API_MAX_UPLOAD_BYTES // (1024 * 1024)}MB를 넘습니다")
+        files.append(data)
+    return files
+
+
+def _job_json(request, job):
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "message": job["message"],
+        "error": job["error"],
+        "outputs": [
+            str(request.url_for("job_output", job_id=job["id"], index=idx)) for idx in range(len(job["result_files"]))
+        ],
+        "result": job["result"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+def _get_owned_job(job_id, api_key):
+    job = get_job_queue().get(job_id)
+    # 다른 키의 작업은 존재 여부도 알려주지 않음
+    if job is None or job["owner"] != jobs.owner_id(api_key):
+        raise ApiError(404, "작업을 찾을 수 없습니다")
+    return job
+
+
+# 작업 완료를 비동기로 기다림 (이벤트 루프를 막지 않음)
+async def _wait_for_job(job_id, api_key, timeout):
+    deadline = time.monotonic() + min(timeout, settings.API_MAX_WAIT_SECONDS)
+    while True:
+        job = await run_in_threadpool(_get_owned_job, job_id, api_key)
+        if job["status"] not in jobs.ACTIVE_STATUSES or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(settings.API_POLL_SECONDS)
+
+
+# ?wait=초 (없으면 0)
+def _wait_param(request):
+    try:
+        wait = float(request.query_params.get("wait", 0))
+    except ValueError:
+        raise ApiError(400, "wait는 초 단위 숫자여야 합니다")
+    if not math.isfinite(wait) or wait < 0:
+        raise ApiError(400, "wait는 0 이상의 초 단위 숫자여야 합니다")
+    return wait
+
+
+# 작업 등록 후 응답: 기다리지 않으면 202 + 상태 URL, 기다렸는데 끝났으면 200 (?format=image면 첫 이미지 자체)
+# 요청 값은 모두 검증한 뒤에 등록 (등록된 생성 작업은 비용이 나가므로 잘못된 요청으로 등록되지 않게)
+async def _submit(request, api_key, kind, params, inputs=()):
+    wait = _wait_param(request)
+    response_format = request.query_params.get("format", "json")
+    if response_format not in ("json", "image"):
+        raise ApiError(400, "format은 json 또는 image여야 합니다")
+
+    owner = jobs.owner_id(api_key)
+    job_id = await run_in_threadpool(get_job_queue().submit, owner, kind, params, api_key, list(inputs))
+    job = await _wait_for_job(job_id, api_key, wait) if wait > 0 else await run_in_threadpool(_get_owned_job, job_id, api_key)
+    if job["status"] == jobs.JOB_DONE and response_format == "image" and job["result_files"]:
+        return _artifact_response(job["result_files"][0], job_id)
+    status = 202 if job["status"] in jobs.ACTIVE_STATUSES else 200
+    headers = {"Location": str(request.url_for("job_status", job_id=job_id))}
+    return JSONResponse(_job_json(request, job), status_code=status, headers=headers)
+
+
+def _artifact_response(artifact_id, job_id):
+    ext = artifact_id.rsplit(".", 1)[-1]
+    # 아티팩트 ID는 내용 해시라서 바뀌지 않음
+    return FileResponse(
+        get_artifact_store().path(artifact_id),
+        media_type=IMAGE_MIME_TYPES.get(ext, "application/octet-stream"),
+        headers={"Cache-Control": "private, max-age=31536000, immutable", "X-Job-Id": job_id},
+    )
+
+
+async def generate(request):
+    provider, api_key = await _authenticate(request)
+    body = await _read_json(request)
+    num_outputs = body.get("num_outputs", 1)
+    # bool은 int의 하위 클래스라서 따로 거름 (true가 1장으로 받아들여지지 않게)
+    if isinstance(num_outputs, bool) or not isinstance(num_outputs, int) or not 1 <= num_outputs <= settings.API_MAX_OUTPUTS:
+        raise ApiError(400, f"num_outputs는 1~{settings.API_MAX_OUTPUTS} 사이의 정수여야 합니다")
+    options = body.get("options") or {}
+    if not isinstance(options, dict):
+        raise ApiError(400, "options는 JSON 객체여야 합니다")
+    force = body.get("force", False)
+    if not isinstance(force, bool):
+        raise ApiError(400, "force는 true 또는 false여야 합니다")
+    params = {
+        "provider": provider,
+        "options": _validate_options(options),
+        "num_outputs": num_outputs,
+        "force": force,
+    }
+    if provider == "replicate":
+        resolution = body.get("resolution", generation.RESOLUTIONS[0])
+        if resolution not in generation.RESOLUTIONS:
+            raise ApiError(400, f"resolution은 {', '.join(generation.RESOLUTIONS)} 중 하나여야 합니다")
+        params["resolution"] = resolution
+    return await _submit(request, api_key, "generate", params)
+
+
+# multipart: main (필수), sample1 (필수), sample2, sample3
+async def edit(request):
+    provider, api_key = await _authenticate(request)
+    mode = request.path_params["mode"]
+    if mode not in prompts.EDIT_PROMPTS:
+        raise ApiError(404, f"알 수 없는 편집 유형: {mode}")
+    main, sample1, sample2, sample3 = await _read_files(await request.form(), ["main", "sample1", "sample2", "sample3"])
+    if main is None or sample1 is None:
+        raise ApiError(400, "main과 sample1 파일은 필수입니다")
+    inputs = [data for data in (main, sample1, sample2, sample3) if data is not None]
+    return await _submit(request, api_key, "edit", {"provider": provider, "mode": mode}, inputs)
+
+
+# multipart: image (필수), scale_factor (2x/4x), backend (local/replicate)
+async def upscale(request):
+    provider, api_key = await _authenticate(request)
+    form = await request.form()
+    scale_factor = form.get("scale_factor", "4x")
+    backend = form.get("backend", "local")
+    if scale_factor not in ("2x", "4x"):
+        raise ApiError(400, "scale_factor는 2x 또는 4x여야 합니다")
+    if backend not in UPSCALE_BACKENDS:
+        raise ApiError(400, f"backend는 {', '.join(UPSCALE_BACKENDS)} 중 하나여야 합니다")
+    if provider not in UPSCALE_BACKENDS[backend]:
+        raise ApiError(400, "Seedream 업스케일은 Replicate 키에서만 사용할 수 있습니다")
+    (image,) = await _read_files(form, ["image"])
+    if image is None:
+        raise ApiError(400, "image 파일은 필수입니다")
+    params = {"provider": provider, "scale_factor": scale_factor, "backend": backend}
+    return await _submit(request, api_key, "upscale", params, [image])
+
+
+async def job_status(request):
+    _, api_key = await _authenticate(request)
+    job_id = request.path_params["job_id"]
+    wait = _wait_param(request)
+    job = await _wait_for_job(job_id, api_key, wait) if wait > 0 else await run_in_threadpool(_get_owned_job, job_id, api_key)
+    return JSONResponse(_job_json(request, job), status_code=202 if job["status"] in jobs.ACTIVE_STATUSES else 200)
+
+
+async def job_output(request):
+    _, api_key = await _authenticate(request)
+    job_id = request.path_params["job_id"]
+    index = request.path_params["index"]
+    job = await run_in_threadpool(_get_owned_job, job_id, api_key)
+    # 진행 중인 작업도 먼저 끝난 이미지는 받을 수 있음
+    if index >= len(job["result_files"]):
+        raise ApiError(404, "아직 없는 결과입니다")
+    return _artifact_response(job["result_files"][index], job_id)
+
+
+def _zip_response(chunks, file_name):
+    # 제너레이터는 스레드 풀에서 돌면서 만들어지는 대로 전송 (전체 크기를 모르므로 Content-Length 없음)
+    return StreamingResponse(
+        chunks, media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
+# ?q=검색어 (예: "30대 여성 웨이브") + 컬럼별 조건 (?gender=여성&hair_color=애쉬 브라운&kind=generate, 같은 키 반복 가능)
+async def export_history(request):
+    _, api_key = await _authenticate(request)
+    filters = history.parse_query(request.query_params.get("q", ""))
+    for column in (*history.OPTION_COLUMNS, "kind", "provider", "mode"):
+        values = request.query_params.getlist(column)
+        if values:
+            filters[column] = sorted(set(filters.get(column, [])) | set(values))
+    chunks = exports.export_history(get_backend().history_store(), get_artifact_store(), jobs.owner_id(api_key), filters)
+    return _zip_response(chunks, f"history_{time.strftime('%Y%m%d_%H%M%S')}.zip")
+
+
+async def export_job(request):
+    _, api_key = await _authenticate(request)
+    job = await run_in_threadpool(_get_owned_job, request.path_params["job_id"], api_key)
+    if job["kind"] != "batch":
+        raise ApiError(400, "배치 작업만 ZIP으로 내보낼 수 있습니다 (다른 작업은 /v1/history/export 사용)")
+    if job["status"] != jobs.JOB_DONE:
+        raise ApiError(409, "아직 끝나지 않은 작업입니다")
+    if not os.path.exists(job["result"]["manifest_path"]):
+        raise ApiError(404, "배치 결과 폴더를 찾을 수 없습니다")
+    return _zip_response(exports.export_batch(job["result"]["output_dir"]), f"batch_{job['id'][:8]}.zip")
+
+
+async def options(request):
+    return JSONResponse({
+        "sections": prompts.SECTIONS,
+        "options": [
+            {
+                "key": spec.key,
+                "section": spec.section,
+                "label": spec.label,
+                "choices": spec.choices,
+                "depends_on": spec.depends_on,
+            }
+            for spec in prompts.OPTION_SCHEMA
+        ],
+        "edit_modes": list(prompts.EDIT_PROMPTS),
+        "resolutions": generation.RESOLUTIONS,
+    })
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok", "worker": jobs.WORKER_ID})
+
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(metrics.get_metrics().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def api_error(request, exc):
+    return JSONResponse({"error": exc.message}, status_code=exc.status)
+
+
+# 검증에서 나온 ApiError 외의 예외는 서버 쪽 문제 (내용은 서버 로그에만 남김)
+async def internal_error(request, exc):
+    return JSONResponse({"error": "서버 내부 오류가 발생했습니다"}, status_code=500)
+
+
+def create_app():
+    middleware = []
+    if settings.API_CORS_ORIGINS:
+        middleware.append(Middleware(
+            CORSMiddleware,
+            allow_origins=settings.API_CORS_ORIGINS,
+            allow_methods=["GET", "POST"],
+            allow_headers=["Authorization", "X-Provider", "Content-Type"],
+            expose_headers=["Location", "X-Job-Id"],
+        ))
+    return Starlette(
+        routes=[
+            Route("/v1/generate", generate, methods=["POST"]),
+            Route("/v1/edit/{mode}", edit, methods=["POST"]),
+            Route("/v1/upscale", upscale, methods=["POST"]),
+            Route("/v1/jobs/{job_id}", job_status, methods=["GET"], name="job_status"),
+            Route("/v1/jobs/{job_id}/outputs/{index:int}", job_output, methods=["GET"], name="job_output"),
+            Route("/v1/jobs/{job_id}/export", export_job, methods=["GET"]),
+            Route("/v1/history/export", export_history, methods=["GET"]),
+            Route("/v1/options", options, methods=["GET"]),
+            Route("/healthz", healthz, methods=["GET"]),
+            Route("/metrics", prometheus_metrics, methods=["GET"]),
+        ],
+        middleware=middleware,
+        exception_handlers={ApiError: api_error, Exception: internal_error},
+    )
+
+
+app = create_app()
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="헤어스타일 생성기 HTTP API 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--workers", type=int, default=1, help="프로세스 수 (데이터 폴더를 공유)")
+    args = parser.parse_args(argv)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
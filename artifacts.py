@@ -0,0 +1,84 @@
+# 로컬 아티팩트 저장소 (내용 해시 기반)
+# - 결과/입력 이미지를 한 번만 저장하고 이후 화면 표시와 다운로드는 여기서 제공
+# - Replicate 결과 URL은 만료되므로 받자마자 청크 단위로 내려받아 보관
+import hashlib
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from result_cache import guess_image_ext
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactStore:
+    def __init__(self, root=settings.ARTIFACT_DIR):
+        self.root = root
+        os.makedirs(os.path.join(self.root, ".tmp"), exist_ok=True)
+
+    # 아티팩트 ID = "<sha256>.<확장자>"
+    def path(self, artifact_id):
+        return os.path.join(self.root, artifact_id[:2], artifact_id)
+
+    def exists(self, artifact_id):
+        return os.path.exists(self.path(artifact_id))
+
+    def read(self, artifact_id):
+        with open(self.path(artifact_id), "rb") as f:
+            return f.read()
+
+    def put(self, data):
+        return self.put_chunks([data])
+
+    # 청크를 임시 파일에 쓰면서 해시를 계산한 뒤 최종 위치로 이동 (같은 내용은 한 번만 저장)
+    def put_chunks(self, chunks):
+        digest = hashlib.sha256()
+        head = b""
+        tmp_path = os.path.join(self.root, ".tmp", uuid.uuid4().hex)
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            artifact_id = f"{digest.hexdigest()}.{guess_image_ext(head)}"
+            final_path = self.path(artifact_id)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+            return artifact_id
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def mirror_url(self, url, http_client):
+        with http_client.stream("GET", str(url)) as response:
+            response.raise_for_status()
+            return self.put_chunks(response.iter_bytes(CHUNK_SIZE))
+
+    # 여러 결과 URL을 동시에 내려받음 (입력 순서대로 아티팩트 ID 반환)
+    def mirror_urls(self, urls, http_client, max_workers=4):
+        urls = list(urls)
+        if len(urls) <= 1:
+            return [self.mirror_url(url, http_client) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            return list(executor.map(lambda url: self.mirror_url(url, http_client), urls))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore()
+        return _default_store
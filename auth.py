@@ -0,0 +1,118 @@
+# API 키 검증
+# - 제공자별로 가장 가벼운 인증 호출만 사용 (Gemini: 모델 정보 조회, Replicate: 계정 조회)
+# - 검증에 성공한 키는 솔트 해시로만 기록해두고 TTL 동안은 다시 호출하지 않음
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+import httpx
+
+import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified_keys (
+    key_hash TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+def _load_salt(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        salt = secrets.token_bytes(32)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 동시에 처음 만들어지는 경우 먼저 만든 쪽을 사용
+        try:
+            with open(path, "xb") as f:
+                f.write(salt)
+        except FileExistsError:
+            with open(path, "rb") as f:
+                return f.read()
+        return salt
+
+
+class VerifiedKeyCache:
+    def __init__(self, db_path=settings.AUTH_DB_PATH, salt_path=settings.AUTH_SALT_PATH, ttl=settings.AUTH_CACHE_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._salt = _load_salt(salt_path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _hash(self, provider, api_key):
+        return hmac.new(self._salt, f"{provider}:{api_key}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def is_verified(self, provider, api_key):
+        row = self._connect().execute(
+            "SELECT expires_at FROM verified_keys WHERE key_hash = ?", (self._hash(provider, api_key),)
+        ).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def mark_verified(self, provider, api_key):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO verified_keys (key_hash, expires_at) VALUES (?, ?)",
+                (self._hash(provider, api_key), time.time() + self.ttl)
+            )
+            conn.execute("DELETE FROM verified_keys WHERE expires_at <= ?", (time.time(),))
+
+
+# 제공자 SDK는 로그인한 제공자 것만 import
+def _check_google(api_key, timeout):
+    from google.ai import generativelanguage as glm
+    from google.api_core import exceptions as google_exceptions
+
+    client = glm.ModelServiceClient(client_options={"api_key": api_key})
+    try:
+        client.get_model(name=f"models/{settings.GOOGLE_IMAGE_MODEL}", retry=None, timeout=timeout)
+    except (google_exceptions.Unauthenticated, google_exceptions.PermissionDenied, google_exceptions.InvalidArgument):
+        return False, "유효하지 않은 API 키입니다"
+    except google_exceptions.DeadlineExceeded:
+        return False, "API 키 검증 시간이 초과되었습니다. 잠시 후 다시 시도해주세요"
+    return True, None
+
+
+def _check_replicate(api_key, timeout):
+    import replicate
+
+    client = replicate.Client(api_token=api_key, timeout=httpx.Timeout(timeout))
+    try:
+        client.accounts.current()
+    except replicate.exceptions.ReplicateError as e:
+        if e.status in (401, 403):
+            return False, "유효하지 않은 API 토큰입니다"
+        raise
+    except httpx.TimeoutException:
+        return False, "API 토큰 검증 시간이 초과되었습니다. 잠시 후 다시 시도해주세요"
+    return True, None
+
+
+# (성공 여부, 실패 사유) 반환
+def verify_api_key(provider, api_key, cache=None, timeout=settings.AUTH_TIMEOUT_SECONDS):
+    if cache is not None and cache.is_verified(provider, api_key):
+        return True, None
+
+    check = _check_google if provider == "google" else _check_replicate
+    try:
+        ok, reason = check(api_key, timeout)
+    except Exception as e:
+        return False, f"API 키 검증 중 오류가 발생했습니다: {e}"
+
+    if ok and cache is not None:
+        cache.mark_verified(provider, api_key)
+    return ok, reason
@@ -0,0 +1,133 @@
+# 공유 상태 백엔드: 결과 캐시 / 작업 테이블 / 히스토리 / 속도 제한 카운터를 한 곳에서 만듦
+# - 여러 레플리카(Streamlit, api.py, 배치 CLI)가 같은 백엔드를 가리키면 캐시 적중/작업/히스토리/할당량을 함께 씀
+# - HAIRSTYLE_STATE_BACKEND로 선택
+#   local (기본값): DATA_DIR의 파일시스템 + SQLite, 같은 호스트의 여러 프로세스가 공유
+#   memory: 백엔드 인스턴스 안에서만 공유 (테스트/벤치마크에서 네트워크 저장소 자리에 쓰는 대체 구현)
+#           결과 캐시/속도 제한은 메모리, 작업/히스토리는 인스턴스 전용 임시 폴더의 SQLite (프로세스가 끝나면 삭제)
+# - 네트워크 저장소는 StateBackend를 상속해 create_* 네 개를 구현하고 register_backend로 등록
+#   각 저장소는 아래 메서드만 제공하면 됨
+#   결과 캐시: get(key) → 이미지 bytes 목록 또는 None, put(key, images, meta)
+#   작업 테이블: jobs.JobStore와 같은 create / update / get / list_for_owner / fail_interrupted
+#   히스토리: history.HistoryStore와 같은 record / count / search / iter_search
+#   속도 제한: bucket(키, 분당 요청 수, burst) → acquire(deadline) / throttle(retry_after) / recover()를 가진 버킷
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+
+import settings
+
+
+class StateBackend:
+    def __init__(self):
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    # 저장소는 백엔드마다 하나씩 만들어 공유
+    def _shared(self, name, factory):
+        with self._lock:
+            store = self._stores.get(name)
+            if store is None:
+                store = self._stores[name] = factory()
+            return store
+
+    def result_cache(self):
+        return self._shared("result_cache", self.create_result_cache)
+
+    def job_store(self):
+        return self._shared("job_store", self.create_job_store)
+
+    def history_store(self):
+        return self._shared("history_store", self.create_history_store)
+
+    def bucket_store(self):
+        return self._shared("bucket_store", self.create_bucket_store)
+
+    def create_result_cache(self):
+        raise NotImplementedError
+
+    def create_job_store(self):
+        raise NotImplementedError
+
+    def create_history_store(self):
+        raise NotImplementedError
+
+    def create_bucket_store(self):
+        raise NotImplementedError
+
+
+class LocalBackend(StateBackend):
+    def __init__(self, data_dir=settings.DATA_DIR):
+        super().__init__()
+        self.data_dir = data_dir
+
+    def create_result_cache(self):
+        from result_cache import ResultCache
+        return ResultCache(os.path.join(self.data_dir, "results"))
+
+    def create_job_store(self):
+        from jobs import JobStore
+        return JobStore(os.path.join(self.data_dir, "jobs.db"))
+
+    def create_history_store(self):
+        from history import HistoryStore
+        return HistoryStore(os.path.join(self.data_dir, "history.db"))
+
+    def create_bucket_store(self):
+        from ratelimit import SQLiteBucketStore
+        return SQLiteBucketStore(os.path.join(self.data_dir, "ratelimit.db"))
+
+
+class MemoryBackend(StateBackend):
+    def __init__(self):
+        super().__init__()
+        # 공유 캐시 모드의 메모리 SQLite는 동시 쓰기에서 바로 "table is locked"로 실패하므로
+        # 보통 파일 DB(WAL, busy timeout)를 임시 폴더에 두고 백엔드가 사라지면 지움
+        self.data_dir = tempfile.mkdtemp(prefix="hairstyle-memory-")
+        weakref.finalize(self, shutil.rmtree, self.data_dir, ignore_errors=True)
+
+    def create_result_cache(self):
+        from result_cache import MemoryResultCache
+        return MemoryResultCache()
+
+    def create_job_store(self):
+        from jobs import JobStore
+        return JobStore(os.path.join(self.data_dir, "jobs.db"))
+
+    def create_history_store(self):
+        from history import HistoryStore
+        return HistoryStore(os.path.join(self.data_dir, "history.db"))
+
+    def create_bucket_store(self):
+        from ratelimit import MemoryBucketStore
+        return MemoryBucketStore()
+
+
+BACKENDS = {
+    "local": LocalBackend,
+    "memory": MemoryBackend,
+}
+
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
+
+
+def create_backend(name=None):
+    name = name or settings.STATE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"알 수 없는 상태 백엔드: {name} (사용 가능: {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = create_backend()
+        return _default_backend
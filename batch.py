@@ -0,0 +1,154 @@
+# 배치 생성: 옵션 조합(카테시안 곱)을 동시 작업 풀로 생성하고 manifest와 함께 폴더에 저장
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import settings
+import generation
+from backends import get_backend
+from prompts import OPTION_KEYS, OPTION_SCHEMA, OPTIONS, build_generation_prompt, option_key
+from result_cache import guess_image_ext
+
+# 제공자별 최대 동시 요청 수 (프로세스 전체 공유)
+PROVIDER_CONCURRENCY = {"google": settings.BATCH_GOOGLE_CONCURRENCY, "replicate": settings.BATCH_REPLICATE_CONCURRENCY}
+_provider_slots = {provider: threading.BoundedSemaphore(limit) for provider, limit in PROVIDER_CONCURRENCY.items()}
+
+MANIFEST_FILE = "manifest.json"
+
+# 조합 순서는 옵션 스키마 순서 (hair_length는 성별에 맞는 항목만 사용)
+OPTION_CHOICES = {spec.key: spec.all_choices() for spec in OPTION_SCHEMA}
+
+
+def expand_combinations(selections):
+    combinations = []
+    other_keys = [key for key in OPTION_KEYS if key not in ("gender", "hair_length")]
+    for gender in selections.get("gender", []):
+        lengths = [length for length in selections.get("hair_length", []) if length in OPTIONS["hair_length"].choices_for({"gender": gender})]
+        for length in lengths:
+            for values in itertools.product(*(selections.get(key, []) for key in other_keys)):
+                options = dict(zip(other_keys, values))
+                options["gender"] = gender
+                options["hair_length"] = length
+                combinations.append({key: options[key] for key in OPTION_KEYS})
+    return combinations
+
+
+def _generate_one(index, options, provider, api_key, output_dir, num_outputs, resolution, cache, force):
+    prompt = build_generation_prompt(options)
+    cache_key = generation.generation_cache_key(provider, prompt, generation.generation_params(provider, num_outputs, resolution))
+    entry = {"index": index, "options": options, "option_key": option_key(options), "cache_key": cache_key, "files": []}
+    started = time.time()
+    try:
+        with _provider_slots[provider]:
+            images, from_cache = generation.generate_images(
+                provider, api_key, prompt,
+                num_outputs=num_outputs, resolution=resolution, cache=cache, force=force
+            )
+        for image_idx, image_data in enumerate(images):
+            name = f"{index:05d}_{cache_key[:12]}_{image_idx + 1}.{guess_image_ext(image_data)}"
+            with open(os.path.join(output_dir, name), "wb") as f:
+                f.write(image_data)
+            entry["files"].append(name)
+        entry["status"] = "ok"
+        entry["from_cache"] = from_cache
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = str(e)
+    entry["elapsed_seconds"] = round(time.time() - started, 3)
+    return entry
+
+
+# progress_callback(완료 수, 전체 수, 항목)은 호출한 스레드에서 실행됨 (Streamlit 페이지에서 안전하게 사용 가능)
+def run_batch(provider, api_key, combinations, output_dir, num_outputs=1, resolution=generation.RESOLUTIONS[0],
+              concurrency=None, cache=None, force=False, progress_callback=None):
+    os.makedirs(output_dir, exist_ok=True)
+    concurrency = min(concurrency or PROVIDER_CONCURRENCY[provider], PROVIDER_CONCURRENCY[provider])
+    started = time.time()
+
+    items = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(_generate_one, index, options, provider, api_key, output_dir, num_outputs, resolution, cache, force)
+            for index, options in enumerate(combinations)
+        ]
+        for future in as_completed(futures):
+            entry = future.result()
+            items.append(entry)
+            if progress_callback:
+                progress_callback(len(items), len(futures), entry)
+
+    items.sort(key=lambda entry: entry["index"])
+    manifest = {
+        "provider": provider,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "num_outputs": num_outputs,
+        "resolution": resolution if provider == "replicate" else None,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(time.time() - started, 3),
+        "items": items,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def _parse_choices(key, value):
+    if value == "all":
+        return list(OPTION_CHOICES[key])
+    choices = [item.strip() for item in value.split(",") if item.strip()]
+    for choice in choices:
+        if choice not in OPTION_CHOICES[key]:
+            raise ValueError(f"{key}: 알 수 없는 값 '{choice}' (가능한 값: {', '.join(OPTION_CHOICES[key])})")
+    return choices
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="hairstyle_generator_v2.py batch",
+        description="옵션 조합 전체를 동시에 생성합니다. 각 옵션은 쉼표로 구분하거나 'all'을 지정하세요."
+    )
+    parser.add_argument("--provider", choices=sorted(PROVIDER_CONCURRENCY), required=True)
+    parser.add_argument("--api-key", help="미지정 시 GOOGLE_API_KEY / REPLICATE_API_TOKEN 환경변수 사용")
+    parser.add_argument("--output-dir", help="결과 저장 폴더 (기본: 데이터 폴더/batches/시각)")
+    parser.add_argument("--concurrency", type=int, help="동시 요청 수 (제공자 한도 이내)")
+    parser.add_argument("--num-images", type=int, default=1, help="조합당 이미지 수")
+    parser.add_argument("--resolution", choices=generation.RESOLUTIONS, default=generation.RESOLUTIONS[0])
+    parser.add_argument("--force", action="store_true", help="캐시를 무시하고 새로 생성")
+    for key in OPTION_KEYS:
+        default = "all" if key == "hair_length" else OPTION_CHOICES[key][0]
+        parser.add_argument(f"--{key.replace('_', '-')}", default=default)
+    args = parser.parse_args(argv)
+
+    api_key = args.api_key or os.environ.get("GOOGLE_API_KEY" if args.provider == "google" else "REPLICATE_API_TOKEN")
+    if not api_key:
+        parser.error("API 키가 필요합니다 (--api-key 또는 환경변수)")
+
+    try:
+        selections = {key: _parse_choices(key, getattr(args, key)) for key in OPTION_KEYS}
+    except ValueError as e:
+        parser.error(str(e))
+
+    combinations = expand_combinations(selections)
+    if not combinations:
+        parser.error("생성할 조합이 없습니다")
+
+    output_dir = args.output_dir or os.path.join(settings.BATCH_OUTPUT_DIR, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    print(f"{len(combinations)}개 조합 생성 시작 → {output_dir}")
+
+    def on_progress(done, total, entry):
+        status = "캐시" if entry.get("from_cache") else entry["status"]
+        print(f"[{done}/{total}] #{entry['index']} {status} ({entry['elapsed_seconds']:.1f}s)")
+
+    manifest = run_batch(
+        args.provider, api_key, combinations, output_dir,
+        num_outputs=args.num_images, resolution=args.resolution, concurrency=args.concurrency,
+        cache=get_backend().result_cache(), force=args.force, progress_callback=on_progress
+    )
+    failed = sum(1 for entry in manifest["items"] if entry["status"] != "ok")
+    print(f"완료: {len(combinations) - failed}개 성공, {failed}개 실패, {manifest['elapsed_seconds']:.1f}초")
+    return 1 if failed else 0
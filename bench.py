@@ -0,0 +1,490 @@
+# 오프라인 벤치마크 / 부하 테스트 (네트워크 호출, API 비용 없음)
+# - Gemini / Replicate 클라이언트 대신 지연 시간, 오류율, 이미지 크기를 설정할 수 있는 가짜 백엔드를 클라이언트 풀에 끼움
+#   (속도 제한, 재시도, 캐시, 작업 큐, 아티팩트 저장, 미리보기 등 나머지 경로는 모두 실제 코드 그대로)
+# - Streamlit AppTest로 실제 페이지(생성/편집/업스케일)를 세션 N개에서 동시에 실행
+# - 처리량, 지연 시간 백분위, 최대 RSS, 주고받은 데이터 크기, 단계별 계측 결과를 출력
+# 사용법: python bench.py --scenario google_generate --sessions 8 --iterations 3 --latency 0.5
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import warnings
+from types import SimpleNamespace
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hairstyle_generator_v2.py")
+
+# 시나리오 → (로그인 제공자, 페이지 모드)
+SCENARIOS = {
+    "google_generate": ("google", "generation"),
+    "replicate_generate": ("replicate", "generation"),
+    "replicate_upscale": ("replicate", "upscale"),
+    "google_edit": ("google", "outfit"),
+    "replicate_edit": ("replicate", "outfit"),
+}
+
+FAKE_HOST = "fake.replicate.delivery"
+
+# AppTest는 스크립트를 실행할 때마다 프로세스 전역 런타임을 만들고 지우므로 세션끼리 동시에 실행할 수 없음
+# → 화면 갱신(스크립트 실행)은 한 번에 하나씩, 작업 큐/제공자 호출/다운로드는 실제처럼 동시에 진행
+_app_test_lock = threading.Lock()
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+# 이 프로세스 + 작업 프로세스(로컬 업스케일 풀)의 RSS 합계 최댓값을 주기적으로 측정 (Linux /proc 기준)
+class _RssSampler(threading.Thread):
+    def __init__(self, interval=0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        import multiprocessing
+
+        while not self._stop_event.is_set():
+            total = _rss_bytes(os.getpid()) + sum(_rss_bytes(child.pid) for child in multiprocessing.active_children())
+            self.peak = max(self.peak, total)
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _noise_png(side, seed):
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    # 실제 사진처럼 잘 압축되지 않도록 그라데이션 + 노이즈
+    gradient = np.linspace(0, 200, side, dtype=np.float32)
+    array = gradient[None, :, None] + rng.normal(0, 24, (side, side, 3)).astype(np.float32)
+    buffered = io.BytesIO()
+    Image.fromarray(np.clip(array, 0, 255).astype(np.uint8)).save(buffered, format="PNG", compress_level=1)
+    return buffered.getvalue()
+
+
+# 가짜 제공자: 같은 시드면 같은 순서의 지연 시간/오류가 나옴 (스레드 간 호출 순서는 스케줄링에 따름)
+class FakeBackend:
+    def __init__(self, latency=0.5, jitter=0.2, error_rate=0.0, image_side=1024, seed=0, distinct_images=8):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.images = [_noise_png(image_side, seed * 1000 + idx) for idx in range(distinct_images)]
+        self.calls = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # (지연 시간, 실패 여부, 돌려줄 이미지 번호)
+    def draw(self, request_bytes=0):
+        with self._lock:
+            self.calls += 1
+            self.bytes_in += request_bytes
+            delay = max(0.0, self.latency * (1 + self.jitter * self._rng.uniform(-1, 1)))
+            failed = self._rng.random() < self.error_rate
+            self.errors += int(failed)
+            return delay, failed, self._rng.randrange(len(self.images))
+
+    def count_out(self, nbytes):
+        with self._lock:
+            self.bytes_out += nbytes
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+
+def _request_bytes(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_request_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_request_bytes(item) for item in value)
+    return 0
+
+
+# genai.GenerativeModel.generate_content 대역
+class FakeGeminiModel:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def generate_content(self, contents, request_options=None):
+        from google.api_core import exceptions as google_exceptions
+
+        delay, failed, image_idx = self.backend.draw(_request_bytes(contents))
+        time.sleep(delay)
+        if failed:
+            raise google_exceptions.ServiceUnavailable("fake backend: injected error")
+        image_data = self.backend.images[image_idx]
+        self.backend.count_out(len(image_data))
+        part = SimpleNamespace(inline_data=SimpleNamespace(data=image_data))
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class FakePrediction:
+    def __init__(self, backend, model_input):
+        delay, failed, image_idx = backend.draw(_request_bytes(model_input))
+        self.id = uuid.uuid4().hex
+        self.status = "starting"
+        self.output = None
+        self.error = None
+        self._ready_at = time.monotonic() + delay
+        self._failed = failed
+        self._outputs = [
+            f"https://{FAKE_HOST}/{self.id}/{(image_idx + idx) % len(backend.images)}.png"
+            for idx in range(int(model_input.get("num_outputs", 1)))
+        ]
+
+    def reload(self):
+        if self.status in ("succeeded", "failed", "canceled") or time.monotonic() < self._ready_at:
+            return
+        if self._failed:
+            self.status = "failed"
+            self.error = "fake backend: injected error"
+        else:
+            self.status = "succeeded"
+            self.output = self._outputs
+
+    def cancel(self):
+        self.status = "canceled"
+
+
+# replicate.Client 중 앱이 쓰는 부분만 (predictions.create / files.create)
+class FakeReplicateClient:
+    def __init__(self, backend):
+        self.models = SimpleNamespace(predictions=SimpleNamespace(create=self._create_prediction))
+        self.files = SimpleNamespace(create=self._create_file)
+        self.backend = backend
+
+    def _create_prediction(self, model, input):
+        prediction = FakePrediction(self.backend, input)
+        prediction.reload()
+        return prediction
+
+    def _create_file(self, file, filename=None, content_type=None):
+        data = file.read()
+        with self.backend._lock:
+            self.backend.bytes_in += len(data)
+        return SimpleNamespace(urls={"get": f"https://{FAKE_HOST}/uploads/{uuid.uuid4().hex}"})
+
+
+def _fake_download_client(backend):
+    import httpx
+
+    def handler(request):
+        image_data = backend.images[int(request.url.path.rsplit("/", 1)[-1].split(".")[0])]
+        backend.count_out(len(image_data))
+        return httpx.Response(200, content=image_data, headers={"content-type": "image/png"})
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+# 프로세스 기본 클라이언트 풀을 가짜 백엔드로 교체
+def install_fake_backends(backend):
+    import providers
+
+    class FakeClientPool(providers.ClientPool):
+        def gemini_model(self, api_key, model_name=None):
+            return self._get_or_create(("gemini-model", providers._key_hash(api_key)), lambda: FakeGeminiModel(backend))
+
+        def replicate_client(self, api_key):
+            return self._get_or_create(("replicate", providers._key_hash(api_key)), lambda: FakeReplicateClient(backend))
+
+        def download_client(self):
+            return self._get_or_create(("download",), lambda: _fake_download_client(backend))
+
+    with providers._default_pool_lock:
+        providers._default_pool = FakeClientPool()
+
+
+def _button(at, label_prefix):
+    for button in at.button:
+        if button.label.startswith(label_prefix):
+            return button
+    raise LookupError(f"버튼을 찾을 수 없습니다: {label_prefix}")
+
+
+# 생성 옵션을 세션마다 무작위로 골라서 캐시/동일 요청 합치기에 걸리지 않게 함
+def _pick_options(at, rng):
+    import prompts
+
+    gender_label = prompts.OPTIONS["gender"].label
+    for selectbox in at.selectbox:
+        if selectbox.label == gender_label:
+            selectbox.set_value(rng.choice(selectbox.options))
+    _run(at)
+    for selectbox in at.selectbox:
+        if selectbox.label != gender_label:
+            selectbox.set_value(rng.choice(selectbox.options))
+
+
+def _run(at):
+    with _app_test_lock:
+        at.run()
+
+
+def _finished(at):
+    return bool(at.success) or bool(at.error) or bool(at.exception)
+
+
+class _Session:
+    def __init__(self, index, args, input_image):
+        from streamlit.testing.v1 import AppTest
+
+        self.provider, self.mode = SCENARIOS[args.scenario]
+        self.args = args
+        self.rng = random.Random(args.seed * 7919 + index)
+        self.input_image = input_image
+        self.at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        self.at.session_state["logged_in"] = True
+        self.at.session_state["api_key"] = f"bench-key-{index % args.api_keys}"
+        self.at.session_state["api_provider"] = self.provider
+        self.at.session_state["selected_mode"] = self.mode
+        # 결과 대기 중 자동 새로고침(대기 후 재실행)은 끄고 이 세션이 직접 poll 간격으로 다시 실행
+        self.at.session_state["job_auto_refresh"] = False
+        _run(self.at)
+
+    def _submit(self):
+        at = self.at
+        if self.mode == "generation":
+            _pick_options(at, self.rng)
+            at.slider[0].set_value(self.args.num_images)
+            for checkbox in at.checkbox:
+                if checkbox.label.startswith("🔄 강제 재생성"):
+                    checkbox.set_value(not self.args.allow_cache)
+            _button(at, "🎨 이미지 생성하기").click()
+        elif self.mode == "upscale":
+            # 올린 이미지는 세션에 남아 있으므로 업로더는 첫 반복에만 보임
+            if at.file_uploader:
+                at.file_uploader[0].set_value(("input.png", self.input_image, "image/png"))
+                _run(at)
+            at.selectbox[0].set_value(self.args.scale_factor)
+            at.radio[0].set_value(self.args.upscale_backend)
+            _button(at, "✨ 업스케일링 시작").click()
+        else:
+            if at.file_uploader:
+                at.file_uploader[0].set_value(("main.png", self.input_image, "image/png"))
+                at.file_uploader[1].set_value(("sample.png", self.input_image, "image/png"))
+                _run(at)
+            _button(at, "✨ 의상 변경하기").click()
+
+    # 버튼 클릭부터 결과(성공/오류)가 화면에 나올 때까지의 시간
+    def iterate(self):
+        started = time.perf_counter()
+        self._submit()
+        _run(self.at)
+        while not _finished(self.at):
+            if time.perf_counter() - started > self.args.timeout:
+                raise TimeoutError("결과가 제한 시간 안에 표시되지 않았습니다")
+            time.sleep(self.args.poll)
+            _run(self.at)
+        elapsed = time.perf_counter() - started
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+        return elapsed, not self.at.error
+
+
+def run_benchmark(args, backend):
+    from PIL import Image
+
+    input_buffer = io.BytesIO()
+    Image.open(io.BytesIO(backend.images[0])).resize((args.input_side, args.input_side)).save(input_buffer, format="PNG")
+    input_image = input_buffer.getvalue()
+
+    latencies = []
+    failures = []
+    results_lock = threading.Lock()
+
+    def worker(index):
+        try:
+            session = _Session(index, args, input_image)
+            for _ in range(args.iterations):
+                elapsed, ok = session.iterate()
+                with results_lock:
+                    latencies.append(elapsed)
+                    if not ok:
+                        failures.append("결과 화면 오류")
+        except Exception as exc:
+            with results_lock:
+                failures.append(f"세션 {index}: {exc}")
+
+    sampler = _RssSampler()
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(args.sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+    sampler.stop()
+
+    latencies.sort()
+    # Linux의 ru_maxrss 단위는 KB
+    return {
+        "scenario": args.scenario,
+        "sessions": args.sessions,
+        "iterations": args.iterations,
+        "completed": len(latencies),
+        "failures": failures,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_second": round(len(latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_seconds": {
+            "p50": round(_percentile(latencies, 0.5), 3),
+            "p95": round(_percentile(latencies, 0.95), 3),
+            "p99": round(_percentile(latencies, 0.99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_total_rss_mb": round(sampler.peak / 1024 / 1024, 1),
+        "backend": backend.stats(),
+    }
+
+
+# 새 인터프리터에서 로그인 화면 첫 실행까지 측정 (Streamlit 자체 import는 서버가 이미 끝낸 상태이므로 따로 집계)
+_STARTUP_PROBE = """
+import json, logging, sys, time, warnings
+warnings.filterwarnings("ignore")
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+for name in list(logging.root.manager.loggerDict):
+    if name.startswith("streamlit"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+finished = time.perf_counter()
+print(json.dumps({
+    "streamlit_import_seconds": imported - started,
+    "first_run_seconds": finished - imported,
+    "exception": [str(exc.message) for exc in at.exception],
+    "loaded_sdks": [name for name in ("google.generativeai", "replicate") if name in sys.modules],
+}))
+"""
+
+
+def measure_startup(runs):
+    import subprocess
+
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-c", _STARTUP_PROBE, APP_PATH], capture_output=True, text=True, check=True,
+                                   env=os.environ.copy())
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def print_report(report, stages):
+    latency = report["latency_seconds"]
+    backend = report["backend"]
+    print(f"시나리오: {report['scenario']} · 세션 {report['sessions']}개 × {report['iterations']}회")
+    print(f"완료 {report['completed']}건 / {report['wall_seconds']:.2f}초 → {report['throughput_per_second']:.2f}건/초")
+    print(f"지연 시간 p50 {latency['p50']:.3f}s · p95 {latency['p95']:.3f}s · p99 {latency['p99']:.3f}s · 최대 {latency['max']:.3f}s")
+    print(f"최대 RSS {report['peak_rss_mb']:.1f}MB (작업 프로세스 포함 합계 {report['peak_total_rss_mb']:.1f}MB)")
+    print(f"가짜 백엔드 호출 {backend['calls']}회 (주입 오류 {backend['errors']}회) · "
+          f"보낸 데이터 {backend['bytes_in'] / 1024 / 1024:.1f}MB · 받은 데이터 {backend['bytes_out'] / 1024 / 1024:.1f}MB")
+    if report["failures"]:
+        print(f"실패 {len(report['failures'])}건: {report['failures'][:5]}")
+    print()
+    print(f"{'단계':<20}{'제공자':<12}{'횟수':>6}{'p50 ms':>10}{'p95 ms':>10}{'평균 KB':>10}")
+    for row in stages:
+        print(f"{row['stage']:<20}{row['provider']:<12}{row['count']:>6}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['avg_kb']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 Gemini / Replicate 백엔드로 페이지를 동시에 실행해 성능을 측정합니다.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="google_generate")
+    parser.add_argument("--sessions", type=int, default=4, help="동시 세션 수")
+    parser.add_argument("--iterations", type=int, default=3, help="세션당 요청 수")
+    parser.add_argument("--api-keys", type=int, default=1, help="세션들이 나눠 쓰는 API 키 수 (속도 제한은 키별)")
+    parser.add_argument("--latency", type=float, default=0.5, help="가짜 백엔드 평균 응답 시간 (초)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="응답 시간 변동 폭 (평균 대비 비율)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="호출 실패 비율 (0~1)")
+    parser.add_argument("--image-side", type=int, default=1024, help="가짜 결과 이미지 한 변 (px)")
+    parser.add_argument("--input-side", type=int, default=768, help="편집/업스케일 입력 이미지 한 변 (px)")
+    parser.add_argument("--num-images", type=int, default=1, help="생성 요청당 이미지 수")
+    parser.add_argument("--scale-factor", choices=["2x", "4x"], default="2x")
+    parser.add_argument("--upscale-backend", choices=["local", "replicate"], default="local")
+    parser.add_argument("--allow-cache", action="store_true", help="강제 재생성을 끄고 결과 캐시를 사용")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--poll", type=float, default=0.1, help="결과 확인 간격 (초)")
+    parser.add_argument("--timeout", type=float, default=300, help="요청 하나의 제한 시간 (초)")
+    parser.add_argument("--data-dir", help="데이터 폴더 (기본: 임시 폴더, 캐시/작업 기록이 매번 비어 있음)")
+    parser.add_argument("--state-backend", choices=["local", "memory"], default="local",
+                        help="공유 상태 백엔드 (memory: 캐시/속도 제한은 메모리, 작업/히스토리는 실행마다 새 임시 SQLite)")
+    parser.add_argument("--json", help="결과를 JSON 파일로도 저장")
+    parser.add_argument("--startup", type=int, metavar="N", help="부하 테스트 대신 콜드 스타트를 N번 측정해서 예산과 비교")
+    args = parser.parse_args(argv)
+
+    # 설정은 import 시점에 환경변수에서 읽으므로 앱 모듈을 불러오기 전에 지정
+    os.environ["HAIRSTYLE_DATA_DIR"] = args.data_dir or tempfile.mkdtemp(prefix="hairstyle-bench-")
+    os.environ["HAIRSTYLE_STATE_BACKEND"] = args.state_backend
+    sys.path.insert(0, os.path.dirname(APP_PATH))
+    # 작업 스레드에서 나오는 Streamlit 경고/라이브러리 지원 종료 경고는 결과 출력과 섞이지 않게 숨김
+    warnings.filterwarnings("ignore")
+    import streamlit.testing.v1  # noqa: F401  (Streamlit 로거는 import 시점에 각자 레벨을 정함)
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    if args.startup:
+        import settings
+
+        results = measure_startup(args.startup)
+        first_runs = sorted(result["first_run_seconds"] for result in results)
+        over_budget = _percentile(first_runs, 0.5) > settings.STARTUP_BUDGET_SECONDS
+        print(f"콜드 스타트 {len(results)}회: 첫 실행 p50 {_percentile(first_runs, 0.5):.3f}s · 최대 {first_runs[-1]:.3f}s "
+              f"(예산 {settings.STARTUP_BUDGET_SECONDS:.2f}s{' 초과' if over_budget else ''}) · "
+              f"Streamlit import {results[0]['streamlit_import_seconds']:.3f}s")
+        loaded = sorted({name for result in results for name in result["loaded_sdks"]})
+        print(f"로그인 화면까지 불러온 제공자 SDK (선택된 제공자는 백그라운드에서 미리 불러옴): {', '.join(loaded) if loaded else '없음'}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"startup": results, "budget_seconds": settings.STARTUP_BUDGET_SECONDS}, f, ensure_ascii=False, indent=2)
+        return 1 if over_budget or any(result["exception"] for result in results) else 0
+
+    import metrics
+
+    backend = FakeBackend(args.latency, args.jitter, args.error_rate, args.image_side, args.seed)
+    install_fake_backends(backend)
+    report = run_benchmark(args, backend)
+    stages = metrics.get_metrics().summary()
+    print_report(report, stages)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({**report, "stages": stages}, f, ensure_ascii=False, indent=2)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
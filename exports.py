@@ -0,0 +1,145 @@
+# 결과 일괄 내보내기 (ZIP + 옵션 값 매니페스트 CSV/JSON)
+# - 히스토리 검색 결과 또는 배치 작업 결과 폴더를 ZIP으로 묶음
+# - ZIP bytes를 청크 단위로 내보내는 제너레이터라 첫 바이트가 바로 나가고, 이미지는 파일에서 청크씩 읽어 메모리에 통째로 올리지 않음
+#   (매니페스트 행만 모아뒀다가 마지막에 기록, 이미지 한 장당 수백 바이트)
+# - 이미지는 이미 압축된 형식이라 그대로 저장하고 매니페스트만 압축
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from datetime import datetime
+
+import batch
+from history import OPTION_COLUMNS
+
+CHUNK_SIZE = 1024 * 1024
+
+HISTORY_MANIFEST_FIELDS = ["file", "history_id", "created_at", "kind", "mode", "provider", "model", *OPTION_COLUMNS,
+                           "prompt_hash", "latency_ms", "from_cache", "job_id"]
+BATCH_MANIFEST_FIELDS = ["file", "index", *OPTION_COLUMNS, "status", "from_cache", "elapsed_seconds", "cache_key", "error"]
+
+
+# ZipFile 출력 대상: 쓴 bytes를 모아뒀다가 제너레이터가 꺼내감 (seek가 없어서 ZipFile이 스트리밍 모드로 씀)
+class _ChunkSink:
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# entries: (ZIP 안 경로, 파일 경로 또는 bytes) → ZIP bytes 청크
+def iter_zip(entries):
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as zf:
+        for arcname, source in entries:
+            if isinstance(source, bytes):
+                info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with zf.open(info, "w") as dest:
+                    dest.write(source)
+            else:
+                info = zipfile.ZipInfo.from_file(source, arcname)
+                info.compress_type = zipfile.ZIP_STORED
+                with zf.open(info, "w") as dest, open(source, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        dest.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # 중앙 디렉터리
+    yield sink.drain()
+
+
+# 제너레이터 내용을 파일에 씀 (Streamlit 다운로드 버튼처럼 완성된 파일이 필요한 곳용)
+# 쓴 바이트 수 반환, max_bytes를 넘으면 멈추고 None
+def write_zip(chunks, f, max_bytes=None):
+    total = 0
+    try:
+        for chunk in chunks:
+            total += len(chunk)
+            if max_bytes is not None and total > max_bytes:
+                return None
+            f.write(chunk)
+    finally:
+        chunks.close()
+    return total
+
+
+def _manifest_entries(rows, fields):
+    csv_buffer = io.StringIO()
+    writer = csv.DictWriter(csv_buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(rows)
+    # 엑셀에서 한글이 깨지지 않도록 BOM 포함
+    yield "manifest.csv", csv_buffer.getvalue().encode("utf-8-sig")
+    yield "manifest.json", json.dumps(rows, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _history_entries(history_store, artifact_store, owner, filters):
+    rows = []
+    for entry in history_store.iter_search(owner, filters):
+        for idx, artifact_id in enumerate(entry["output_ids"]):
+            path = artifact_store.path(artifact_id)
+            if not os.path.exists(path):
+                continue
+            name = f"images/{entry['kind']}_{entry['id']}_{idx + 1}.{artifact_id.rsplit('.', 1)[-1]}"
+            rows.append({
+                "file": name,
+                "history_id": entry["id"],
+                "created_at": datetime.fromtimestamp(entry["created_at"]).isoformat(timespec="seconds"),
+                "kind": entry["kind"],
+                "mode": entry["mode"],
+                "provider": entry["provider"],
+                "model": entry["model"],
+                **entry["options"],
+                "prompt_hash": entry["prompt_hash"],
+                "latency_ms": entry["latency_ms"],
+                "from_cache": bool(entry["from_cache"]),
+                "job_id": entry["job_id"],
+            })
+            yield name, path
+    yield from _manifest_entries(rows, HISTORY_MANIFEST_FIELDS)
+
+
+def _batch_entries(output_dir):
+    with open(os.path.join(output_dir, batch.MANIFEST_FILE), "rb") as f:
+        raw_manifest = f.read()
+    rows = []
+    for item in json.loads(raw_manifest)["items"]:
+        base = {key: item.get(key) for key in BATCH_MANIFEST_FIELDS if key != "file"}
+        base.update(item["options"])
+        files = [name for name in item.get("files", []) if os.path.exists(os.path.join(output_dir, name))]
+        # 실패한 조합도 매니페스트에는 남김
+        if not files:
+            rows.append(dict(base, file=""))
+        for name in files:
+            rows.append(dict(base, file=f"images/{name}"))
+            yield f"images/{name}", os.path.join(output_dir, name)
+    # batch.run_batch가 남긴 원본 매니페스트도 그대로 포함
+    yield "batch_manifest.json", raw_manifest
+    yield from _manifest_entries(rows, BATCH_MANIFEST_FIELDS)
+
+
+# 히스토리 검색 조건(history.HistoryStore.search와 같은 filters)에 맞는 결과 이미지 전체
+def export_history(history_store, artifact_store, owner, filters=None):
+    return iter_zip(_history_entries(history_store, artifact_store, owner, filters))
+
+
+# 배치 작업 결과 폴더 (batch.run_batch 출력)
+def export_batch(output_dir):
+    return iter_zip(_batch_entries(output_dir))
@@ -0,0 +1,265 @@
+# 이미지 생성/편집 공통 로직 (Streamlit 없이도 사용 가능: 페이지, 배치, 작업 큐, CLI에서 공유)
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import settings
+from artifacts import get_artifact_store
+from image_prep import prepare_upload
+from metrics import span
+from prompts import EDIT_PROMPTS
+from providers import get_client_pool
+from ratelimit import backoff_seconds, get_rate_limiter, is_retryable, retry_after_seconds
+from result_cache import make_cache_key
+from singleflight import get_single_flight
+
+# 옵션 목록/프롬프트 템플릿은 prompts.py에서 관리
+RESOLUTIONS = ["2K (2048x2048)", "4K (4096x4096)"]
+
+
+# 결과 URL을 아티팩트 저장소로 한 번만 내려받음 (여러 개면 동시에)
+def download_outputs(urls):
+    store = get_artifact_store()
+    with span("download", provider="replicate", model=settings.SEEDREAM_MODEL) as current:
+        artifact_ids = store.mirror_urls(urls, get_client_pool().download_client())
+        images = [store.read(artifact_id) for artifact_id in artifact_ids]
+        current.bytes = sum(len(image_data) for image_data in images)
+    return images
+
+
+def generation_params(provider, num_outputs=1, resolution=RESOLUTIONS[0]):
+    if provider == "google":
+        # 1장일 때는 기존 캐시 키 유지
+        return {"num_outputs": num_outputs} if num_outputs > 1 else {}
+    return {"num_outputs": num_outputs, "aspect_ratio": "1:1", "resolution": resolution}
+
+
+def model_for(provider):
+    return settings.GOOGLE_IMAGE_MODEL if provider == "google" else settings.SEEDREAM_MODEL
+
+
+def generation_cache_key(provider, prompt, params):
+    return make_cache_key(provider, model_for(provider), prompt, params)
+
+
+# Gemini 호출 (속도 제한 + 재시도는 ratelimit에서, 라이브러리 자체 재시도는 끔)
+def _gemini_generate(api_key, contents):
+    model = get_client_pool().gemini_model(api_key)
+    with span("model_call", provider="google", model=settings.GOOGLE_IMAGE_MODEL) as current:
+        response = get_rate_limiter().call(
+            api_key, settings.GOOGLE_IMAGE_MODEL,
+            lambda: model.generate_content(contents, request_options={"timeout": settings.GOOGLE_CALL_TIMEOUT_SECONDS, "retry": None})
+        )
+        images = [part.inline_data.data for part in response.candidates[0].content.parts if part.inline_data is not None]
+        current.bytes = sum(len(image_data) for image_data in images)
+    return images
+
+
+PREDICTION_DONE_STATUSES = ("succeeded", "failed", "canceled")
+
+
+# 취소는 최선을 다할 뿐 (취소 실패가 원래 오류를 가리지 않게)
+def _cancel_quietly(prediction):
+    try:
+        prediction.cancel()
+    except Exception:
+        pass
+
+
+# 폴링은 조회(GET)라서 일시적인 오류는 백오프 후 다시 시도 (deadline을 넘기면 그대로 올림)
+def _reload_prediction(prediction, deadline):
+    for attempt in range(settings.PROVIDER_MAX_ATTEMPTS):
+        try:
+            prediction.reload()
+            return
+        except Exception as exc:
+            if not is_retryable(exc) or attempt == settings.PROVIDER_MAX_ATTEMPTS - 1:
+                raise
+            delay = backoff_seconds(attempt, retry_after_seconds(exc))
+            if time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+
+
+# Seedream 예측 생성은 속도 제한 안에서, 완료까지는 제한 시간 안에서 폴링
+# 제한 시간 초과나 폴링/결과 처리 중 오류로 끝나면 과금 중인 예측을 취소
+# on_output이 있으면 폴링 중 새로 나온 결과 URL을 나오는 즉시 하나씩 넘김
+def _run_seedream(api_key, model_input, on_output=None):
+    client = get_client_pool().replicate_client(api_key)
+    with span("prediction_create", provider="replicate", model=settings.SEEDREAM_MODEL,
+              nbytes=len(str(model_input.get("image", "")))):
+        prediction = get_rate_limiter().call(
+            api_key, settings.SEEDREAM_MODEL,
+            lambda: client.models.predictions.create(model=settings.SEEDREAM_MODEL, input=model_input),
+            # 5xx/응답 시간 초과는 예측이 이미 만들어졌을 수 있으므로 다시 보내지 않음 (중복 과금)
+            idempotent=False
+        )
+    deadline = time.monotonic() + settings.SEEDREAM_PREDICTION_TIMEOUT_SECONDS
+    emitted = 0
+
+    def emit_new_outputs():
+        nonlocal emitted
+        if on_output is None or not isinstance(prediction.output, list):
+            return
+        for url in prediction.output[emitted:]:
+            on_output(url)
+        emitted = len(prediction.output)
+
+    with span("prediction_wait", provider="replicate", model=settings.SEEDREAM_MODEL):
+        try:
+            while prediction.status not in PREDICTION_DONE_STATUSES:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Seedream 응답 시간 초과 ({settings.SEEDREAM_PREDICTION_TIMEOUT_SECONDS:.0f}초)")
+                time.sleep(settings.REPLICATE_POLL_SECONDS)
+                _reload_prediction(prediction, deadline)
+                emit_new_outputs()
+        except BaseException:
+            if prediction.status not in PREDICTION_DONE_STATUSES:
+                _cancel_quietly(prediction)
+            raise
+        if prediction.status != "succeeded":
+            from replicate.exceptions import ModelError
+            raise ModelError(prediction)
+    output = prediction.output
+    return output if isinstance(output, list) else [output]
+
+
+# 여러 장이면 독립된 호출을 동시에 보내고 끝나는 순서대로 수집 (각 호출은 속도 제한을 따름)
+# 일부만 실패하면 성공한 이미지만 반환, 모두 실패하면 첫 오류를 그대로 올림
+def call_google(api_key, prompt, num_outputs=1, on_image=None):
+    if num_outputs <= 1:
+        images = _gemini_generate(api_key, [prompt])
+        for image_data in images:
+            if on_image is not None:
+                on_image(image_data)
+        return images
+
+    images = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=min(num_outputs, settings.GOOGLE_FANOUT_WORKERS)) as executor:
+        futures = [executor.submit(_gemini_generate, api_key, [prompt]) for _ in range(num_outputs)]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                errors.append(exc)
+                continue
+            for image_data in result:
+                images.append(image_data)
+                if on_image is not None:
+                    on_image(image_data)
+    if not images and errors:
+        raise errors[0]
+    return images
+
+
+def call_replicate(api_key, prompt, num_outputs=1, on_output=None):
+    return _run_seedream(api_key, {
+        "prompt": prompt,
+        "num_outputs": num_outputs,
+        "aspect_ratio": "1:1",
+        "output_format": "png"
+    }, on_output=on_output)
+
+
+# 캐시 확인 후 필요할 때만 API 호출, (이미지 bytes 목록, 캐시 적중 여부) 반환
+# 같은 요청이 이미 진행 중이면 API를 다시 부르지 않고 그 결과를 받음 (이 경우도 캐시 적중으로 취급)
+# on_image가 있으면 직접 호출한 경우 이미지가 하나씩 준비될 때마다 먼저 넘김 (반환 목록의 앞부분과 같은 순서)
+def generate_images(provider, api_key, prompt, num_outputs=1, resolution=RESOLUTIONS[0], cache=None, force=False, on_image=None):
+    params = generation_params(provider, num_outputs, resolution)
+    cache_key = generation_cache_key(provider, prompt, params)
+
+    if cache is not None and not force:
+        with span("cache_get", provider=provider, model=model_for(provider)) as current:
+            cached_images = cache.get(cache_key)
+            current.bytes = sum(len(image_data) for image_data in cached_images or ())
+        if cached_images:
+            return cached_images, True
+
+    def produce():
+        # 캐시 확인과 진행 중 등록 사이에 다른 요청이 끝났을 수 있으므로 한 번 더 확인
+        if cache is not None and not force:
+            cached_images = cache.get(cache_key)
+            if cached_images:
+                return cached_images
+
+        if provider == "google":
+            images = call_google(api_key, prompt, num_outputs, on_image=on_image)
+        else:
+            images = []
+
+            def on_output(url):
+                store = get_artifact_store()
+                with span("download", provider="replicate", model=settings.SEEDREAM_MODEL) as current:
+                    image_data = store.read(store.mirror_url(url, get_client_pool().download_client()))
+                    current.bytes = len(image_data)
+                images.append(image_data)
+                if on_image is not None:
+                    on_image(image_data)
+
+            output = call_replicate(api_key, prompt, num_outputs, on_output=on_output)
+            # 폴링 중에 받지 못한 나머지 결과
+            images.extend(download_outputs(output[len(images):]))
+
+        # Gemini 동시 호출 중 일부가 실패한 결과는 캐시하지 않음
+        complete = provider != "google" or len(images) >= num_outputs
+        if cache is not None and images and complete:
+            with span("cache_put", provider=provider, model=model_for(provider), nbytes=sum(len(image_data) for image_data in images)):
+                cache.put(cache_key, images, {"provider": provider})
+        return images
+
+    # 성공한 결과는 키와 무관하게 공유, 실패는 같은 키로 기다리던 요청에만 전달 (다른 키는 자기 키로 다시 시도)
+    return get_single_flight().do(cache_key, produce, scope=api_key)
+
+
+# 편집용 메인 이미지 참조 준비
+# upload=True면 Seedream용으로 Replicate 파일 저장소에 한 번 올려두고 URL을 재사용 (같은 이미지로 여러 번 편집할 때)
+def prepare_edit_main(provider, api_key, main_bytes, upload=False):
+    if provider == "google":
+        return prepare_upload(main_bytes, settings.GOOGLE_MAX_INPUT_SIDE).to_gemini_blob()
+    prepared = prepare_upload(main_bytes, settings.SEEDREAM_MAX_INPUT_SIDE)
+    if not upload:
+        with span("encode_base64", provider="replicate", model=settings.SEEDREAM_MODEL, nbytes=len(prepared.data)):
+            return prepared.to_data_uri()
+    client = get_client_pool().replicate_client(api_key)
+    with span("file_upload", provider="replicate", model=settings.SEEDREAM_MODEL, nbytes=len(prepared.data)):
+        uploaded = get_rate_limiter().call(
+            api_key, settings.SEEDREAM_MODEL,
+            lambda: client.files.create(io.BytesIO(prepared.data), filename="main", content_type=prepared.mime_type)
+        )
+    return uploaded.urls["get"]
+
+
+# 준비된 메인 이미지 참조로 편집 1회
+def edit_with_main(provider, api_key, prompt, main_ref, sample_bytes=()):
+    if provider == "google":
+        # Gemini는 메인 + 샘플 이미지를 모두 참조
+        samples = [prepare_upload(data, settings.GOOGLE_MAX_INPUT_SIDE).to_gemini_blob() for data in sample_bytes]
+        return _gemini_generate(api_key, [prompt, main_ref] + samples)
+
+    # Seedream은 단일 참조 이미지 사용
+    output = _run_seedream(api_key, {
+        "prompt": prompt,
+        "image": main_ref,
+        "prompt_strength": 0.8,
+        "output_format": "png"
+    })
+    return download_outputs(output[:1])
+
+
+def edit_images(provider, api_key, mode, main_bytes, sample_bytes):
+    return edit_with_main(provider, api_key, EDIT_PROMPTS[mode], prepare_edit_main(provider, api_key, main_bytes), sample_bytes)
+
+
+# Seedream 고해상도 재생성 기능으로 업스케일
+def upscale_image(api_key, image_bytes):
+    prepared = prepare_upload(image_bytes, settings.SEEDREAM_MAX_INPUT_SIDE)
+    with span("encode_base64", provider="replicate", model=settings.SEEDREAM_MODEL, nbytes=len(prepared.data)):
+        image_uri = prepared.to_data_uri()
+    output = _run_seedream(api_key, {
+        "prompt": "high quality, ultra detailed, 4K resolution",
+        "image": image_uri,
+        "prompt_strength": 0.3,  # 원본 유지
+        "output_format": "png"
+    })
+    return download_outputs(output[:1])
@@ -1,11 +1,39 @@
+import time
+# 스크립트 실행 시간 측정 시작 (프로세스 첫 실행은 모듈 import 포함 = 콜드 스타트)
+_script_started = time.perf_counter()
+
 import streamlit as st
-import google.generativeai as genai
-from PIL import Image
-import io
-import base64
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
-import replicate
+import logging
 import os
+import sys
+import tempfile
+from urllib.parse import urlencode
+
+import settings
+import generation
+import prompts
+import batch
+import pipeline
+import jobs
+import tasks
+import providers
+import auth
+import previews
+import history
+import artifacts
+import metrics
+import routing
+import session_artifacts
+import backends
+import exports
+from result_cache import IMAGE_MIME_TYPES
+
+# 헤드리스 배치 모드: python hairstyle_generator_v2.py batch --provider google ...
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "batch":
+    sys.exit(batch.main(sys.argv[2:]))
 
 # 페이지 설정
 st.set_page_config(
@@ -15,14 +43,10 @@ st.set_page_config(
 )
 
 # 세션 상태 초기화
-if 'api_key' not in st.session_state:
-    st.session_state.api_key = None
-if 'api_provider' not in st.session_state:
-    st.session_state.api_provider = None
-if 'logged_in' not in st.session_state:
-    st.session_state.logged_in = False
-if 'history' not in st.session_state:
-    st.session_state.history = []
+SESSION_DEFAULTS = {"api_key": None, "api_provider": None, "fallback_keys": None, "logged_in": False, "history_page": 0}
+for state_key, default in SESSION_DEFAULTS.items():
+    if state_key not in st.session_state:
+        st.session_state[state_key] = default
 
 # CSS 스타일
 st.markdown("""
@@ -91,24 +115,401 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# API 키 검증 함수
-def verify_google_api_key(api_key):
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content("test")
-        return True
-    except Exception as e:
+# API 키 검증 (성공한 키는 일정 시간 캐시되어 재로그인 시 바로 통과)
+@st.cache_resource
+def get_verified_key_cache():
+    return auth.VerifiedKeyCache()
+
+# 생성 결과 캐시 (공유 상태 백엔드: 같은 백엔드를 쓰는 레플리카끼리 공유)
+@st.cache_resource
+def get_result_cache():
+    return backends.get_backend().result_cache()
+
+# 화면 표시용 미리보기 (프로세스 전체에서 공유)
+@st.cache_resource
+def get_preview_cache():
+    return previews.PreviewCache()
+
+# 원본 대신 축소된 미리보기로 표시 (원본은 다운로드/모델 입력에만 사용)
+def show_image_preview(artifact_id, caption=None):
+    st.image(get_preview_cache().preview_artifact(artifacts.get_artifact_store(), artifact_id),
+             caption=caption, use_container_width=True)
+
+UPLOAD_TYPES = ['png', 'jpg', 'jpeg']
+
+# 업로드 이미지 bytes (핸들은 upload_slot이 반환, 세션별로 보관)
+def read_upload(handle):
+    return session_artifacts.get_session_artifacts().read(get_script_run_ctx().session_id, handle)
+
+# 이미지 업로드 칸: 올린 이미지는 세션 아티팩트로 옮기고 Streamlit 업로드 메모리에서는 지움 (이후 업로더 대신 미리보기 + 교체 버튼)
+# 핸들 반환, 아직 없으면 None (multiple=True면 핸들 목록)
+def upload_slot(label, key, caption=None, multiple=False):
+    manager = session_artifacts.get_session_artifacts()
+    ctx = get_script_run_ctx()
+    handles_key = f"{key}_handles"
+    handles = [handle for handle in st.session_state.get(handles_key, []) if manager.contains(ctx.session_id, handle)]
+    if handles:
+        columns = st.columns(min(len(handles), 4)) if multiple else [st.container()]
+        for idx, handle in enumerate(handles):
+            with columns[idx % len(columns)]:
+                st.image(get_preview_cache().preview(manager.read(ctx.session_id, handle), content_hash=handle),
+                         caption=f"{caption or label} {idx + 1}" if multiple else caption or label, use_container_width=True)
+        if st.button("🔁 다른 이미지로 교체", key=f"{key}_replace", use_container_width=True):
+            for handle in handles:
+                manager.discard(ctx.session_id, handle)
+            st.session_state[handles_key] = []
+            st.rerun()
+        return handles if multiple else handles[0]
+    
+    nonce = st.session_state.get(f"{key}_nonce", 0)
+    uploaded = st.file_uploader(label, type=UPLOAD_TYPES, accept_multiple_files=multiple, key=f"{key}_{nonce}")
+    uploaded_files = (uploaded or []) if multiple else ([uploaded] if uploaded else [])
+    if not uploaded_files:
+        return [] if multiple else None
+    
+    handles = []
+    for uploaded_file in uploaded_files:
+        handles.append(manager.put(ctx.session_id, uploaded_file.getvalue()))
+        # 업로드 매니저의 원본은 세션이 끝날 때까지 메모리에 남으므로 바로 지움
+        if hasattr(ctx.uploaded_file_mgr, "remove_file"):
+            ctx.uploaded_file_mgr.remove_file(ctx.session_id, uploaded_file.file_id)
+    st.session_state[handles_key] = handles
+    # 새 키로 업로더를 다시 만들어 지운 파일을 가리키지 않게 함
+    st.session_state[f"{key}_nonce"] = nonce + 1
+    st.rerun()
+
+# 끝난 세션의 업로드 이미지 정리 (스크립트 실행마다 호출, 실제 정리는 일정 간격으로)
+def sweep_session_artifacts():
+    if runtime.exists():
+        session_artifacts.get_session_artifacts().maybe_sweep(runtime.get_instance().is_active_session)
+
+# 결과 이미지 표시 (artifact ID 목록)
+# 진행 중인 작업 화면은 자동으로 다시 그려지므로 미리보기만 표시하고, 원본은 요청한 이미지만 불러와 다운로드 버튼으로 넘김
+def show_result_images(artifact_ids, file_prefix, key_prefix=None):
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    key_prefix = key_prefix or file_prefix
+    artifact_store = artifacts.get_artifact_store()
+    selected_key = f"{key_prefix}_selected_originals"
+    selected = st.session_state.get(selected_key, [])
+    # 여러 장이면 2열 그리드로 나란히 비교
+    columns = st.columns(2) if len(artifact_ids) > 1 else [st.container()]
+    for idx, artifact_id in enumerate(artifact_ids):
+        ext = artifact_id.rsplit(".", 1)[-1]
+        with columns[idx % len(columns)]:
+            show_image_preview(artifact_id, caption=f"생성 이미지 {idx + 1}" if len(artifact_ids) > 1 else None)
+            if artifact_id in selected:
+                st.download_button(
+                    label=f"💾 이미지 {idx + 1} 다운로드" if len(artifact_ids) > 1 else "💾 이미지 다운로드",
+                    data=artifact_store.read(artifact_id),
+                    file_name=f"{file_prefix}_{timestamp}_{idx + 1}.{ext}",
+                    mime=IMAGE_MIME_TYPES.get(ext, "application/octet-stream"),
+                    key=f"{key_prefix}_download_{idx}",
+                    use_container_width=True
+                )
+            elif st.button("📥 원본 받기", key=f"{key_prefix}_select_{idx}", use_container_width=True):
+                st.session_state[selected_key] = selected + [artifact_id]
+                st.rerun()
+
+# 생성/편집 히스토리 (공유 상태 백엔드)
+@st.cache_resource
+def get_history_store():
+    return backends.get_backend().history_store()
+
+# 백그라운드 작업 큐 (프로세스 전체에서 공유)
+@st.cache_resource
+def get_job_queue():
+    return tasks.create_job_queue(get_result_cache(), get_history_store())
+
+def submit_job(kind, params, inputs=()):
+    owner = jobs.owner_id(st.session_state.api_key)
+    return get_job_queue().submit(owner, kind, params, st.session_state.api_key, inputs,
+                                  fallback_keys=st.session_state.fallback_keys)
+
+PROVIDER_NAMES = {"google": "Google Gemini", "replicate": "Replicate Seedream"}
+
+# 다른 제공자 키 등록 (이미지 생성이 느리거나 실패하면 그 제공자로 자동 전환, 메인 선택 화면에서 호출)
+def fallback_provider_section():
+    other = "replicate" if st.session_state.api_provider == "google" else "google"
+    fallback_keys = st.session_state.fallback_keys or {}
+    with st.expander(f"🔀 자동 전환: {PROVIDER_NAMES[other]} " + ("연결됨" if other in fallback_keys else "키 등록")):
+        st.caption(f"이미지 생성이 평소보다 오래 걸리거나 실패하면 {PROVIDER_NAMES[other]}에도 요청해서 먼저 도착한 결과를 사용합니다")
+        if other in fallback_keys:
+            if st.button("연결 해제", key="fallback_remove"):
+                st.session_state.fallback_keys = None
+                st.rerun()
+            return
+        
+        fallback_key = st.text_input(f"{PROVIDER_NAMES[other]} API 키", type="password", key="fallback_key_input")
+        if st.button("🔐 검증 후 연결", key="fallback_add"):
+            if not fallback_key:
+                st.error("❌ API 키를 입력해주세요")
+                return
+            with st.spinner("API 키 검증 중..."):
+                verified, reason = auth.verify_api_key(other, fallback_key, get_verified_key_cache())
+            if verified:
+                st.session_state.fallback_keys = {other: fallback_key}
+                st.rerun()
+            else:
+                st.error(f"❌ {reason}")
+
+# 생성 페이지의 자동 전환 선택 (다른 제공자 키가 없으면 False)
+def routing_checkbox():
+    fallback_keys = st.session_state.fallback_keys or {}
+    others = [name for name in fallback_keys if name != st.session_state.api_provider]
+    if not others:
         return False
+    return st.checkbox(f"🔀 지연/장애 시 {PROVIDER_NAMES[others[0]]}로 자동 전환", value=True, key="generation_routing",
+                       help="응답이 최근 처리 시간 분포보다 늦어지면 다른 제공자에도 요청하고 먼저 도착한 결과를 사용합니다")
 
-def verify_replicate_api_key(api_key):
-    try:
-        os.environ["REPLICATE_API_TOKEN"] = api_key
-        # 간단한 테스트
-        replicate.Client(api_token=api_key)
+JOB_KIND_NAMES = {
+    "generate": "이미지 생성",
+    "edit": "이미지 편집",
+    "upscale": "업스케일링",
+    "batch": "배치 생성",
+    "pipeline": "파이프라인",
+    "color_matrix": "컬러 매트릭스"
+}
+
+# 작업 상태/결과 표시, 아직 진행 중이면 True 반환
+def render_job(job_id, file_prefix):
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        st.warning("⚠️ 작업을 찾을 수 없습니다")
+        return False
+    
+    outputs = job["result_files"]
+    
+    if job["status"] in jobs.ACTIVE_STATUSES:
+        st.progress(job["progress"], text=job["message"] or "대기 중...")
+        # 파이프라인은 끝난 단계의 중간 결과를 미리보기로 표시
+        if job["kind"] == "pipeline" and job["result"]:
+            for entry in job["result"]["steps"]:
+                show_image_preview(entry["outputs"][0], caption=pipeline.describe_step(entry["step"]))
+        # 먼저 끝난 결과는 바로 표시
+        if outputs:
+            show_result_images(outputs, file_prefix, key_prefix=job_id)
         return True
-    except Exception as e:
+    
+    if job["status"] == jobs.JOB_ERROR:
+        st.error(f"❌ 오류 발생: {job['error']}")
         return False
+    
+    if job["kind"] == "batch":
+        render_batch_result(job["result"], job_id)
+    elif job["kind"] == "color_matrix":
+        render_color_matrix_result(job, job_id)
+        failed = sum(1 for variant in job["result"]["variants"] if variant and "error" in variant)
+        st.success("✅ 컬러 매트릭스 완료!" + (f" (실패 {failed}개)" if failed else ""))
+    elif job["kind"] == "pipeline":
+        show_result_images(outputs, file_prefix, key_prefix=job_id)
+        steps = (job["result"] or {}).get("steps", [])
+        st.caption(" → ".join(
+            pipeline.describe_step(entry["step"]) + (" (캐시)" if entry["from_cache"] else "") for entry in steps
+        ))
+        st.success(f"✅ 파이프라인 완료! ({len(steps)}단계)")
+    else:
+        show_result_images(outputs, file_prefix, key_prefix=job_id)
+        served_by = (job["result"] or {}).get("provider")
+        if served_by and served_by != job["params"]["provider"]:
+            st.info(f"🔀 {PROVIDER_NAMES[served_by]}에서 먼저 도착한 결과입니다")
+        if job["result"] and job["result"].get("from_cache"):
+            st.success("✅ 캐시된 이미지를 불러왔습니다!")
+        else:
+            st.success(f"✅ {JOB_KIND_NAMES[job['kind']]} 완료!")
+    return False
+
+# 진행 중인 작업이 있으면 잠시 후 다시 실행해서 상태 갱신 (페이지 맨 끝에서 호출)
+def poll_jobs(active):
+    if not active:
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        auto_refresh = st.checkbox("자동 새로고침", value=True, key="job_auto_refresh")
+    with col2:
+        st.button("🔄 새로고침", key="job_refresh", use_container_width=True)
+    
+    if auto_refresh:
+        time.sleep(settings.JOB_POLL_SECONDS)
+        st.rerun()
+
+EDIT_MODE_NAMES = {
+    "outfit": "의상 변경",
+    "face": "얼굴 변경",
+    "background": "배경 변경",
+    "color": "헤어 컬러 변경"
+}
+
+# 히스토리 페이지 (조건 검색 + 페이지 단위 조회, 현재 페이지의 미리보기만 불러옴)
+# ZIP 내보내기: 누른 실행에서만 제너레이터로 임시 파일에 만들고 그 bytes로 다운로드 버튼 표시
+# (세션 상태에 보관하지 않아서 이후 실행마다 ZIP을 다시 읽지 않음, 다시 받으려면 다시 누름)
+# Streamlit 다운로드 버튼은 파일 전체를 메모리에 올리므로 한도를 넘으면 HTTP API의 스트리밍 내보내기 안내
+def zip_export_section(key, build_chunks, file_name, api_path):
+    if not st.button("📦 ZIP으로 내보내기 (이미지 + 옵션 매니페스트 CSV/JSON)", key=f"{key}_build", use_container_width=True):
+        return
+    
+    with tempfile.TemporaryFile(dir=settings.DATA_DIR) as export_file:
+        with st.spinner("ZIP 만드는 중..."):
+            size = exports.write_zip(build_chunks(), export_file, max_bytes=settings.EXPORT_UI_MAX_BYTES)
+        if size is None:
+            st.warning(f"⚠️ 화면에서 받을 수 있는 크기({settings.EXPORT_UI_MAX_BYTES // (1024 * 1024)}MB)를 넘습니다. HTTP API로 받아주세요 (만들면서 바로 내려받음)")
+            st.code(
+                f'curl -H "X-Provider: {st.session_state.api_provider}" -H "Authorization: Bearer $API_KEY" \\\n'
+                f'  "http://<API 서버>{api_path}" -o {file_name}',
+                language="bash"
+            )
+            return
+        export_file.seek(0)
+        data = export_file.read()
+    
+    st.download_button(
+        label=f"💾 {file_name} 다운로드 ({size / (1024 * 1024):.1f}MB)",
+        data=data,
+        file_name=file_name,
+        mime="application/zip",
+        key=f"{key}_download",
+        use_container_width=True
+    )
+
+def history_page():
+    provider_badge = "badge-google" if st.session_state.api_provider == "google" else "badge-replicate"
+    provider_name = "Google Gemini" if st.session_state.api_provider == "google" else "Replicate Seedream"
+    
+    st.markdown(f'<div class="main-header"><h1>🕘 히스토리</h1><span class="provider-badge {provider_badge}">{provider_name}</span></div>', unsafe_allow_html=True)
+    
+    if st.button("⬅️ 뒤로 가기"):
+        st.session_state.selected_mode = None
+        st.rerun()
+    
+    st.markdown("---")
+    
+    query = st.text_input("🔍 검색", placeholder="예: 30대 여성 웨이브 애쉬 브라운")
+    filters = history.parse_query(query)
+    
+    with st.expander("상세 필터"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            kinds = st.multiselect("작업 종류", list(JOB_KIND_NAMES)[:3], format_func=JOB_KIND_NAMES.get)
+            age_groups = st.multiselect("나이대", prompts.OPTIONS["age_group"].choices)
+        with col2:
+            genders = st.multiselect("성별", prompts.OPTIONS["gender"].choices)
+            hair_textures = st.multiselect("헤어 질감", prompts.OPTIONS["hair_texture"].choices)
+        with col3:
+            hair_colors = st.multiselect("헤어 컬러", prompts.OPTIONS["hair_color"].choices)
+            edit_modes = st.multiselect("편집 유형", list(EDIT_MODE_NAMES), format_func=EDIT_MODE_NAMES.get)
+    
+    for column, values in [("kind", kinds), ("age_group", age_groups), ("gender", genders),
+                           ("hair_texture", hair_textures), ("hair_color", hair_colors), ("mode", edit_modes)]:
+        if values:
+            filters[column] = sorted(set(filters.get(column, [])) | set(values))
+    
+    # 조건이 바뀌면 첫 페이지부터
+    filter_signature = repr(sorted(filters.items()))
+    if st.session_state.get("history_filter_signature") != filter_signature:
+        st.session_state.history_filter_signature = filter_signature
+        st.session_state.history_page = 0
+    
+    store = get_history_store()
+    owner = jobs.owner_id(st.session_state.api_key)
+    page_size = settings.HISTORY_PAGE_SIZE
+    total = store.count(owner, filters)
+    
+    if total == 0:
+        st.info("💡 조건에 맞는 기록이 없습니다")
+        return
+    
+    page_count = (total + page_size - 1) // page_size
+    page = min(st.session_state.history_page, page_count - 1)
+    entries = store.search(owner, filters, limit=page_size, offset=page * page_size)
+    
+    st.caption(f"총 {total}개 · {page + 1}/{page_count} 페이지")
+    
+    zip_export_section(
+        "history_export",
+        lambda: exports.export_history(store, artifacts.get_artifact_store(), owner, filters),
+        f"history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+        "/v1/history/export" + (f"?{urlencode(filters, doseq=True)}" if filters else "")
+    )
+    
+    artifact_store = artifacts.get_artifact_store()
+    preview_cache = get_preview_cache()
+    grid = st.columns(4)
+    for idx, entry in enumerate(entries):
+        with grid[idx % 4]:
+            if entry["output_ids"]:
+                st.image(preview_cache.preview_artifact(artifact_store, entry["output_ids"][0]), use_container_width=True)
+            
+            if entry["kind"] == "generate":
+                options = entry["options"]
+                label = " · ".join(options[key] for key in ["age_group", "gender", "hair_texture", "hair_color"] if key in options)
+            elif entry["kind"] == "edit":
+                label = EDIT_MODE_NAMES.get(entry["mode"], entry["mode"])
+            else:
+                label = JOB_KIND_NAMES[entry["kind"]]
+            created = datetime.fromtimestamp(entry["created_at"]).strftime('%m/%d %H:%M')
+            cache_note = " · 캐시" if entry["from_cache"] else ""
+            st.caption(f"{label}\n\n{created} · {entry['provider']} · {(entry['latency_ms'] or 0) / 1000:.1f}초{cache_note}")
+            
+            # 원본은 요청한 항목만 불러옴
+            if st.session_state.get("history_selected") == entry["id"]:
+                for output_idx, artifact_id in enumerate(entry["output_ids"]):
+                    ext = artifact_id.rsplit(".", 1)[-1]
+                    st.download_button(
+                        label=f"💾 원본 {output_idx + 1}",
+                        data=artifact_store.read(artifact_id),
+                        file_name=f"{entry['kind']}_{entry['id']}_{output_idx + 1}.{ext}",
+                        mime=IMAGE_MIME_TYPES.get(ext, "application/octet-stream"),
+                        key=f"history_download_{entry['id']}_{output_idx}",
+                        use_container_width=True
+                    )
+            elif st.button("📥 원본 받기", key=f"history_select_{entry['id']}", use_container_width=True):
+                st.session_state.history_selected = entry["id"]
+                st.rerun()
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ 이전", disabled=page == 0, use_container_width=True):
+            st.session_state.history_page = page - 1
+            st.rerun()
+    with col3:
+        if st.button("다음 ▶", disabled=page >= page_count - 1, use_container_width=True):
+            st.session_state.history_page = page + 1
+            st.rerun()
+
+# 작업 목록 페이지 (새로고침/재접속 후에도 같은 API 키로 로그인하면 확인 가능)
+def jobs_page():
+    provider_badge = "badge-google" if st.session_state.api_provider == "google" else "badge-replicate"
+    provider_name = "Google Gemini" if st.session_state.api_provider == "google" else "Replicate Seedream"
+    
+    st.markdown(f'<div class="main-header"><h1>📋 작업 목록</h1><span class="provider-badge {provider_badge}">{provider_name}</span></div>', unsafe_allow_html=True)
+    
+    if st.button("⬅️ 뒤로 가기"):
+        st.session_state.selected_mode = None
+        st.rerun()
+    
+    st.markdown("---")
+    
+    recent_jobs = get_job_queue().list_jobs(jobs.owner_id(st.session_state.api_key))
+    if not recent_jobs:
+        st.info("💡 아직 요청한 작업이 없습니다")
+        return
+    
+    status_labels = {
+        jobs.JOB_QUEUED: "⏳ 대기 중",
+        jobs.JOB_RUNNING: "🔄 진행 중",
+        jobs.JOB_DONE: "✅ 완료",
+        jobs.JOB_ERROR: "❌ 실패"
+    }
+    
+    active = False
+    for job in recent_jobs:
+        created = datetime.fromtimestamp(job["created_at"]).strftime('%m/%d %H:%M:%S')
+        title = f"{status_labels[job['status']]} · {JOB_KIND_NAMES[job['kind']]} · {created}"
+        with st.expander(title, expanded=job["status"] in jobs.ACTIVE_STATUSES):
+            active = render_job(job["id"], job["kind"]) or active
+    
+    poll_jobs(active)
 
 # 로그인 페이지
 def login_page():
@@ -126,6 +527,8 @@ def login_page():
             ["Google AI Studio (Gemini)", "Replicate (Seedream 4.0)"],
             help="각 제공자는 다른 기능과 가격을 제공합니다"
         )
+        # 선택한 제공자의 SDK만 미리 불러옴 (키 입력하는 동안 백그라운드에서)
+        providers.warm_up("google" if provider == "Google AI Studio (Gemini)" else "replicate")
         
         st.markdown("")
         
@@ -145,14 +548,15 @@ def login_page():
                     st.error("❌ API 키를 입력해주세요")
                 else:
                     with st.spinner("API 키 검증 중..."):
-                        if verify_google_api_key(api_key):
-                            st.session_state.api_key = api_key
-                            st.session_state.api_provider = "google"
-                            st.session_state.logged_in = True
-                            st.success("✅ Google AI Studio 로그인 성공!")
-                            st.rerun()
-                        else:
-                            st.error("❌ 유효하지 않은 API 키입니다")
+                        verified, reason = auth.verify_api_key("google", api_key, get_verified_key_cache())
+                    if verified:
+                        st.session_state.api_key = api_key
+                        st.session_state.api_provider = "google"
+                        st.session_state.logged_in = True
+                        st.success("✅ Google AI Studio 로그인 성공!")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ {reason}")
         
         # Replicate
         else:
@@ -170,14 +574,15 @@ def login_page():
                     st.error("❌ API 토큰을 입력해주세요")
                 else:
                     with st.spinner("API 토큰 검증 중..."):
-                        if verify_replicate_api_key(api_key):
-                            st.session_state.api_key = api_key
-                            st.session_state.api_provider = "replicate"
-                            st.session_state.logged_in = True
-                            st.success("✅ Replicate 로그인 성공!")
-                            st.rerun()
-                        else:
-                            st.error("❌ 유효하지 않은 API 토큰입니다")
+                        verified, reason = auth.verify_api_key("replicate", api_key, get_verified_key_cache())
+                    if verified:
+                        st.session_state.api_key = api_key
+                        st.session_state.api_provider = "replicate"
+                        st.session_state.logged_in = True
+                        st.success("✅ Replicate 로그인 성공!")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ {reason}")
         
         st.markdown("---")
         
@@ -197,6 +602,7 @@ def google_main_selection():
             st.session_state.logged_in = False
             st.session_state.api_key = None
             st.session_state.api_provider = None
+            st.session_state.fallback_keys = None
             st.rerun()
     
     st.markdown("## 작업을 선택하세요")
@@ -225,6 +631,28 @@ def google_main_selection():
         if st.button("5️⃣ 헤어 컬러 변경\n\n헤어 스타일 유지, 컬러만 변경", key="color_google", use_container_width=True):
             st.session_state.selected_mode = "color"
             st.rerun()
+        
+        if st.button("6️⃣ 배치 생성\n\n옵션 조합 전체를 한 번에 생성", key="batch_google", use_container_width=True):
+            st.session_state.selected_mode = "batch"
+            st.rerun()
+    
+    if st.button("🔗 파이프라인\n\n생성 → 편집 → 업스케일을 한 번에 (중간 다운로드/업로드 없음)", key="pipeline_google", use_container_width=True):
+        st.session_state.selected_mode = "pipeline"
+        st.rerun()
+    
+    if st.button("📋 작업 목록\n\n진행 중이거나 완료된 작업 확인", key="jobs_google", use_container_width=True):
+        st.session_state.selected_mode = "jobs"
+        st.rerun()
+    
+    if st.button("🕘 히스토리\n\n지난 생성/편집 결과 검색", key="history_google", use_container_width=True):
+        st.session_state.selected_mode = "history"
+        st.rerun()
+    
+    if st.button("📈 성능 지표\n\n단계별 처리 시간 (p50/p95)", key="metrics_google", use_container_width=True):
+        st.session_state.selected_mode = "metrics"
+        st.rerun()
+    
+    fallback_provider_section()
 
 # Replicate 메인 선택 화면 (3개 옵션)
 def replicate_main_selection():
@@ -236,6 +664,7 @@ def replicate_main_selection():
             st.session_state.logged_in = False
             st.session_state.api_key = None
             st.session_state.api_provider = None
+            st.session_state.fallback_keys = None
             st.rerun()
     
     st.markdown("## 작업을 선택하세요")
@@ -257,6 +686,28 @@ def replicate_main_selection():
         if st.button("3️⃣ 업스케일링\n\n이미지 해상도 향상\n(4K Upscaling)", key="upscale_replicate", use_container_width=True):
             st.session_state.selected_mode = "upscale"
             st.rerun()
+    
+    if st.button("📚 배치 생성\n\n옵션 조합 전체를 동시에 생성 (카탈로그용)", key="batch_replicate", use_container_width=True):
+        st.session_state.selected_mode = "batch"
+        st.rerun()
+    
+    if st.button("🔗 파이프라인\n\n생성 → 편집 → 업스케일을 한 번에 (중간 다운로드/업로드 없음)", key="pipeline_replicate", use_container_width=True):
+        st.session_state.selected_mode = "pipeline"
+        st.rerun()
+    
+    if st.button("📋 작업 목록\n\n진행 중이거나 완료된 작업 확인", key="jobs_replicate", use_container_width=True):
+        st.session_state.selected_mode = "jobs"
+        st.rerun()
+    
+    if st.button("🕘 히스토리\n\n지난 생성/편집 결과 검색", key="history_replicate", use_container_width=True):
+        st.session_state.selected_mode = "history"
+        st.rerun()
+    
+    if st.button("📈 성능 지표\n\n단계별 처리 시간 (p50/p95)", key="metrics_replicate", use_container_width=True):
+        st.session_state.selected_mode = "metrics"
+        st.rerun()
+    
+    fallback_provider_section()
 
 # Replicate 이미지 편집 서브메뉴
 def replicate_edit_submenu():
@@ -289,6 +740,17 @@ def replicate_edit_submenu():
             st.session_state.selected_mode = "color"
             st.rerun()
 
+# 이미지 생성 옵션 입력 (Google/Replicate 생성 페이지 공통)
+def generation_option_inputs():
+    options = {}
+    for section in prompts.SECTIONS:
+        st.markdown(f"### {section}")
+        for spec in prompts.OPTION_SCHEMA:
+            if spec.section == section:
+                options[spec.key] = st.selectbox(spec.label_for(options), spec.choices_for(options))
+    
+    return options
+
 # 이미지 생성 페이지 (Google)
 def generation_page_google():
     st.markdown('<div class="main-header"><h1>1️⃣ 이미지 생성</h1><span class="provider-badge badge-google">Google Gemini</span></div>', unsafe_allow_html=True)
@@ -302,129 +764,28 @@ def generation_page_google():
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        st.markdown("### 📋 모델 정보")
-        
-        age_group = st.selectbox("나이대", ["10대", "20대", "30대", "40대", "50대"])
-        gender = st.selectbox("성별", ["여성", "남성"])
-        skin_tone = st.selectbox("피부톤", ["밝은 톤", "보통 톤", "어두운 톤"])
-        
-        st.markdown("### 💇 헤어스타일")
-        
-        if gender == "여성":
-            hair_length = st.selectbox("기장", [
-                "숏컷 (pixie cut)",
-                "숏단발 (short bob)",
-                "중간머리 (shoulder length)",
-                "단발머리 (long bob)",
-                "긴머리 (long hair)"
-            ])
-        else:
-            hair_length = st.selectbox("스타일", [
-                "내린머리 (down-styled)",
-                "올린머리 (up-styled)",
-                "투블럭 (undercut)"
-            ])
-        
-        hair_texture = st.selectbox("헤어 질감", ["스트레이트", "C컬", "웨이브"])
-        hair_color = st.selectbox("헤어 컬러", [
-            "자연흑발",
-            "다크 브라운",
-            "브라운",
-            "애쉬 브라운",
-            "밝은 브라운"
-        ])
-        hair_volume = st.selectbox("볼륨감", ["볼륨있는", "자연스러운", "얇은/가벼운"])
-        bangs = st.selectbox("앞머리", ["있음", "없음", "시스루뱅"])
-        
-        st.markdown("### 📸 촬영 설정")
-        
-        shot_type = st.selectbox("샷 타입", ["헤드샷 (headshot)", "상반신 (upper body)"])
-        angle = st.selectbox("앵글", ["정면 (front view)", "45도 (3/4 view)", "측면 (side profile)"])
-        expression = st.selectbox("표정", ["무표정", "은은한 미소", "자연스러운 미소"])
-        lighting = st.selectbox("조명", ["스튜디오 조명", "자연광", "소프트 라이팅"])
-        background = st.selectbox("배경", [
-            "흰색 무지 배경",
-            "회색 무지 배경",
-            "스튜디오 배경",
-            "블러 처리된 실내"
-        ])
+        options = generation_option_inputs()
+        
+        st.markdown("### ⚙️ Gemini 설정")
+        num_images = st.slider("생성 이미지 수", 1, 4, 1, help="여러 장은 동시에 요청해서 끝나는 순서대로 표시합니다")
     
     with col2:
         st.markdown("### 🎨 생성 결과")
         
+        force_regenerate = st.checkbox("🔄 강제 재생성 (캐시 무시)", value=False, help="같은 옵션 조합의 이전 결과가 있어도 새로 생성합니다")
+        use_routing = routing_checkbox()
+        
         if st.button("🎨 이미지 생성하기", use_container_width=True, type="primary"):
-            with st.spinner("이미지 생성 중... 약 30초 소요됩니다"):
-                try:
-                    # 프롬프트 생성
-                    age_map = {"10대": "teenage", "20대": "20s", "30대": "30s", "40대": "40s", "50대": "50s"}
-                    gender_map = {"여성": "female", "남성": "male"}
-                    skin_map = {"밝은 톤": "fair skin", "보통 톤": "medium skin tone", "어두운 톤": "tan skin"}
-                    texture_map = {"스트레이트": "straight", "C컬": "soft C-curl", "웨이브": "wavy"}
-                    color_map = {
-                        "자연흑발": "natural black",
-                        "다크 브라운": "dark brown",
-                        "브라운": "brown",
-                        "애쉬 브라운": "ash brown",
-                        "밝은 브라운": "light brown"
-                    }
-                    volume_map = {"볼륨있는": "voluminous", "자연스러운": "natural", "얇은/가벼운": "flat"}
-                    bangs_map = {"있음": "with bangs", "없음": "no bangs", "시스루뱅": "with see-through bangs"}
-                    
-                    prompt = f"""
-A professional studio portrait photograph of a Korean {age_map[age_group]} {gender_map[gender]}.
-
-COMPOSITION:
-- Shot type: {shot_type}
-- Angle: {angle}
-- Expression: {expression}
-
-HAIR (PRIMARY FOCUS):
-- Style: {hair_length} {texture_map[hair_texture]} hair
-- Color: {color_map[hair_color]}
-- Volume: {volume_map[hair_volume]} volume
-- Bangs: {bangs_map[bangs]}
-
-SUBJECT DETAILS:
-- Skin tone: {skin_map[skin_tone]}
-- Clean, professional appearance
-
-TECHNICAL SETTINGS:
-- Lighting: {lighting} creating even, flattering illumination
-- Background: {background}
-- Image quality: High-resolution, sharp focus on hair details
-- Aspect ratio: Portrait orientation
-
-The final image should showcase the hairstyle clearly with professional salon-quality photography standards.
-"""
-                    
-                    # API 호출
-                    genai.configure(api_key=st.session_state.api_key)
-                    model = genai.GenerativeModel('gemini-2.5-flash-image')
-                    response = model.generate_content([prompt])
-                    
-                    # 결과 표시
-                    for part in response.candidates[0].content.parts:
-                        if part.inline_data is not None:
-                            image_data = part.inline_data.data
-                            image = Image.open(io.BytesIO(image_data))
-                            
-                            st.image(image, use_container_width=True)
-                            
-                            # 다운로드 버튼
-                            buf = io.BytesIO()
-                            image.save(buf, format="PNG")
-                            st.download_button(
-                                label="💾 이미지 다운로드",
-                                data=buf.getvalue(),
-                                file_name=f"hairstyle_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                                mime="image/png",
-                                use_container_width=True
-                            )
-                            
-                            st.success("✅ 이미지 생성 완료!")
-                
-                except Exception as e:
-                    st.error(f"❌ 오류 발생: {str(e)}")
+            st.session_state.generation_job = submit_job("generate", {
+                "provider": "google",
+                "options": options,
+                "num_outputs": num_images,
+                "force": force_regenerate,
+                "routing": use_routing
+            })
+        
+        if st.session_state.get("generation_job"):
+            poll_jobs(render_job(st.session_state.generation_job, "hairstyle"))
 
 # 이미지 생성 페이지 (Replicate)
 def generation_page_replicate():
@@ -439,134 +800,123 @@ def generation_page_replicate():
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        st.markdown("### 📋 모델 정보")
-        
-        age_group = st.selectbox("나이대", ["10대", "20대", "30대", "40대", "50대"])
-        gender = st.selectbox("성별", ["여성", "남성"])
-        skin_tone = st.selectbox("피부톤", ["밝은 톤", "보통 톤", "어두운 톤"])
-        
-        st.markdown("### 💇 헤어스타일")
-        
-        if gender == "여성":
-            hair_length = st.selectbox("기장", [
-                "숏컷 (pixie cut)",
-                "숏단발 (short bob)",
-                "중간머리 (shoulder length)",
-                "단발머리 (long bob)",
-                "긴머리 (long hair)"
-            ])
-        else:
-            hair_length = st.selectbox("스타일", [
-                "내린머리 (down-styled)",
-                "올린머리 (up-styled)",
-                "투블럭 (undercut)"
-            ])
-        
-        hair_texture = st.selectbox("헤어 질감", ["스트레이트", "C컬", "웨이브"])
-        hair_color = st.selectbox("헤어 컬러", [
-            "자연흑발",
-            "다크 브라운",
-            "브라운",
-            "애쉬 브라운",
-            "밝은 브라운"
-        ])
-        hair_volume = st.selectbox("볼륨감", ["볼륨있는", "자연스러운", "얇은/가벼운"])
-        bangs = st.selectbox("앞머리", ["있음", "없음", "시스루뱅"])
-        
-        st.markdown("### 📸 촬영 설정")
-        
-        shot_type = st.selectbox("샷 타입", ["헤드샷 (headshot)", "상반신 (upper body)"])
-        angle = st.selectbox("앵글", ["정면 (front view)", "45도 (3/4 view)", "측면 (side profile)"])
-        expression = st.selectbox("표정", ["무표정", "은은한 미소", "자연스러운 미소"])
-        lighting = st.selectbox("조명", ["스튜디오 조명", "자연광", "소프트 라이팅"])
-        background = st.selectbox("배경", [
-            "흰색 무지 배경",
-            "회색 무지 배경",
-            "스튜디오 배경",
-            "블러 처리된 실내"
-        ])
+        options = generation_option_inputs()
         
         st.markdown("### ⚙️ Seedream 설정")
-        resolution = st.selectbox("해상도", ["2K (2048x2048)", "4K (4096x4096)"], index=0)
+        resolution = st.selectbox("해상도", generation.RESOLUTIONS, index=0)
         num_images = st.slider("생성 이미지 수", 1, 4, 1)
     
     with col2:
         st.markdown("### 🎨 생성 결과")
         
+        force_regenerate = st.checkbox("🔄 강제 재생성 (캐시 무시)", value=False, help="같은 옵션 조합의 이전 결과가 있어도 새로 생성합니다")
+        use_routing = routing_checkbox()
+        
         if st.button("🎨 이미지 생성하기", use_container_width=True, type="primary"):
-            with st.spinner(f"이미지 생성 중... {num_images}개 생성 예상 시간: 약 {num_images * 10}초"):
-                try:
-                    # 프롬프트 생성
-                    age_map = {"10대": "teenage", "20대": "20s", "30대": "30s", "40대": "40s", "50대": "50s"}
-                    gender_map = {"여성": "female", "남성": "male"}
-                    skin_map = {"밝은 톤": "fair skin", "보통 톤": "medium skin tone", "어두운 톤": "tan skin"}
-                    texture_map = {"스트레이트": "straight", "C컬": "soft C-curl", "웨이브": "wavy"}
-                    color_map = {
-                        "자연흑발": "natural black",
-                        "다크 브라운": "dark brown",
-                        "브라운": "brown",
-                        "애쉬 브라운": "ash brown",
-                        "밝은 브라운": "light brown"
-                    }
-                    volume_map = {"볼륨있는": "voluminous", "자연스러운": "natural", "얇은/가벼운": "flat"}
-                    bangs_map = {"있음": "with bangs", "없음": "no bangs", "시스루뱅": "with see-through bangs"}
-                    
-                    prompt = f"""
-A professional studio portrait photograph of a Korean {age_map[age_group]} {gender_map[gender]}.
-
-COMPOSITION:
-- Shot type: {shot_type}
-- Angle: {angle}
-- Expression: {expression}
-
-HAIR (PRIMARY FOCUS):
-- Style: {hair_length} {texture_map[hair_texture]} hair
-- Color: {color_map[hair_color]}
-- Volume: {volume_map[hair_volume]} volume
-- Bangs: {bangs_map[bangs]}
-
-SUBJECT DETAILS:
-- Skin tone: {skin_map[skin_tone]}
-- Clean, professional appearance
-
-TECHNICAL SETTINGS:
-- Lighting: {lighting} creating even, flattering illumination
-- Background: {background}
-- Image quality: High-resolution, sharp focus on hair details
-- Aspect ratio: Portrait orientation
-
-The final image should showcase the hairstyle clearly with professional salon-quality photography standards.
-"""
-                    
-                    # Replicate API 호출
-                    os.environ["REPLICATE_API_TOKEN"] = st.session_state.api_key
-                    
-                    output = replicate.run(
-                        "bytedance/seedream-4",
-                        input={
-                            "prompt": prompt,
-                            "num_outputs": num_images,
-                            "aspect_ratio": "1:1",
-                            "output_format": "png"
-                        }
-                    )
-                    
-                    # 결과 표시
-                    if isinstance(output, list):
-                        for idx, image_url in enumerate(output):
-                            st.image(image_url, caption=f"생성 이미지 {idx + 1}", use_container_width=True)
-                            
-                            # 다운로드 링크
-                            st.markdown(f"[💾 이미지 {idx + 1} 다운로드]({image_url})")
-                        
-                        st.success(f"✅ {len(output)}개 이미지 생성 완료!")
-                    else:
-                        st.image(output, use_container_width=True)
-                        st.markdown(f"[💾 이미지 다운로드]({output})")
-                        st.success("✅ 이미지 생성 완료!")
-                
-                except Exception as e:
-                    st.error(f"❌ 오류 발생: {str(e)}")
+            st.session_state.generation_job = submit_job("generate", {
+                "provider": "replicate",
+                "options": options,
+                "num_outputs": num_images,
+                "resolution": resolution,
+                "force": force_regenerate,
+                "routing": use_routing
+            })
+        
+        if st.session_state.get("generation_job"):
+            poll_jobs(render_job(st.session_state.generation_job, "hairstyle"))
+
+# 배치 생성 페이지 (옵션 조합 전체를 한 번에 생성)
+def batch_page():
+    provider = st.session_state.api_provider
+    provider_badge = "badge-google" if provider == "google" else "badge-replicate"
+    provider_name = "Google Gemini" if provider == "google" else "Replicate Seedream"
+    
+    st.markdown(f'<div class="main-header"><h1>📚 배치 생성</h1><span class="provider-badge {provider_badge}">{provider_name}</span></div>', unsafe_allow_html=True)
+    
+    if st.button("⬅️ 뒤로 가기"):
+        st.session_state.selected_mode = None
+        st.rerun()
+    
+    st.markdown('<div class="info-box">💡 <b>배치 생성</b><br>선택한 옵션들의 모든 조합을 동시에 생성하고 결과를 폴더에 저장합니다. 이미 생성한 조합은 캐시에서 불러옵니다.</div>', unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        selections = {}
+        for section in prompts.SECTIONS:
+            st.markdown(f"### {section}")
+            for spec in prompts.OPTION_SCHEMA:
+                if spec.section != section:
+                    continue
+                if spec.depends_on:
+                    # 상위 옵션 값마다 첫 항목을 기본 선택
+                    label = " / ".join(dict.fromkeys(spec.label.values())) + " (성별에 맞는 항목만 적용)"
+                    default = [choices[0] for choices in spec.choices.values()]
+                else:
+                    label = spec.label
+                    default = spec.choices[:1]
+                selections[spec.key] = st.multiselect(label, spec.all_choices(), default=default)
+        
+        st.markdown("### ⚙️ 배치 설정")
+        resolution = generation.RESOLUTIONS[0]
+        if provider == "replicate":
+            resolution = st.selectbox("해상도", generation.RESOLUTIONS, index=0)
+        num_images = st.slider("조합당 이미지 수", 1, 4, 1)
+        concurrency = st.slider("동시 요청 수", 1, batch.PROVIDER_CONCURRENCY[provider], batch.PROVIDER_CONCURRENCY[provider])
+        force_regenerate = st.checkbox("🔄 강제 재생성 (캐시 무시)", value=False)
+    
+    with col2:
+        st.markdown("### 📦 배치 결과")
+        
+        combinations = batch.expand_combinations(selections)
+        st.metric("생성할 조합 수", f"{len(combinations)}개")
+        
+        if st.button("🚀 배치 생성 시작", use_container_width=True, type="primary"):
+            if not combinations:
+                st.error("❌ 각 항목에서 최소 1개 이상 선택해주세요!")
+            else:
+                st.session_state.batch_job = submit_job("batch", {
+                    "provider": provider,
+                    "combinations": combinations,
+                    "num_outputs": num_images,
+                    "resolution": resolution,
+                    "concurrency": concurrency,
+                    "force": force_regenerate
+                })
+        
+        if st.session_state.get("batch_job"):
+            poll_jobs(render_job(st.session_state.batch_job, "batch"))
+
+# 배치 작업 결과 요약 표시
+def render_batch_result(result, key_prefix):
+    st.success(f"✅ {result['succeeded']}개 조합 생성 완료! (소요 시간 {result['elapsed_seconds']:.1f}초)")
+    st.caption(f"📁 저장 위치: {result['output_dir']}")
+    if result["failed"]:
+        st.warning(f"⚠️ {result['failed']}개 조합 실패")
+        for error in result["errors"]:
+            st.caption(f"• {error}")
+    
+    with open(result["manifest_path"], "rb") as f:
+        st.download_button(
+            label="💾 manifest.json 다운로드",
+            data=f.read(),
+            file_name=f"manifest_{os.path.basename(result['output_dir'])}.json",
+            mime="application/json",
+            key=f"{key_prefix}_manifest",
+            use_container_width=True
+        )
+    
+    zip_export_section(
+        "batch_export",
+        lambda: exports.export_batch(result["output_dir"]),
+        f"batch_{os.path.basename(result['output_dir'])}.zip",
+        f"/v1/jobs/{key_prefix}/export"
+    )
+
+UPSCALE_BACKEND_NAMES = {
+    "local": "로컬 (CPU, 빠름 · 원본 유지)",
+    "replicate": "Seedream 재생성 (원격)"
+}
 
 # 업스케일링 페이지 (Replicate 전용)
 def upscale_page_replicate():
@@ -583,13 +933,17 @@ def upscale_page_replicate():
     with col1:
         st.markdown("### 📤 이미지 업로드")
         
-        input_image = st.file_uploader("업스케일할 이미지", type=['png', 'jpg', 'jpeg'], key="upscale_input")
+        input_image = upload_slot("업스케일할 이미지", "upscale_input", caption="원본 이미지")
         
         if input_image:
-            st.image(input_image, caption="원본 이미지", use_container_width=True)
-            
             st.markdown("### ⚙️ 업스케일 설정")
             scale_factor = st.selectbox("배율", ["2x", "4x"], index=1)
+            backend = st.radio(
+                "업스케일 방식",
+                list(UPSCALE_BACKEND_NAMES),
+                format_func=UPSCALE_BACKEND_NAMES.get,
+                help="로컬: 서버 CPU에서 원본 그대로 확대 (네트워크 호출 없음) / Seedream: 원격 고해상도 재생성 (세부 내용이 바뀔 수 있음)"
+            )
     
     with col2:
         st.markdown("### 🎨 업스케일 결과")
@@ -598,55 +952,69 @@ def upscale_page_replicate():
             if not input_image:
                 st.error("❌ 이미지를 업로드해주세요!")
             else:
-                with st.spinner("업스케일 중... 약 20-30초 소요됩니다"):
-                    try:
-                        # 이미지를 base64로 변환
-                        image = Image.open(input_image)
-                        buffered = io.BytesIO()
-                        image.save(buffered, format="PNG")
-                        img_str = base64.b64encode(buffered.getvalue()).decode()
-                        data_uri = f"data:image/png;base64,{img_str}"
-                        
-                        # Replicate API 호출 (업스케일 모델)
-                        os.environ["REPLICATE_API_TOKEN"] = st.session_state.api_key
-                        
-                        # Note: Seedream 4의 업스케일 기능 사용
-                        # 실제로는 별도의 upscale 모델이 필요할 수 있음
-                        st.info("ℹ️ Seedream 4.0의 고해상도 재생성 기능을 사용합니다")
-                        
-                        output = replicate.run(
-                            "bytedance/seedream-4",
-                            input={
-                                "prompt": "high quality, ultra detailed, 4K resolution",
-                                "image": data_uri,
-                                "prompt_strength": 0.3,  # 원본 유지
-                                "output_format": "png"
-                            }
-                        )
-                        
-                        # 결과 표시
-                        if isinstance(output, list):
-                            st.image(output[0], use_container_width=True)
-                            st.markdown(f"[💾 업스케일 이미지 다운로드]({output[0]})")
-                        else:
-                            st.image(output, use_container_width=True)
-                            st.markdown(f"[💾 업스케일 이미지 다운로드]({output})")
-                        
-                        st.success("✅ 업스케일 완료!")
-                    
-                    except Exception as e:
-                        st.error(f"❌ 오류 발생: {str(e)}")
-                        st.info("💡 Seedream 4.0의 업스케일 기능은 이미지 편집 모드를 사용합니다")
+                st.session_state.upscale_job = submit_job(
+                    "upscale", {"scale_factor": scale_factor, "backend": backend}, [read_upload(input_image)]
+                )
+        
+        if st.session_state.get("upscale_job"):
+            poll_jobs(render_job(st.session_state.upscale_job, "upscaled"))
+
+# 헤어 컬러 매트릭스: 메인 이미지 1장 × 여러 컬러를 동시에 편집하고 컨택트 시트로 모아 보여줌
+def color_matrix_section():
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.markdown("### 📤 이미지 업로드")
+        main_image = upload_slot("메인 이미지 (헤어스타일 유지)", "main_color_matrix", caption="메인 이미지")
+        
+        st.markdown("### 🎨 대상 컬러")
+        colors = st.multiselect("컬러 팔레트", prompts.OPTIONS["hair_color"].choices, default=prompts.OPTIONS["hair_color"].choices)
+        samples = upload_slot("컬러 샘플 이미지 (1장 = 컬러 1개, 선택)", "samples_color_matrix", caption="샘플", multiple=True)
+        st.caption(f"총 {len(colors) + len(samples)}개 컬러 · 최대 {settings.COLOR_MATRIX_CONCURRENCY}개씩 동시에 처리")
+    
+    with col2:
+        st.markdown("### 🎨 컬러 매트릭스 결과")
+        
+        if st.button("✨ 컬러 매트릭스 만들기", use_container_width=True, type="primary"):
+            if not main_image:
+                st.error("❌ 메인 이미지를 업로드해주세요!")
+            elif not colors and not samples:
+                st.error("❌ 컬러를 하나 이상 선택하거나 샘플 이미지를 올려주세요!")
+            else:
+                # 입력 이미지 순서: 메인, 컬러 샘플들
+                st.session_state.color_matrix_job = submit_job("color_matrix", {
+                    "provider": st.session_state.api_provider,
+                    "colors": colors
+                }, [read_upload(handle) for handle in [main_image] + samples])
+        
+        if st.session_state.get("color_matrix_job"):
+            poll_jobs(render_job(st.session_state.color_matrix_job, "color_matrix"))
+
+# 컬러 매트릭스 결과: 컨택트 시트 + 컬러별 이미지
+def render_color_matrix_result(job, job_id):
+    result = job["result"] or {}
+    store = artifacts.get_artifact_store()
+    if result.get("contact_sheet"):
+        sheet = store.read(result["contact_sheet"])
+        st.image(sheet, caption="컨택트 시트", use_container_width=True)
+        st.download_button("💾 컨택트 시트 다운로드", data=sheet, file_name=f"color_matrix_{job_id[:8]}.jpg",
+                           mime="image/jpeg", key=f"{job_id}_sheet", use_container_width=True)
+    
+    variants = [variant for variant in result.get("variants", []) if variant]
+    columns = st.columns(4)
+    for idx, variant in enumerate(variants):
+        with columns[idx % 4]:
+            if "artifact_id" not in variant:
+                st.caption(f"❌ {variant['label']}: {variant['error']}")
+                continue
+            st.image(get_preview_cache().preview_artifact(store, variant["artifact_id"]), caption=variant["label"], use_container_width=True)
+            ext = variant["artifact_id"].rsplit(".", 1)[-1]
+            st.download_button("💾", data=store.read(variant["artifact_id"]), file_name=f"color_{idx + 1}.{ext}",
+                               mime=IMAGE_MIME_TYPES.get(ext, "application/octet-stream"),
+                               key=f"{job_id}_variant_{idx}", use_container_width=True)
 
 # 이미지 편집 페이지 (공통 - API에 따라 다른 처리)
 def edit_page(mode):
-    mode_names = {
-        "outfit": "의상 변경",
-        "face": "얼굴 변경",
-        "background": "배경 변경",
-        "color": "헤어 컬러 변경"
-    }
-    
     mode_emojis = {
         "outfit": "👔",
         "face": "👤",
@@ -657,7 +1025,7 @@ def edit_page(mode):
     provider_badge = "badge-google" if st.session_state.api_provider == "google" else "badge-replicate"
     provider_name = "Google Gemini" if st.session_state.api_provider == "google" else "Replicate Seedream"
     
-    st.markdown(f'<div class="main-header"><h1>{mode_emojis[mode]} {mode_names[mode]}</h1><span class="provider-badge {provider_badge}">{provider_name}</span></div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="main-header"><h1>{mode_emojis[mode]} {EDIT_MODE_NAMES[mode]}</h1><span class="provider-badge {provider_badge}">{provider_name}</span></div>', unsafe_allow_html=True)
     
     if st.button("⬅️ 뒤로 가기"):
         if st.session_state.api_provider == "replicate":
@@ -668,184 +1036,131 @@ def edit_page(mode):
     
     st.markdown('<div class="warning-box">⚠️ <b>주의:</b> 헤어스타일은 메인 이미지 그대로 유지됩니다</div>', unsafe_allow_html=True)
     
+    if mode == "color" and st.toggle("🎨 컬러 매트릭스 (한 컷을 여러 컬러로 한 번에)", key="color_matrix_mode"):
+        color_matrix_section()
+        return
+    
     col1, col2 = st.columns([1, 1])
     
     with col1:
         st.markdown("### 📤 이미지 업로드")
         
-        main_image = st.file_uploader("메인 이미지 (헤어스타일 유지)", type=['png', 'jpg', 'jpeg'], key=f"main_{mode}")
+        main_image = upload_slot("메인 이미지 (헤어스타일 유지)", f"main_{mode}", caption="메인 이미지")
         
         st.markdown("**샘플 이미지 (1-3개)**")
         st.caption("💡 팁: 샘플 이미지를 2-3개 업로드하면 더 정확한 결과를 얻을 수 있습니다!")
         
-        sample1 = st.file_uploader("샘플 1 (필수)", type=['png', 'jpg', 'jpeg'], key=f"sample1_{mode}")
-        sample2 = st.file_uploader("샘플 2 (선택)", type=['png', 'jpg', 'jpeg'], key=f"sample2_{mode}")
-        sample3 = st.file_uploader("샘플 3 (선택)", type=['png', 'jpg', 'jpeg'], key=f"sample3_{mode}")
-        
-        if main_image:
-            st.image(main_image, caption="메인 이미지", use_container_width=True)
-        
         samples_col1, samples_col2, samples_col3 = st.columns(3)
         with samples_col1:
-            if sample1:
-                st.image(sample1, caption="샘플 1", use_container_width=True)
+            sample1 = upload_slot("샘플 1 (필수)", f"sample1_{mode}", caption="샘플 1")
         with samples_col2:
-            if sample2:
-                st.image(sample2, caption="샘플 2", use_container_width=True)
+            sample2 = upload_slot("샘플 2 (선택)", f"sample2_{mode}", caption="샘플 2")
         with samples_col3:
-            if sample3:
-                st.image(sample3, caption="샘플 3", use_container_width=True)
+            sample3 = upload_slot("샘플 3 (선택)", f"sample3_{mode}", caption="샘플 3")
     
     with col2:
         st.markdown("### 🎨 변경 결과")
         
-        if st.button(f"✨ {mode_names[mode]}하기", use_container_width=True, type="primary"):
+        if st.button(f"✨ {EDIT_MODE_NAMES[mode]}하기", use_container_width=True, type="primary"):
             if not main_image or not sample1:
                 st.error("❌ 메인 이미지와 샘플 1은 필수입니다!")
             else:
-                with st.spinner("이미지 변경 중... 약 30-60초 소요됩니다"):
-                    try:
-                        # 프롬프트 선택
-                        prompts = {
-                            "outfit": """
-Create a new image using:
-- The person and hairstyle from the FIRST image (main image)
-- The outfit style from the remaining sample images
-
-CRITICAL RULES:
-1. Keep the hairstyle EXACTLY as shown in the first image:
-   - Hair length, hair texture, hair color, hair volume
-   - Hair cut, bangs style, hair direction
-   - DO NOT change ANY aspect of the hair
-2. Apply the outfit style from the sample images
-3. Maintain the person's pose and facial features from the first image
-4. Keep natural lighting and professional portrait quality
-
-The result should look like the same person from the first image 
-wearing the outfit from the sample images.
-""",
-                            "face": """
-Create a new image by combining:
-- The hairstyle and outfit from the FIRST image (main image)
-- The facial features from the remaining sample images
-
-CRITICAL RULES:
-1. Keep the hairstyle from the first image EXACTLY the same:
-   - Hair length, texture, color, volume, cut, style
-   - DO NOT modify the hair in any way
-2. Replace only the facial features (eyes, nose, mouth, face shape)
-3. Keep the outfit and pose from the first image
-4. Maintain professional portrait quality and natural lighting
-
-The result should have the face from the sample images 
-with the exact hairstyle from the first image.
-""",
-                            "background": """
-Create a new image by:
-- Keeping the person EXACTLY as shown in the FIRST image (main image)
-- Replacing the background with the style from the remaining sample images
-
-CRITICAL RULES:
-1. Keep the person completely unchanged:
-   - Hairstyle, hair color, face, outfit, pose
-   - DO NOT modify ANY aspect of the subject
-2. Only change the background/environment
-3. Ensure lighting on the person matches the new background naturally
-4. Maintain professional portrait quality
-
-The result should be the exact same person in a different environment.
-""",
-                            "color": """
-Create a new image by:
-- Using the person from the FIRST image (main image)
-- Applying the hair color from the remaining sample images
-
-CRITICAL RULES:
-1. ONLY change the hair color - nothing else
-2. Keep EXACTLY the same:
-   - Hair length, texture, volume, cut, style
-   - Bangs style, hair direction, hair flow
-   - Face, outfit, background, pose
-3. Apply the color naturally with proper highlights and shadows
-4. Maintain professional portrait quality
-
-The result should be the exact same hairstyle in a different color.
-"""
-                        }
-                        
-                        prompt = prompts[mode]
-                        
-                        # API별 처리
-                        if st.session_state.api_provider == "google":
-                            # Google Gemini API
-                            main_img = Image.open(main_image)
-                            sample1_img = Image.open(sample1)
-                            
-                            images = [main_img, sample1_img]
-                            
-                            if sample2:
-                                images.append(Image.open(sample2))
-                            if sample3:
-                                images.append(Image.open(sample3))
-                            
-                            genai.configure(api_key=st.session_state.api_key)
-                            model = genai.GenerativeModel('gemini-2.5-flash-image')
-                            
-                            response = model.generate_content([prompt] + images)
-                            
-                            for part in response.candidates[0].content.parts:
-                                if part.inline_data is not None:
-                                    image_data = part.inline_data.data
-                                    result_image = Image.open(io.BytesIO(image_data))
-                                    
-                                    st.image(result_image, use_container_width=True)
-                                    
-                                    buf = io.BytesIO()
-                                    result_image.save(buf, format="PNG")
-                                    st.download_button(
-                                        label="💾 이미지 다운로드",
-                                        data=buf.getvalue(),
-                                        file_name=f"{mode}_changed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
-                                        mime="image/png",
-                                        use_container_width=True
-                                    )
-                        
-                        else:
-                            # Replicate Seedream API
-                            os.environ["REPLICATE_API_TOKEN"] = st.session_state.api_key
-                            
-                            # 이미지를 base64로 변환
-                            def image_to_data_uri(img_file):
-                                image = Image.open(img_file)
-                                buffered = io.BytesIO()
-                                image.save(buffered, format="PNG")
-                                img_str = base64.b64encode(buffered.getvalue()).decode()
-                                return f"data:image/png;base64,{img_str}"
-                            
-                            main_uri = image_to_data_uri(main_image)
-                            
-                            # Seedream은 단일 참조 이미지 사용 (가장 중요한 샘플1)
-                            output = replicate.run(
-                                "bytedance/seedream-4",
-                                input={
-                                    "prompt": prompt,
-                                    "image": main_uri,
-                                    "prompt_strength": 0.8,
-                                    "output_format": "png"
-                                }
-                            )
-                            
-                            if isinstance(output, list):
-                                st.image(output[0], use_container_width=True)
-                                st.markdown(f"[💾 이미지 다운로드]({output[0]})")
-                            else:
-                                st.image(output, use_container_width=True)
-                                st.markdown(f"[💾 이미지 다운로드]({output})")
-                        
-                        st.success(f"✅ {mode_names[mode]} 완료!")
-                    
-                    except Exception as e:
-                        st.error(f"❌ 오류 발생: {str(e)}")
+                # 입력 이미지 순서: 메인, 샘플1, 샘플2, 샘플3
+                inputs = [read_upload(handle) for handle in [main_image, sample1, sample2, sample3] if handle]
+                st.session_state[f"edit_job_{mode}"] = submit_job("edit", {
+                    "provider": st.session_state.api_provider,
+                    "mode": mode
+                }, inputs)
+        
+        if st.session_state.get(f"edit_job_{mode}"):
+            poll_jobs(render_job(st.session_state[f"edit_job_{mode}"], f"{mode}_changed"))
+
+# 파이프라인 페이지 (레시피 단계를 한 작업으로 실행, 단계 사이에는 아티팩트만 전달)
+def pipeline_page():
+    provider = st.session_state.api_provider
+    provider_badge = "badge-google" if provider == "google" else "badge-replicate"
+    provider_name = "Google Gemini" if provider == "google" else "Replicate Seedream"
+    
+    st.markdown(f'<div class="main-header"><h1>🔗 파이프라인</h1><span class="provider-badge {provider_badge}">{provider_name}</span></div>', unsafe_allow_html=True)
+    
+    if st.button("⬅️ 뒤로 가기"):
+        st.session_state.selected_mode = None
+        st.rerun()
+    
+    st.markdown('<div class="info-box">💡 <b>파이프라인</b><br>각 단계의 결과가 다음 단계 입력으로 바로 전달됩니다. 완료된 단계는 캐시되므로 뒤 단계가 실패해도 다시 실행하면 이어서 진행합니다.</div>', unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        recipe_key = st.selectbox("레시피", list(pipeline.RECIPES), format_func=lambda key: pipeline.RECIPES[key]["name"])
+        steps = pipeline.RECIPES[recipe_key]["steps"]
+        st.caption(" → ".join(pipeline.describe_step(step) for step in steps))
+        
+        options = generation_option_inputs()
+        
+        samples = []
+        if pipeline.needs_samples(steps):
+            st.markdown("### 📤 편집 샘플 이미지 (1-3개)")
+            for idx in range(3):
+                sample = upload_slot(f"샘플 {idx + 1}" + (" (필수)" if idx == 0 else " (선택)"), f"pipeline_sample{idx + 1}", caption=f"샘플 {idx + 1}")
+                if sample:
+                    samples.append(sample)
+    
+    with col2:
+        st.markdown("### 🎨 파이프라인 결과")
+        
+        force_regenerate = st.checkbox("🔄 처음부터 다시 실행 (캐시 무시)", value=False, key="pipeline_force")
+        
+        if st.button("🚀 파이프라인 실행", use_container_width=True, type="primary"):
+            if pipeline.needs_samples(steps) and not samples:
+                st.error("❌ 편집 단계에 사용할 샘플 이미지를 업로드해주세요!")
+            else:
+                st.session_state.pipeline_job = submit_job("pipeline", {
+                    "provider": provider,
+                    "steps": steps,
+                    "options": options,
+                    "force": force_regenerate
+                }, [read_upload(handle) for handle in samples])
+        
+        if st.session_state.get("pipeline_job"):
+            poll_jobs(render_job(st.session_state.pipeline_job, "pipeline"))
+
+# 성능 지표 패널 (이 서버 프로세스에서 기록된 단계별 처리 시간, 최근 샘플 기준 p50/p95)
+def metrics_page():
+    provider_badge = "badge-google" if st.session_state.api_provider == "google" else "badge-replicate"
+    provider_name = "Google Gemini" if st.session_state.api_provider == "google" else "Replicate Seedream"
+    
+    st.markdown(f'<div class="main-header"><h1>📈 성능 지표</h1><span class="provider-badge {provider_badge}">{provider_name}</span></div>', unsafe_allow_html=True)
+    
+    if st.button("⬅️ 뒤로 가기"):
+        st.session_state.selected_mode = None
+        st.rerun()
+    
+    st.markdown("---")
+    
+    registry = metrics.get_metrics()
+    rows = registry.summary()
+    if not rows:
+        st.info("💡 아직 기록된 단계가 없습니다. 생성/편집/업스케일을 실행하면 여기에 표시됩니다.")
+        return
+    
+    st.dataframe(
+        [{"단계": row["stage"], "제공자": row["provider"], "모델": row["model"], "횟수": row["count"], "실패": row["errors"],
+          "p50 (ms)": row["p50_ms"], "p95 (ms)": row["p95_ms"], "평균 크기 (KB)": row["avg_kb"]} for row in rows],
+        use_container_width=True, hide_index=True
+    )
+    st.caption(f"Prometheus 텍스트 파일: {settings.METRICS_PATH} · 추적 로그: {settings.TRACE_LOG_PATH or '사용 안 함'}")
+    circuit_names = {routing.CIRCUIT_CLOSED: "정상", routing.CIRCUIT_OPEN: "건너뛰는 중", routing.CIRCUIT_HALF_OPEN: "회복 확인 중"}
+    st.caption("자동 전환: " + " · ".join(
+        f"{name} {circuit_names[routing.get_circuit_breaker(provider).state]} (전환 대기 {routing.hedge_delay(provider):.0f}초)"
+        for provider, name in PROVIDER_NAMES.items()
+    ))
+    upload_stats = session_artifacts.get_session_artifacts().stats()
+    st.caption(f"업로드 이미지: 세션 {upload_stats['sessions']}개 · {upload_stats['entries']}장 · "
+               f"메모리 {upload_stats['memory_bytes'] / 1024 / 1024:.1f}MB · 임시 파일 {upload_stats['spilled_bytes'] / 1024 / 1024:.1f}MB")
+    
+    st.download_button("📥 Prometheus 형식으로 다운로드", registry.render_prometheus(), file_name="metrics.prom",
+                       mime="text/plain", use_container_width=True)
 
 # 메인 앱 로직
 def main():
@@ -861,6 +1176,16 @@ def main():
                 google_main_selection()
             elif st.session_state.selected_mode == "generation":
                 generation_page_google()
+            elif st.session_state.selected_mode == "batch":
+                batch_page()
+            elif st.session_state.selected_mode == "pipeline":
+                pipeline_page()
+            elif st.session_state.selected_mode == "jobs":
+                jobs_page()
+            elif st.session_state.selected_mode == "history":
+                history_page()
+            elif st.session_state.selected_mode == "metrics":
+                metrics_page()
             elif st.session_state.selected_mode in ["outfit", "face", "background", "color"]:
                 edit_page(st.session_state.selected_mode)
         
@@ -870,6 +1195,16 @@ def main():
                 replicate_main_selection()
             elif st.session_state.selected_mode == "generation":
                 generation_page_replicate()
+            elif st.session_state.selected_mode == "batch":
+                batch_page()
+            elif st.session_state.selected_mode == "pipeline":
+                pipeline_page()
+            elif st.session_state.selected_mode == "jobs":
+                jobs_page()
+            elif st.session_state.selected_mode == "history":
+                history_page()
+            elif st.session_state.selected_mode == "metrics":
+                metrics_page()
             elif st.session_state.selected_mode == "edit_menu":
                 replicate_edit_submenu()
             elif st.session_state.selected_mode == "upscale":
@@ -877,5 +1212,26 @@ def main():
             elif st.session_state.selected_mode in ["outfit", "face", "background", "color"]:
                 edit_page(st.session_state.selected_mode)
 
+# 프로세스 상태 (Streamlit 재실행과 무관하게 유지)
+@st.cache_resource
+def get_process_state():
+    return {"warm": False}
+
+# 스크립트 실행 시간 기록: 프로세스 첫 실행은 콜드 스타트로 따로 집계하고 예산을 넘으면 경고
+def record_script_run():
+    elapsed = time.perf_counter() - _script_started
+    process_state = get_process_state()
+    stage = "script_run" if process_state["warm"] else "cold_start"
+    process_state["warm"] = True
+    metrics.get_metrics().observe(stage, "", "", elapsed)
+    if stage == "cold_start" and elapsed > settings.STARTUP_BUDGET_SECONDS:
+        logging.getLogger(__name__).warning(
+            "cold start took %.2fs (budget %.2fs)", elapsed, settings.STARTUP_BUDGET_SECONDS
+        )
+
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        record_script_run()
+        sweep_session_artifacts()
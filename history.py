@@ -0,0 +1,145 @@
+# 생성/편집 히스토리
+# - 기록은 SQLite에, 이미지는 아티팩트 저장소(내용 해시)에 보관
+# - 옵션 컬럼마다 인덱스를 두어 "30대 여성 웨이브 애쉬 브라운" 같은 조건 검색을 빠르게 처리
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import settings
+from prompts import OPTION_KEYS, OPTION_SCHEMA
+
+OPTION_COLUMNS = OPTION_KEYS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mode TEXT,
+    provider TEXT NOT NULL,
+    model TEXT,
+    {option_columns},
+    prompt_hash TEXT,
+    latency_ms INTEGER,
+    from_cache INTEGER NOT NULL DEFAULT 0,
+    input_ids TEXT NOT NULL DEFAULT '[]',
+    output_ids TEXT NOT NULL DEFAULT '[]',
+    job_id TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_owner_created ON history (owner, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_history_prompt_hash ON history (prompt_hash);
+{option_indexes}
+""".format(
+    option_columns=",\n    ".join(f"{column} TEXT" for column in OPTION_COLUMNS),
+    option_indexes="\n".join(
+        f"CREATE INDEX IF NOT EXISTS idx_history_{column} ON history (owner, {column}, created_at DESC);"
+        for column in OPTION_COLUMNS
+    ),
+)
+
+# 검색어에서 찾을 옵션 값 (긴 값부터 매칭해서 "애쉬 브라운"이 "브라운"보다 먼저 잡히도록)
+_QUERY_TERMS = sorted(
+    ((value, spec.key) for spec in OPTION_SCHEMA for value in spec.all_choices()),
+    key=lambda term: -len(term[0])
+)
+
+
+# "30대 여성 웨이브 애쉬 브라운" → {"age_group": ["30대"], "gender": ["여성"], ...}
+def parse_query(text):
+    filters = {}
+    remaining = text
+    for value, column in _QUERY_TERMS:
+        # 괄호 안 영문 설명 없이 한글 이름만 입력해도 매칭 (예: "숏컷")
+        short_value = value.split(" (")[0]
+        for candidate in (value, short_value):
+            if candidate and candidate in remaining:
+                filters.setdefault(column, []).append(value)
+                remaining = remaining.replace(candidate, " ")
+                break
+    return filters
+
+
+class HistoryStore:
+    def __init__(self, db_path=settings.HISTORY_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, owner, kind, provider, output_ids, mode=None, model=None, options=None, prompt_hash=None,
+               latency_ms=None, from_cache=False, input_ids=(), job_id=None):
+        options = options or {}
+        columns = ["owner", "kind", "mode", "provider", "model", *OPTION_COLUMNS,
+                   "prompt_hash", "latency_ms", "from_cache", "input_ids", "output_ids", "job_id", "created_at"]
+        values = [owner, kind, mode, provider, model, *(options.get(column) for column in OPTION_COLUMNS),
+                  prompt_hash, latency_ms, int(from_cache), json.dumps(list(input_ids)), json.dumps(list(output_ids)),
+                  job_id, time.time()]
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT INTO history ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", values
+            )
+            return cursor.lastrowid
+
+    def _where(self, owner, filters):
+        clauses = ["owner = ?"]
+        params = [owner]
+        for column, values in (filters or {}).items():
+            if column in OPTION_COLUMNS or column in ("kind", "provider", "mode"):
+                if values:
+                    clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                    params.extend(values)
+        return " AND ".join(clauses), params
+
+    def count(self, owner, filters=None):
+        where, params = self._where(owner, filters)
+        return self._connect().execute(f"SELECT COUNT(*) FROM history WHERE {where}", params).fetchone()[0]
+
+    # 페이지 단위 조회 (최신순)
+    def search(self, owner, filters=None, limit=settings.HISTORY_PAGE_SIZE, offset=0):
+        where, params = self._where(owner, filters)
+        rows = self._connect().execute(
+            f"SELECT * FROM history WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        ).fetchall()
+        return [_entry(row) for row in rows]
+
+    # 조건에 맞는 기록 전체를 최신순으로 순회 (일괄 내보내기용)
+    # id 기준으로 페이지를 넘겨서 도중에 새 기록이 생겨도 빠지거나 겹치는 항목이 없음, 페이지마다 연결을 새로 얻어 스레드가 바뀌어도 됨
+    def iter_search(self, owner, filters=None, page_size=200):
+        where, params = self._where(owner, filters)
+        last_id = None
+        while True:
+            if last_id is None:
+                rows = self._connect().execute(
+                    f"SELECT * FROM history WHERE {where} ORDER BY id DESC LIMIT ?", (*params, page_size)
+                ).fetchall()
+            else:
+                rows = self._connect().execute(
+                    f"SELECT * FROM history WHERE {where} AND id < ? ORDER BY id DESC LIMIT ?", (*params, last_id, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _entry(row)
+            last_id = rows[-1]["id"]
+
+
+def _entry(row):
+    entry = dict(row)
+    entry["input_ids"] = json.loads(entry["input_ids"])
+    entry["output_ids"] = json.loads(entry["output_ids"])
+    entry["options"] = {column: entry[column] for column in OPTION_COLUMNS if entry[column] is not None}
+    return entry
@@ -0,0 +1,96 @@
+# 업로드 이미지 준비 (모델 입력용)
+# - 모델이 받는 형식(PNG/JPEG/WebP)이고 크기 제한 이내면 원본 bytes를 그대로 사용 (디코딩/재인코딩 없음)
+# - 그 외에는 긴 변을 모델 최대 입력 크기로 줄이고 효율적인 형식으로 변환
+# - 같은 업로드는 내용 해시로 기억해두고 재사용
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+import settings
+from metrics import span
+
+ACCEPTED_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+class PreparedImage:
+    def __init__(self, data, mime_type):
+        self.data = data
+        self.mime_type = mime_type
+
+    def to_data_uri(self):
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode()}"
+
+    # google.generativeai가 그대로 전송하는 blob 형식 (PIL Image를 넘기면 무손실 WebP로 다시 인코딩함)
+    def to_gemini_blob(self):
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def _transcode(image, max_side):
+    image = ImageOps.exif_transpose(image)
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buffered = io.BytesIO()
+    # 투명도가 있으면 PNG, 없으면 JPEG (PNG 재인코딩 대비 수 배 작음)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image.save(buffered, format="PNG", optimize=False)
+        return PreparedImage(buffered.getvalue(), "image/png")
+    image.convert("RGB").save(buffered, format="JPEG", quality=settings.UPLOAD_JPEG_QUALITY)
+    return PreparedImage(buffered.getvalue(), "image/jpeg")
+
+
+def _prepare(image_bytes, max_side):
+    # Image.open은 헤더만 읽으므로 형식/크기 확인은 전체 디코딩 없이 가능
+    image = Image.open(io.BytesIO(image_bytes))
+    orientation = image.getexif().get(0x0112, 1)
+    if image.format in ACCEPTED_FORMATS and orientation == 1 and (not max_side or max(image.size) <= max_side):
+        return PreparedImage(image_bytes, ACCEPTED_FORMATS[image.format])
+    return _transcode(image, max_side)
+
+
+class UploadPreparer:
+    def __init__(self, max_bytes=settings.UPLOAD_PREP_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, image_bytes, max_side=None):
+        cache_key = (hashlib.sha256(image_bytes).hexdigest(), max_side)
+        with self._lock:
+            prepared = self._entries.get(cache_key)
+            if prepared is not None:
+                self._entries.move_to_end(cache_key)
+                return prepared
+
+        with span("prepare_upload", nbytes=len(image_bytes)):
+            prepared = _prepare(image_bytes, max_side)
+
+        with self._lock:
+            if cache_key not in self._entries:
+                self._entries[cache_key] = prepared
+                self._total_bytes += len(prepared.data)
+                while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total_bytes -= len(evicted.data)
+        return prepared
+
+
+_default_preparer = None
+_default_preparer_lock = threading.Lock()
+
+
+def get_upload_preparer():
+    global _default_preparer
+    with _default_preparer_lock:
+        if _default_preparer is None:
+            _default_preparer = UploadPreparer()
+        return _default_preparer
+
+
+def prepare_upload(image_bytes, max_side=None):
+    return get_upload_preparer().prepare(image_bytes, max_side)
@@ -0,0 +1,225 @@
+# 백그라운드 작업 큐
+# - 작업 상태는 SQLite에, 입력/결과 이미지는 아티팩트 저장소에 저장 (새로고침/재접속 후에도 유지)
+# - 실제 API 호출은 로컬 작업자 스레드 풀에서 실행되어 Streamlit 스크립트 스레드를 막지 않음
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import settings
+from artifacts import get_artifact_store
+from backends import get_backend
+from metrics import get_metrics, span, trace
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    input_files TEXT NOT NULL DEFAULT '[]',
+    result_files TEXT NOT NULL DEFAULT '[]',
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner_created ON jobs (owner, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+"""
+
+JSON_COLUMNS = ("params", "input_files", "result_files", "result")
+
+# 작업을 실행하는 프로세스 (같은 DB를 여러 서버 프로세스가 함께 쓸 때 중단된 작업을 구분)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# API 키 자체는 저장하지 않고 해시로 작업 소유자를 구분
+def owner_id(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class JobStore:
+    def __init__(self, db_path=settings.JOB_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # 이전 버전 DB에는 worker 열이 없음
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "worker" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+
+    # sqlite3 연결은 스레드마다 따로 사용
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _row_to_job(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def create(self, job_id, owner, kind, params, input_files):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, owner, kind, status, params, input_files, created_at, worker) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, owner, kind, JOB_QUEUED, json.dumps(params, ensure_ascii=False), json.dumps(input_files), time.time(), WORKER_ID)
+            )
+
+    def update(self, job_id, **fields):
+        for column in JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column], ensure_ascii=False)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def list_for_owner(self, owner, limit=20):
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE owner = ? ORDER BY created_at DESC LIMIT ?", (owner, limit)
+        ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    # 이전 프로세스에서 끝나지 못한 작업은 실패 처리 (API 키를 저장하지 않으므로 재실행 불가)
+    # 같은 DB를 쓰는 다른 프로세스가 실행 중인 작업은 건드리지 않음 (이 호스트에서 이미 종료된 프로세스의 작업만)
+    def fail_interrupted(self):
+        host = socket.gethostname()
+        rows = self._connect().execute(
+            "SELECT id, worker FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+        ).fetchall()
+        interrupted = []
+        for row in rows:
+            worker_host, _, pid = (row["worker"] or "").rpartition(":")
+            if not row["worker"] or (worker_host == host and pid.isdigit() and not _process_alive(int(pid))):
+                interrupted.append(row["id"])
+        if not interrupted:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                [(JOB_ERROR, "서버 재시작으로 작업이 중단되었습니다", time.time(), job_id) for job_id in interrupted]
+            )
+
+
+# 작업 핸들러에 전달되는 실행 컨텍스트
+class JobContext:
+    def __init__(self, queue, job_id, owner, inputs, input_ids, fallback_keys=None):
+        self.queue = queue
+        self.job_id = job_id
+        self.owner = owner
+        self.inputs = inputs
+        self.input_ids = input_ids
+        # 다른 제공자 API 키 (제공자 → 키, 라우팅용; 작업 DB에는 저장하지 않음)
+        self.fallback_keys = fallback_keys or {}
+        self._result_files = []
+
+    # 결과를 아티팩트 저장소에 넣고 아티팩트 ID 반환
+    def add_output(self, image_data):
+        return self.add_output_id(self.queue.artifacts.put(image_data))
+
+    # 이미 아티팩트 저장소에 있는 이미지를 결과로 추가
+    def add_output_id(self, artifact_id):
+        self._result_files.append(artifact_id)
+        # 결과가 나오는 즉시 기록해서 폴링 중인 페이지가 바로 표시할 수 있게 함
+        self.queue.store.update(self.job_id, result_files=self._result_files)
+        return artifact_id
+
+    # 지금까지 추가한 결과를 버림 (라우팅 중 이미지를 넘기던 제공자가 실패했을 때)
+    def clear_outputs(self):
+        self._result_files = []
+        self.queue.store.update(self.job_id, result_files=self._result_files)
+
+    def set_progress(self, progress, message=None):
+        self.queue.store.update(self.job_id, progress=float(progress), message=message)
+
+    def set_result(self, result):
+        self.queue.store.update(self.job_id, result=result)
+
+
+class JobQueue:
+    def __init__(self, store=None, artifacts=None, max_workers=settings.JOB_WORKERS, result_cache=None, history=None):
+        self.store = store or get_backend().job_store()
+        self.artifacts = artifacts or get_artifact_store()
+        self.result_cache = result_cache
+        self.history = history
+        self.handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hairstyle-job")
+        self.store.fail_interrupted()
+
+    # handler(ctx, api_key, params)
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def submit(self, owner, kind, params, api_key, inputs=(), fallback_keys=None):
+        if kind not in self.handlers:
+            raise ValueError(f"알 수 없는 작업 종류: {kind}")
+
+        job_id = uuid.uuid4().hex
+        input_files = [self.artifacts.put(data) for data in inputs]
+        self.store.create(job_id, owner, kind, params, input_files)
+        self._executor.submit(self._run, job_id, owner, kind, params, api_key, list(inputs), input_files, fallback_keys)
+        return job_id
+
+    def _run(self, job_id, owner, kind, params, api_key, inputs, input_ids, fallback_keys=None):
+        self.store.update(job_id, status=JOB_RUNNING, started_at=time.time())
+        ctx = JobContext(self, job_id, owner, inputs, input_ids, fallback_keys)
+        # 작업 전체 시간도 단계로 기록하고, 안에서 기록되는 단계에는 작업 ID를 붙임
+        try:
+            with trace(job_id), span(f"job_{kind}", provider=params.get("provider", "")):
+                self.handlers[kind](ctx, api_key, params)
+        except Exception as e:
+            self.store.update(job_id, status=JOB_ERROR, error=str(e), finished_at=time.time())
+        else:
+            self.store.update(job_id, status=JOB_DONE, progress=1.0, finished_at=time.time())
+        finally:
+            get_metrics().maybe_write_textfile()
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def list_jobs(self, owner, limit=20):
+        return self.store.list_for_owner(owner, limit)
+
+    def read_outputs(self, job):
+        return [self.artifacts.read(artifact_id) for artifact_id in job["result_files"]]
@@ -0,0 +1,206 @@
+# 단계별 지연 시간 계측
+# - span("단계", provider=..., model=...)으로 감싼 구간의 소요 시간/데이터 크기를 기록
+# - 구조화 로그(JSON 한 줄)와 Prometheus 텍스트 형식 파일로 내보냄 (node_exporter textfile collector 등에서 수집)
+# - 최근 샘플로 p50/p95를 계산해 관리자 패널에 표시
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import settings
+
+# 히스토그램 구간 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+logger = logging.getLogger("hairstyle.trace")
+_local = threading.local()
+
+
+class Span:
+    def __init__(self, stage, provider, model, nbytes):
+        self.stage = stage
+        self.provider = provider
+        self.model = model
+        # 처리한 데이터 크기 (구간 안에서 알게 되면 갱신)
+        self.bytes = nbytes
+
+
+class _Series:
+    def __init__(self, recent_samples):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.total_bytes = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.recent = deque(maxlen=recent_samples)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self, recent_samples=settings.METRICS_RECENT_SAMPLES):
+        self.recent_samples = recent_samples
+        self._series = {}
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+
+    def observe(self, stage, provider, model, seconds, nbytes=0, error=False):
+        key = (stage, provider, model)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.recent_samples)
+            series.count += 1
+            series.errors += int(error)
+            series.total_seconds += seconds
+            series.total_bytes += nbytes
+            series.recent.append(seconds)
+            for idx, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series.buckets[idx] += 1
+                    break
+
+    # 관리자 패널용 요약 (단계별 p50/p95, 최근 샘플 기준)
+    def summary(self):
+        with self._lock:
+            items = [(key, series.count, series.errors, series.total_seconds, series.total_bytes, sorted(series.recent))
+                     for key, series in self._series.items()]
+        rows = []
+        for (stage, provider, model), count, errors, total_seconds, total_bytes, recent in sorted(items):
+            rows.append({
+                "stage": stage,
+                "provider": provider,
+                "model": model,
+                "count": count,
+                "errors": errors,
+                "p50_ms": round(_percentile(recent, 0.5) * 1000, 1),
+                "p95_ms": round(_percentile(recent, 0.95) * 1000, 1),
+                "avg_kb": round(total_bytes / count / 1024, 1),
+            })
+        return rows
+
+    # 단계 + 제공자의 최근 샘플 백분위 (초, 모델 구분 없이 합침), 샘플이 min_samples보다 적으면 None
+    def percentile(self, stage, provider, fraction, min_samples=1):
+        with self._lock:
+            recent = sorted(
+                seconds
+                for (series_stage, series_provider, _), series in self._series.items()
+                if series_stage == stage and series_provider == provider
+                for seconds in series.recent
+            )
+        if len(recent) < max(min_samples, 1):
+            return None
+        return _percentile(recent, fraction)
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP hairstyle_stage_seconds Time spent per stage",
+            "# TYPE hairstyle_stage_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted((key, series.count, series.errors, series.total_seconds, series.total_bytes, list(series.buckets))
+                           for key, series in self._series.items())
+        byte_lines = []
+        error_lines = []
+        for (stage, provider, model), count, errors, total_seconds, total_bytes, buckets in items:
+            labels = f'stage="{_label_value(stage)}",provider="{_label_value(provider)}",model="{_label_value(model)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, buckets):
+                cumulative += bucket_count
+                lines.append(f'hairstyle_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'hairstyle_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"hairstyle_stage_seconds_sum{{{labels}}} {total_seconds:.6f}")
+            lines.append(f"hairstyle_stage_seconds_count{{{labels}}} {count}")
+            byte_lines.append(f"hairstyle_stage_bytes_total{{{labels}}} {total_bytes}")
+            error_lines.append(f"hairstyle_stage_errors_total{{{labels}}} {errors}")
+        lines += ["# HELP hairstyle_stage_bytes_total Bytes processed per stage", "# TYPE hairstyle_stage_bytes_total counter"]
+        lines += byte_lines
+        lines += ["# HELP hairstyle_stage_errors_total Failed spans per stage", "# TYPE hairstyle_stage_errors_total counter"]
+        lines += error_lines
+        return "\n".join(lines) + "\n"
+
+    # 임시 파일에 쓴 뒤 교체 (수집기가 쓰다 만 파일을 읽지 않도록)
+    def write_textfile(self, path=settings.METRICS_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    # 최소 간격을 두고 파일 갱신 (작업이 끝날 때마다 호출)
+    def maybe_write_textfile(self, path=settings.METRICS_PATH, min_interval=settings.METRICS_WRITE_SECONDS):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_write < min_interval:
+                return
+            self._last_write = now
+        self.write_textfile(path)
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_metrics():
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+            if settings.TRACE_LOG_PATH and not logger.handlers:
+                os.makedirs(os.path.dirname(settings.TRACE_LOG_PATH), exist_ok=True)
+                handler = RotatingFileHandler(settings.TRACE_LOG_PATH, maxBytes=10 * 1024 * 1024, backupCount=3, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+        return _default_registry
+
+
+# 현재 스레드에서 기록되는 span에 붙일 추적 ID (작업 ID)
+@contextmanager
+def trace(trace_id):
+    previous = getattr(_local, "trace_id", None)
+    _local.trace_id = trace_id
+    try:
+        yield
+    finally:
+        _local.trace_id = previous
+
+
+@contextmanager
+def span(stage, provider="", model="", nbytes=0):
+    current = Span(stage, provider, model, nbytes)
+    started = time.perf_counter()
+    error = False
+    try:
+        yield current
+    except BaseException:
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        get_metrics().observe(stage, provider, model, elapsed, current.bytes, error)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "ts": round(time.time(), 3),
+                "trace_id": getattr(_local, "trace_id", None),
+                "stage": stage,
+                "provider": provider,
+                "model": model,
+                "duration_ms": round(elapsed * 1000, 2),
+                "bytes": current.bytes,
+                "error": error,
+            }))
@@ -0,0 +1,119 @@
+# 다단계 파이프라인: 생성 → 편집 → 업스케일을 한 작업으로 연결
+# - 단계 사이에는 아티팩트 ID만 넘기고, 다음 단계는 저장된 원본 bytes를 그대로 입력으로 사용 (다운로드/재업로드, 재인코딩 없음)
+# - 단계 결과는 (입력 아티팩트, 단계 설정) 키로 캐시: 뒤 단계가 실패해도 다시 실행하면 앞 단계는 캐시에서 바로 이어감
+import generation
+import upscaler
+from prompts import EDIT_PROMPTS, build_generation_prompt
+from result_cache import make_cache_key
+
+STEP_KINDS = ["generate", "edit", "upscale"]
+
+# 미리 정의한 레시피 (단계 목록은 JSON으로 직렬화 가능한 dict)
+RECIPES = {
+    "generate_background_upscale": {
+        "name": "생성 → 배경 변경 → 2x 업스케일",
+        "steps": [
+            {"kind": "generate"},
+            {"kind": "edit", "mode": "background"},
+            {"kind": "upscale", "scale_factor": "2x", "backend": "local"},
+        ],
+    },
+    "generate_color_upscale": {
+        "name": "생성 → 헤어 컬러 변경 → 2x 업스케일",
+        "steps": [
+            {"kind": "generate"},
+            {"kind": "edit", "mode": "color"},
+            {"kind": "upscale", "scale_factor": "2x", "backend": "local"},
+        ],
+    },
+    "generate_outfit": {
+        "name": "생성 → 의상 변경",
+        "steps": [
+            {"kind": "generate"},
+            {"kind": "edit", "mode": "outfit"},
+        ],
+    },
+    "generate_upscale": {
+        "name": "생성 → 4x 업스케일",
+        "steps": [
+            {"kind": "generate"},
+            {"kind": "upscale", "scale_factor": "4x", "backend": "local"},
+        ],
+    },
+}
+
+
+def needs_samples(steps):
+    return any(step["kind"] == "edit" for step in steps)
+
+
+# 첫 단계가 생성이 아니면 업로드한 메인 이미지에서 시작
+def starts_from_input(steps):
+    return steps[0]["kind"] != "generate"
+
+
+def validate_steps(steps, provider):
+    if not steps:
+        raise ValueError("파이프라인 단계가 없습니다")
+    for idx, step in enumerate(steps):
+        if step["kind"] not in STEP_KINDS:
+            raise ValueError(f"{idx + 1}단계: 알 수 없는 단계 '{step['kind']}'")
+        if step["kind"] == "generate" and idx > 0:
+            raise ValueError("생성 단계는 첫 단계에만 올 수 있습니다")
+        if step["kind"] == "edit" and step.get("mode") not in EDIT_PROMPTS:
+            raise ValueError(f"{idx + 1}단계: 알 수 없는 편집 유형 '{step.get('mode')}'")
+        if step["kind"] == "upscale" and step.get("backend", "local") == "replicate" and provider != "replicate":
+            raise ValueError(f"{idx + 1}단계: Seedream 업스케일은 Replicate 키에서만 사용할 수 있습니다")
+
+
+# 편집 단계는 실제로 보내는 프롬프트 전문을 키에 넣어, 프롬프트를 고치면 이전 결과를 재사용하지 않음
+def step_cache_key(provider, step, input_ids, sample_ids):
+    prompt = EDIT_PROMPTS[step["mode"]] if step["kind"] == "edit" else ""
+    params = {"step": step, "inputs": list(input_ids), "samples": list(sample_ids)}
+    return make_cache_key(provider, f"pipeline-{step['kind']}", prompt, params)
+
+
+def _run_model_step(step, provider, api_key, main_bytes, sample_bytes):
+    if step["kind"] == "edit":
+        return generation.edit_images(provider, api_key, step["mode"], main_bytes, sample_bytes)
+    factor = int(step.get("scale_factor", "2x").rstrip("x"))
+    if step.get("backend", "local") == "local":
+        return [upscaler.upscale_image_local(main_bytes, factor)]
+    return generation.upscale_image(api_key, main_bytes)
+
+
+# 단계 하나 실행 → (출력 아티팩트 ID 목록, 캐시 적중 여부)
+def run_step(step, provider, api_key, artifacts, input_ids, sample_ids=(), options=None, cache=None, force=False):
+    if step["kind"] == "generate":
+        images, from_cache = generation.generate_images(
+            provider, api_key, build_generation_prompt(options),
+            num_outputs=step.get("num_outputs", 1),
+            resolution=step.get("resolution", generation.RESOLUTIONS[0]),
+            cache=cache, force=force
+        )
+        return [artifacts.put(image_data) for image_data in images], from_cache
+
+    cache_key = step_cache_key(provider, step, input_ids, sample_ids)
+    if cache is not None and not force:
+        cached_images = cache.get(cache_key)
+        if cached_images:
+            return [artifacts.put(image_data) for image_data in cached_images], True
+
+    # 이전 단계 결과 중 첫 이미지를 다음 단계 입력으로 사용
+    main_bytes = artifacts.read(input_ids[0])
+    sample_bytes = [artifacts.read(artifact_id) for artifact_id in sample_ids]
+    images = _run_model_step(step, provider, api_key, main_bytes, sample_bytes)
+    if not images:
+        raise RuntimeError(f"{step['kind']} 단계에서 결과 이미지를 받지 못했습니다")
+    if cache is not None:
+        cache.put(cache_key, images, {"provider": provider, "step": step})
+    return [artifacts.put(image_data) for image_data in images], False
+
+
+def describe_step(step):
+    if step["kind"] == "generate":
+        return "생성"
+    if step["kind"] == "edit":
+        return {"outfit": "의상 변경", "face": "얼굴 변경", "background": "배경 변경", "color": "헤어 컬러 변경"}[step["mode"]]
+    backend = "로컬" if step.get("backend", "local") == "local" else "Seedream"
+    return f"{step.get('scale_factor', '2x')} 업스케일 ({backend})"
@@ -0,0 +1,97 @@
+# 화면 표시용 미리보기 이미지
+# - 원본은 다운로드/모델 입력에만 쓰고, 화면에는 축소한 WebP를 보냄
+# - 내용 해시별로 한 번만 만들어 디스크에 보관 (재실행/다른 세션에서도 재사용)
+# - 여러 결과를 한 장으로 모은 컨택트 시트도 여기서 만듦
+import hashlib
+import io
+import os
+import uuid
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+import settings
+from metrics import span
+
+
+class PreviewCache:
+    def __init__(self, root=settings.PREVIEW_DIR, max_side=settings.PREVIEW_MAX_SIDE, quality=settings.PREVIEW_QUALITY):
+        self.root = root
+        self.max_side = max_side
+        self.quality = quality
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}_{self.max_side}.webp")
+
+    def preview(self, image_bytes, content_hash=None):
+        content_hash = content_hash or hashlib.sha256(image_bytes).hexdigest()
+        path = self._path(content_hash)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+
+        with span("preview_render", nbytes=len(image_bytes)):
+            preview_bytes = self._render(image_bytes)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(preview_bytes)
+        os.replace(tmp_path, path)
+        return preview_bytes
+
+    # 아티팩트 ID에 이미 내용 해시가 있으므로 미리보기가 있으면 원본을 읽지 않음
+    def preview_artifact(self, artifacts, artifact_id):
+        content_hash = artifact_id.split(".")[0]
+        try:
+            with open(self._path(content_hash), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return self.preview(artifacts.read(artifact_id), content_hash)
+
+    def _render(self, image_bytes):
+        image = Image.open(io.BytesIO(image_bytes))
+        # JPEG는 디코딩 단계에서 바로 축소 (전체 해상도 디코딩 생략)
+        image.draft("RGB", (self.max_side, self.max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        buffered = io.BytesIO()
+        image.save(buffered, format="WEBP", quality=self.quality, method=4)
+        return buffered.getvalue()
+
+
+def _label_font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow 10.1 미만은 크기 지정 불가
+        return ImageFont.load_default()
+
+
+# 이미지들을 같은 크기 칸에 맞춰 격자로 배치하고 칸 아래에 라벨 표시 (JPEG)
+def make_contact_sheet(images, labels, cell_size=settings.CONTACT_SHEET_CELL_SIZE, columns=None):
+    columns = columns or min(len(images), 4)
+    rows = (len(images) + columns - 1) // columns
+    label_height = cell_size // 10
+    font = _label_font(label_height * 2 // 3)
+
+    sheet = Image.new("RGB", (columns * cell_size, rows * (cell_size + label_height)), "white")
+    draw = ImageDraw.Draw(sheet)
+    for idx, (image_bytes, label) in enumerate(zip(images, labels)):
+        image = Image.open(io.BytesIO(image_bytes))
+        image.draft("RGB", (cell_size, cell_size))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((cell_size, cell_size), Image.LANCZOS)
+
+        left = (idx % columns) * cell_size
+        top = (idx // columns) * (cell_size + label_height)
+        sheet.paste(image, (left + (cell_size - image.width) // 2, top + (cell_size - image.height) // 2))
+        draw.text((left + cell_size // 2, top + cell_size + label_height // 2), label, fill="black", font=font, anchor="mm")
+
+    buffered = io.BytesIO()
+    sheet.save(buffered, format="JPEG", quality=90)
+    return buffered.getvalue()
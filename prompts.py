@@ -0,0 +1,238 @@
+# 옵션 스키마와 프롬프트 템플릿 (생성 페이지, 배치, 히스토리 검색에서 공유)
+# - 옵션마다 라벨, 한글 선택지, 프롬프트용 영문 변환을 한 곳에서 정의
+# - 프롬프트 템플릿은 모듈 로드 시 한 번만 분해해두고 조합별 결과는 메모이즈
+import string
+from functools import lru_cache
+
+
+class OptionSpec:
+    def __init__(self, key, label, choices, section, english=None, depends_on=None):
+        self.key = key
+        # depends_on이 있으면 label/choices는 {상위 옵션 값: ...} 형태
+        self.label = label
+        self.choices = choices
+        self.section = section
+        self.english = english
+        self.depends_on = depends_on
+
+    def choices_for(self, options=None):
+        if self.depends_on is None:
+            return self.choices
+        return self.choices[options[self.depends_on]]
+
+    def label_for(self, options=None):
+        if self.depends_on is None:
+            return self.label
+        return self.label[options[self.depends_on]]
+
+    # 상위 옵션과 무관한 전체 선택지 (배치/검색용)
+    def all_choices(self):
+        if self.depends_on is None:
+            return list(self.choices)
+        return [choice for choices in self.choices.values() for choice in choices]
+
+    # 프롬프트에 들어갈 값 (영문 변환이 없으면 선택값 그대로)
+    def prompt_value(self, value):
+        return self.english[value] if self.english else value
+
+
+SECTIONS = ["📋 모델 정보", "💇 헤어스타일", "📸 촬영 설정"]
+
+OPTION_SCHEMA = [
+    OptionSpec("age_group", "나이대", ["10대", "20대", "30대", "40대", "50대"], SECTIONS[0],
+               english={"10대": "teenage", "20대": "20s", "30대": "30s", "40대": "40s", "50대": "50s"}),
+    OptionSpec("gender", "성별", ["여성", "남성"], SECTIONS[0],
+               english={"여성": "female", "남성": "male"}),
+    OptionSpec("skin_tone", "피부톤", ["밝은 톤", "보통 톤", "어두운 톤"], SECTIONS[0],
+               english={"밝은 톤": "fair skin", "보통 톤": "medium skin tone", "어두운 톤": "tan skin"}),
+    OptionSpec("hair_length", {"여성": "기장", "남성": "스타일"}, {
+        "여성": [
+            "숏컷 (pixie cut)",
+            "숏단발 (short bob)",
+            "중간머리 (shoulder length)",
+            "단발머리 (long bob)",
+            "긴머리 (long hair)"
+        ],
+        "남성": [
+            "내린머리 (down-styled)",
+            "올린머리 (up-styled)",
+            "투블럭 (undercut)"
+        ]
+    }, SECTIONS[1], depends_on="gender"),
+    OptionSpec("hair_texture", "헤어 질감", ["스트레이트", "C컬", "웨이브"], SECTIONS[1],
+               english={"스트레이트": "straight", "C컬": "soft C-curl", "웨이브": "wavy"}),
+    OptionSpec("hair_color", "헤어 컬러", ["자연흑발", "다크 브라운", "브라운", "애쉬 브라운", "밝은 브라운"], SECTIONS[1],
+               english={
+                   "자연흑발": "natural black",
+                   "다크 브라운": "dark brown",
+                   "브라운": "brown",
+                   "애쉬 브라운": "ash brown",
+                   "밝은 브라운": "light brown"
+               }),
+    OptionSpec("hair_volume", "볼륨감", ["볼륨있는", "자연스러운", "얇은/가벼운"], SECTIONS[1],
+               english={"볼륨있는": "voluminous", "자연스러운": "natural", "얇은/가벼운": "flat"}),
+    OptionSpec("bangs", "앞머리", ["있음", "없음", "시스루뱅"], SECTIONS[1],
+               english={"있음": "with bangs", "없음": "no bangs", "시스루뱅": "with see-through bangs"}),
+    OptionSpec("shot_type", "샷 타입", ["헤드샷 (headshot)", "상반신 (upper body)"], SECTIONS[2]),
+    OptionSpec("angle", "앵글", ["정면 (front view)", "45도 (3/4 view)", "측면 (side profile)"], SECTIONS[2]),
+    OptionSpec("expression", "표정", ["무표정", "은은한 미소", "자연스러운 미소"], SECTIONS[2]),
+    OptionSpec("lighting", "조명", ["스튜디오 조명", "자연광", "소프트 라이팅"], SECTIONS[2]),
+    OptionSpec("background", "배경", ["흰색 무지 배경", "회색 무지 배경", "스튜디오 배경", "블러 처리된 실내"], SECTIONS[2]),
+]
+
+OPTIONS = {spec.key: spec for spec in OPTION_SCHEMA}
+OPTION_KEYS = [spec.key for spec in OPTION_SCHEMA]
+
+GENERATION_TEMPLATE = """
+A professional studio portrait photograph of a Korean {age_group} {gender}.
+
+COMPOSITION:
+- Shot type: {shot_type}
+- Angle: {angle}
+- Expression: {expression}
+
+HAIR (PRIMARY FOCUS):
+- Style: {hair_length} {hair_texture} hair
+- Color: {hair_color}
+- Volume: {hair_volume} volume
+- Bangs: {bangs}
+
+SUBJECT DETAILS:
+- Skin tone: {skin_tone}
+- Clean, professional appearance
+
+TECHNICAL SETTINGS:
+- Lighting: {lighting} creating even, flattering illumination
+- Background: {background}
+- Image quality: High-resolution, sharp focus on hair details
+- Aspect ratio: Portrait orientation
+
+The final image should showcase the hairstyle clearly with professional salon-quality photography standards.
+"""
+
+# 템플릿을 (고정 문자열, 옵션 키) 조각으로 미리 분해
+_GENERATION_PARTS = [(literal, field) for literal, field, _, _ in string.Formatter().parse(GENERATION_TEMPLATE)]
+
+# 선택값 → 선택지 번호 (조합 키 계산용)
+_CHOICE_INDEX = {
+    spec.key: {choice: idx for idx, choice in enumerate(spec.all_choices())}
+    for spec in OPTION_SCHEMA
+}
+
+
+# 옵션 조합의 정규 키: 스키마 순서대로 선택지 번호를 이은 문자열 (예: "2.0.1.3.2.3.0.2.0.0.1.0.0")
+def option_key(options):
+    return ".".join(str(_CHOICE_INDEX[key][options[key]]) for key in OPTION_KEYS)
+
+
+def options_from_key(key):
+    indexes = [int(part) for part in key.split(".")]
+    return {spec.key: spec.all_choices()[idx] for spec, idx in zip(OPTION_SCHEMA, indexes)}
+
+
+@lru_cache(maxsize=4096)
+def _render_generation_prompt(values):
+    fields = {spec.key: spec.prompt_value(value) for spec, value in zip(OPTION_SCHEMA, values)}
+    return "".join(literal + (fields[field] if field else "") for literal, field in _GENERATION_PARTS)
+
+
+def build_generation_prompt(options):
+    return _render_generation_prompt(tuple(options[key] for key in OPTION_KEYS))
+
+
+def default_options():
+    options = {}
+    for spec in OPTION_SCHEMA:
+        options[spec.key] = spec.choices_for(options)[0]
+    return options
+
+
+# 이미지 편집 프롬프트 (메인 이미지 헤어스타일 유지)
+EDIT_PROMPTS = {
+    "outfit": """
+Create a new image using:
+- The person and hairstyle from the FIRST image (main image)
+- The outfit style from the remaining sample images
+
+CRITICAL RULES:
+1. Keep the hairstyle EXACTLY as shown in the first image:
+   - Hair length, hair texture, hair color, hair volume
+   - Hair cut, bangs style, hair direction
+   - DO NOT change ANY aspect of the hair
+2. Apply the outfit style from the sample images
+3. Maintain the person's pose and facial features from the first image
+4. Keep natural lighting and professional portrait quality
+
+The result should look like the same person from the first image 
+wearing the outfit from the sample images.
+""",
+    "face": """
+Create a new image by combining:
+- The hairstyle and outfit from the FIRST image (main image)
+- The facial features from the remaining sample images
+
+CRITICAL RULES:
+1. Keep the hairstyle from the first image EXACTLY the same:
+   - Hair length, texture, color, volume, cut, style
+   - DO NOT modify the hair in any way
+2. Replace only the facial features (eyes, nose, mouth, face shape)
+3. Keep the outfit and pose from the first image
+4. Maintain professional portrait quality and natural lighting
+
+The result should have the face from the sample images 
+with the exact hairstyle from the first image.
+""",
+    "background": """
+Create a new image by:
+- Keeping the person EXACTLY as shown in the FIRST image (main image)
+- Replacing the background with the style from the remaining sample images
+
+CRITICAL RULES:
+1. Keep the person completely unchanged:
+   - Hairstyle, hair color, face, outfit, pose
+   - DO NOT modify ANY aspect of the subject
+2. Only change the background/environment
+3. Ensure lighting on the person matches the new background naturally
+4. Maintain professional portrait quality
+
+The result should be the exact same person in a different environment.
+""",
+    "color": """
+Create a new image by:
+- Using the person from the FIRST image (main image)
+- Applying the hair color from the remaining sample images
+
+CRITICAL RULES:
+1. ONLY change the hair color - nothing else
+2. Keep EXACTLY the same:
+   - Hair length, texture, volume, cut, style
+   - Bangs style, hair direction, hair flow
+   - Face, outfit, background, pose
+3. Apply the color naturally with proper highlights and shadows
+4. Maintain professional portrait quality
+
+The result should be the exact same hairstyle in a different color.
+"""
+}
+
+# 헤어 컬러 매트릭스: 샘플 이미지 대신 컬러 이름으로 지정
+NAMED_COLOR_EDIT_TEMPLATE = """
+Create a new image by:
+- Using the person from the image (main image)
+- Changing the hair color to {hair_color}
+
+CRITICAL RULES:
+1. ONLY change the hair color - nothing else
+2. Keep EXACTLY the same:
+   - Hair length, texture, volume, cut, style
+   - Bangs style, hair direction, hair flow
+   - Face, outfit, background, pose
+3. Apply the color naturally with proper highlights and shadows
+4. Maintain professional portrait quality
+
+The result should be the exact same hairstyle in {hair_color} color.
+"""
+
+
+def build_color_edit_prompt(color_name):
+    return NAMED_COLOR_EDIT_TEMPLATE.format(hair_color=OPTIONS["hair_color"].prompt_value(color_name))
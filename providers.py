@@ -0,0 +1,137 @@
+# 제공자 클라이언트 풀
+# - API 키마다 클라이언트를 한 번만 만들어 재사용 (연결 유지, 요청마다 연결 설정 비용 없음)
+# - genai.configure / os.environ 같은 전역 상태를 쓰지 않아 동시 세션끼리 토큰이 섞이지 않음
+# - 제공자 SDK는 처음 쓸 때 import (대부분의 세션은 한 제공자만 쓰고, SDK import가 콜드 스타트의 대부분을 차지)
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
+
+import httpx
+
+import settings
+
+# 제공자별로 미리 불러올 SDK 모듈
+PROVIDER_MODULES = {
+    "google": ("google.generativeai", "google.ai.generativelanguage"),
+    "replicate": ("replicate",),
+}
+
+
+def _key_hash(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _close_quietly(client, close):
+    if close is None:
+        return
+    try:
+        close(client)
+    except Exception:
+        pass
+
+
+class ClientPool:
+    def __init__(self, max_clients=settings.CLIENT_POOL_SIZE):
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    # close(client)는 풀에서 밀려나거나 동시에 만들어져 쓰지 않게 된 클라이언트의 연결을 닫음
+    def _get_or_create(self, cache_key, factory, close=None):
+        with self._lock:
+            entry = self._clients.get(cache_key)
+            if entry is not None:
+                self._clients.move_to_end(cache_key)
+                return entry[0]
+
+        # 생성(SDK import, 채널/TLS 설정)은 잠금 밖에서 해서 다른 키의 요청을 막지 않음
+        client = factory()
+        stale = []
+        with self._lock:
+            entry = self._clients.get(cache_key)
+            if entry is not None:
+                # 다른 스레드가 먼저 넣었으면 그쪽을 쓰고 방금 만든 것은 닫음
+                self._clients.move_to_end(cache_key)
+                stale.append((client, close))
+                client = entry[0]
+            else:
+                self._clients[cache_key] = (client, close)
+                # 오래 쓰지 않은 키의 클라이언트부터 정리
+                while len(self._clients) > self.max_clients:
+                    stale.append(self._clients.popitem(last=False)[1])
+        for stale_client, stale_close in stale:
+            _close_quietly(stale_client, stale_close)
+        return client
+
+    def gemini_model(self, api_key, model_name=settings.GOOGLE_IMAGE_MODEL):
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+
+        # GenerativeModel은 클라이언트를 받는 공개 인자가 없어 내부 속성 _client에 키별 서비스 클라이언트를 넣음
+        # (0.3부터 마지막 릴리스 0.8.x까지 같은 속성, requirements.txt에서 0.9 미만으로 고정)
+        def make_model():
+            model = genai.GenerativeModel(model_name)
+            model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+            return model
+
+        return self._get_or_create(
+            ("gemini", _key_hash(api_key), model_name), make_model,
+            close=lambda model: model._client.transport.close()
+        )
+
+    def replicate_client(self, api_key):
+        import replicate
+
+        # replicate.Client는 내부 httpx.Client로 keep-alive 연결을 재사용 (close()가 없어 내부 httpx 클라이언트를 닫음)
+        return self._get_or_create(
+            ("replicate", _key_hash(api_key)),
+            lambda: replicate.Client(
+                api_token=api_key,
+                timeout=httpx.Timeout(settings.REPLICATE_HTTP_TIMEOUT_SECONDS, connect=10)
+            ),
+            close=lambda client: client._client.close()
+        )
+
+    # 결과 이미지 다운로드용 (키와 무관하게 하나를 공유)
+    def download_client(self):
+        return self._get_or_create(
+            ("download",),
+            lambda: httpx.Client(
+                timeout=httpx.Timeout(settings.DOWNLOAD_TIMEOUT_SECONDS, connect=10),
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+            ),
+            close=lambda client: client.close()
+        )
+
+
+_warmed_providers = set()
+_warm_up_lock = threading.Lock()
+
+
+# 선택한 제공자의 SDK를 백그라운드에서 미리 import (키 검증/첫 생성 요청이 import 시간을 기다리지 않게, 프로세스당 한 번)
+def warm_up(provider):
+    with _warm_up_lock:
+        if provider in _warmed_providers or provider not in PROVIDER_MODULES:
+            return
+        _warmed_providers.add(provider)
+
+    def load():
+        for module_name in PROVIDER_MODULES[provider]:
+            importlib.import_module(module_name)
+
+    threading.Thread(target=load, name=f"warm-up-{provider}", daemon=True).start()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+# 프로세스 전체에서 공유하는 기본 풀 (Streamlit 재실행과 무관하게 유지)
+def get_client_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ClientPool()
+        return _default_pool
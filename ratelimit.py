@@ -0,0 +1,255 @@
+# 제공자 호출 속도 제한 / 재시도
+# - API 키 + 모델별 토큰 버킷으로 요청 속도를 제공자 할당량 안쪽으로 유지
+# - 429/5xx/네트워크 오류는 Retry-After를 우선 따르고, 없으면 지터를 넣은 지수 백오프로 재시도
+#   비멱등 호출(예측 생성처럼 다시 보내면 유료 작업이 하나 더 생기는 호출)은 429와 요청을 보내기 전의 연결 오류만 재시도
+# - 429를 받으면 해당 버킷 속도를 절반으로 줄이고 성공할 때마다 조금씩 회복 (할당량 근처에서 수렴)
+# - 버킷 상태는 공유 상태 백엔드(backends.py)에 두어 여러 레플리카가 할당량을 함께 씀
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+import httpx
+
+import settings
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# 요청이 서버에 닿기 전에 난 연결 오류 (비멱등 호출도 다시 보내도 안전)
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# 429를 받아도 기본 속도의 이 비율 밑으로는 줄이지 않음
+MIN_RATE_FRACTION = 0.1
+# 성공 한 번마다 기본 속도의 이 비율만큼 회복
+RECOVERY_FRACTION = 0.1
+
+
+# 로컬 속도 제한 대기가 제한 시간을 넘음 (제공자는 호출하지 않았음)
+class RateLimitTimeout(TimeoutError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, requests_per_minute, burst):
+        self.max_rate = requests_per_minute / 60
+        self.burst = burst
+        self._state = {"tokens": float(burst), "rate": self.max_rate, "updated": time.time(), "blocked_until": 0.0}
+        self._lock = threading.Lock()
+
+    def _refill(self, state, now):
+        state["tokens"] = min(self.burst, state["tokens"] + max(0.0, now - state["updated"]) * state["rate"])
+        state["updated"] = now
+        return state
+
+    # fn(state, now)을 원자적으로 실행 (state는 현재 시각까지 채운 뒤 넘김, 공유 저장소 구현은 이 메서드만 바꿈)
+    def _update(self, fn):
+        with self._lock:
+            now = time.time()
+            return fn(self._refill(self._state, now), now)
+
+    # 토큰을 얻을 때까지 대기, deadline(monotonic)까지 못 얻으면 RateLimitTimeout
+    def acquire(self, deadline):
+        def take(state, now):
+            if now >= state["blocked_until"] and state["tokens"] >= 1:
+                state["tokens"] -= 1
+                return 0.0
+            return max(state["blocked_until"] - now, (1 - state["tokens"]) / state["rate"])
+
+        while True:
+            wait = self._update(take)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout("요청이 많아 제한 시간 안에 처리하지 못했습니다. 잠시 후 다시 시도해주세요.")
+            time.sleep(wait)
+
+    def throttle(self, retry_after=None):
+        def slow_down(state, now):
+            state["rate"] = max(self.max_rate * MIN_RATE_FRACTION, state["rate"] / 2)
+            state["tokens"] = min(state["tokens"], 0.0)
+            if retry_after:
+                state["blocked_until"] = max(state["blocked_until"], now + retry_after)
+
+        self._update(slow_down)
+
+    def recover(self):
+        def speed_up(state, now):
+            state["rate"] = min(self.max_rate, state["rate"] + self.max_rate * RECOVERY_FRACTION)
+
+        self._update(speed_up)
+
+
+# 토큰 버킷 상태를 SQLite 한 행에 두어 같은 호스트의 여러 프로세스(레플리카)가 할당량을 함께 씀
+class SQLiteTokenBucket(TokenBucket):
+    def __init__(self, store, bucket_key, requests_per_minute, burst):
+        super().__init__(requests_per_minute, burst)
+        self.store = store
+        self.bucket_key = bucket_key
+
+    def _update(self, fn):
+        conn = self.store.connect()
+        # BEGIN IMMEDIATE: 읽기 전에 쓰기 잠금을 잡아 다른 프로세스와 읽기-갱신을 직렬화
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, rate, updated, blocked_until FROM buckets WHERE key = ?", (self.bucket_key,)
+            ).fetchone()
+            now = time.time()
+            state = dict(zip(("tokens", "rate", "updated", "blocked_until"), row)) if row else dict(self._state, updated=now)
+            result = fn(self._refill(state, now), now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, rate, updated, blocked_until) VALUES (?, ?, ?, ?, ?)",
+                (self.bucket_key, state["tokens"], state["rate"], state["updated"], state["blocked_until"])
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+
+# 버킷 저장소: bucket(키, 분당 요청 수, burst)로 버킷을 돌려줌
+# 프로세스 안에서만 공유
+class MemoryBucketStore:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, bucket_key, requests_per_minute, burst):
+        with self._lock:
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self._buckets[bucket_key] = TokenBucket(requests_per_minute, burst)
+            return bucket
+
+
+BUCKET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+# 같은 DB 파일을 쓰는 모든 프로세스가 공유
+class SQLiteBucketStore:
+    def __init__(self, db_path=settings.RATE_LIMIT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._local = threading.local()
+        self.connect().executescript(BUCKET_SCHEMA)
+
+    # 트랜잭션은 직접 관리 (isolation_level=None)
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def bucket(self, bucket_key, requests_per_minute, burst):
+        return SQLiteTokenBucket(self, bucket_key, requests_per_minute, burst)
+
+
+def _status_of(exc):
+    # google.api_core 예외는 code, ReplicateError는 status, httpx는 response.status_code
+    for attr in ("status", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_retryable(exc, idempotent=True):
+    if isinstance(exc, UNSENT_ERRORS):
+        return True
+    if not idempotent:
+        return _status_of(exc) == 429
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return _status_of(exc) in RETRYABLE_STATUS
+
+
+# 서버가 알려준 대기 시간 (초), 없으면 None
+def retry_after_seconds(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is not None and headers.get("retry-after"):
+        try:
+            return max(float(headers["retry-after"]), 0.0)
+        except ValueError:
+            pass
+    # Gemini: google.rpc.RetryInfo
+    for detail in getattr(exc, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    # Replicate: "Request was throttled. Expected available in 3 seconds."
+    match = re.search(r"available in (\d+(?:\.\d+)?) second", getattr(exc, "detail", None) or "")
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def backoff_seconds(attempt, retry_after=None):
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    # full jitter: 동시에 실패한 요청들이 같은 시점에 다시 몰리지 않도록
+    return random.uniform(0, min(settings.PROVIDER_BACKOFF_MAX_SECONDS, settings.PROVIDER_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class RateLimiter:
+    def __init__(self, limits=None, burst=settings.RATE_LIMIT_BURST, buckets=None):
+        # 모델 ID → 분당 요청 수
+        self.limits = limits or {
+            settings.GOOGLE_IMAGE_MODEL: settings.GOOGLE_REQUESTS_PER_MINUTE,
+            settings.SEEDREAM_MODEL: settings.SEEDREAM_REQUESTS_PER_MINUTE,
+        }
+        self.burst = burst
+        self.buckets = buckets or MemoryBucketStore()
+
+    def bucket(self, api_key, model):
+        bucket_key = f"{hashlib.sha256(api_key.encode('utf-8')).hexdigest()}:{model}"
+        return self.buckets.bucket(bucket_key, self.limits[model], self.burst)
+
+    # fn()을 속도 제한 안에서 호출하고 일시적인 오류는 재시도 (idempotent=False면 is_retryable 참고)
+    def call(self, api_key, model, fn, max_attempts=settings.PROVIDER_MAX_ATTEMPTS, deadline_seconds=settings.PROVIDER_DEADLINE_SECONDS,
+             idempotent=True):
+        bucket = self.bucket(api_key, model)
+        deadline = time.monotonic() + deadline_seconds
+        for attempt in range(max_attempts):
+            bucket.acquire(deadline)
+            try:
+                result = fn()
+            except Exception as exc:
+                if not is_retryable(exc, idempotent) or attempt == max_attempts - 1:
+                    raise
+                retry_after = retry_after_seconds(exc)
+                if _status_of(exc) == 429:
+                    bucket.throttle(retry_after)
+                delay = backoff_seconds(attempt, retry_after)
+                if time.monotonic() + delay > deadline:
+                    raise
+                time.sleep(delay)
+            else:
+                bucket.recover()
+                return result
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            from backends import get_backend
+            _default_limiter = RateLimiter(buckets=get_backend().bucket_store())
+        return _default_limiter
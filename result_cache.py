@@ -0,0 +1,156 @@
+# 생성 결과 디스크 캐시
+# - 키: 제공자 + 모델 + 정규화된 프롬프트 + 생성 파라미터의 SHA-256
+# - 크기 제한을 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import settings
+
+
+def normalize_prompt(prompt):
+    # 줄바꿈/들여쓰기 차이는 같은 프롬프트로 취급
+    return " ".join(prompt.split())
+
+
+def make_cache_key(provider, model, prompt, params=None):
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "prompt": normalize_prompt(prompt),
+            "params": params or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def guess_image_ext(data):
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+
+IMAGE_MIME_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+    "bin": "application/octet-stream",
+}
+
+
+class ResultCache:
+    def __init__(self, root=settings.RESULT_CACHE_DIR, max_bytes=settings.RESULT_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, "meta.json")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            images = []
+            for name in meta["files"]:
+                with open(os.path.join(entry_dir, name), "rb") as f:
+                    images.append(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # LRU 순서 갱신 (meta.json의 mtime = 마지막 사용 시각)
+        try:
+            os.utime(meta_path, None)
+        except OSError:
+            pass
+        return images
+
+    def put(self, key, images, meta=None):
+        entry_dir = self._entry_dir(key)
+        tmp_dir = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+
+        files = []
+        for idx, data in enumerate(images):
+            name = f"{idx}.{guess_image_ext(data)}"
+            with open(os.path.join(tmp_dir, name), "wb") as f:
+                f.write(data)
+            files.append(name)
+
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"files": files, "created_at": time.time(), **(meta or {})}, f, ensure_ascii=False)
+
+        with self._lock:
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if prefix.startswith(".") or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    size = sum(e.stat().st_size for e in os.scandir(entry_dir))
+                    last_used = os.path.getmtime(os.path.join(entry_dir, "meta.json"))
+                except OSError:
+                    continue
+                entries.append((last_used, size, entry_dir))
+                total += size
+
+        entries.sort()
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+
+# 프로세스 안에서만 공유하는 캐시 (ResultCache와 같은 get/put, 공유 상태 백엔드 "memory"용)
+class MemoryResultCache:
+    def __init__(self, max_bytes=settings.RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            images = self._entries.get(key)
+            if images is None:
+                return None
+            self._entries.move_to_end(key)
+            return list(images)
+
+    def put(self, key, images, meta=None):
+        images = list(images)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= sum(len(data) for data in previous)
+            self._entries[key] = images
+            self._total_bytes += sum(len(data) for data in images)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= sum(len(data) for data in evicted)
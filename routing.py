@@ -0,0 +1,208 @@
+# 두 제공자 라우팅 (Gemini / Seedream 키를 모두 등록한 세션의 이미지 생성)
+# - 주 제공자에 먼저 보내고, 최근 지연 분포의 백분위(기본 p95) 안에 끝나지 않으면 보조 제공자에도 보냄 (hedged request)
+# - 주 제공자가 기다리는 중에 실패하면 바로 보조 제공자로 넘김 (failover)
+# - 먼저 성공한 결과를 쓰고 나머지는 기다리지 않음 (끝까지 실행되어 결과 캐시에는 남음)
+# - 연속으로 실패하는 제공자는 서킷 브레이커가 일정 시간 건너뛰고, 이후 한 번 시험 호출로 회복 여부를 확인
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import settings
+import generation
+from metrics import get_metrics
+from ratelimit import RateLimitTimeout, is_retryable
+
+# 라우팅 시도별 소요 시간 (캐시 적중 제외) → 보조 제공자 요청 시점 계산에 사용
+ATTEMPT_STAGE = "route_attempt"
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD, reset_seconds=settings.CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    # 지금 호출할 수 있는 상태인지 (상태는 바꾸지 않음, 순서를 정할 때 사용)
+    def available(self):
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            return self.state == CIRCUIT_OPEN and time.monotonic() - self.opened_at >= self.reset_seconds
+
+    # 실제로 호출하기 직전에 확인 (열린 상태에서 대기 시간이 지나면 시험 호출 하나만 허용)
+    def allow(self):
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = CIRCUIT_HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CIRCUIT_CLOSED
+            self.failures = 0
+
+    # 시험 호출이 제공자 상태를 알 수 없이 끝남 (요청 자체의 문제 등) → 다음 호출이 다시 시험하도록 되돌림
+    def release(self):
+        with self._lock:
+            if self.state == CIRCUIT_HALF_OPEN:
+                self.state = CIRCUIT_OPEN
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == CIRCUIT_HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = CIRCUIT_OPEN
+                self.opened_at = time.monotonic()
+
+
+# 제공자 장애로 볼 오류 (프롬프트 거부 같은 요청 자체의 문제, 로컬 속도 제한 대기 초과는 세지 않음)
+def is_provider_failure(exc):
+    if isinstance(exc, RateLimitTimeout):
+        return False
+    return isinstance(exc, TimeoutError) or is_retryable(exc)
+
+
+_default_breakers = {}
+_default_breakers_lock = threading.Lock()
+
+
+# 제공자별 서킷 브레이커 (프로세스 전체 공유: 제공자 장애는 키와 무관)
+def get_circuit_breaker(provider):
+    with _default_breakers_lock:
+        breaker = _default_breakers.get(provider)
+        if breaker is None:
+            breaker = _default_breakers[provider] = CircuitBreaker()
+        return breaker
+
+
+# 보조 제공자에 요청을 보내기까지 기다릴 시간 (초)
+def hedge_delay(provider):
+    seconds = get_metrics().percentile(
+        ATTEMPT_STAGE, provider, settings.ROUTING_HEDGE_PERCENTILE, min_samples=settings.ROUTING_HEDGE_MIN_SAMPLES
+    )
+    if seconds is None:
+        seconds = settings.ROUTING_HEDGE_DEFAULT_SECONDS
+    return min(settings.ROUTING_HEDGE_MAX_SECONDS, max(settings.ROUTING_HEDGE_MIN_SECONDS, seconds))
+
+
+# 브레이커가 막지 않는 제공자 순서 (모두 막혀 있으면 주 제공자로 시도)
+# 시험 호출 허용은 실제로 시도할 때 받음 (보조 제공자는 시도하지 않고 끝날 수 있음)
+def route_order(providers):
+    available = [provider for provider in providers if get_circuit_breaker(provider).available()]
+    return available or list(providers[:1])
+
+
+def _attempt(provider, api_key, prompt, num_outputs, resolution, cache, force, on_image):
+    breaker = get_circuit_breaker(provider)
+    started = time.perf_counter()
+    try:
+        images, from_cache = generation.generate_images(
+            provider, api_key, prompt,
+            num_outputs=num_outputs, resolution=resolution, cache=cache, force=force, on_image=on_image
+        )
+        if not images:
+            raise RuntimeError("결과 이미지를 받지 못했습니다")
+    except Exception as exc:
+        if is_provider_failure(exc):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        get_metrics().observe(ATTEMPT_STAGE, provider, generation.model_for(provider), time.perf_counter() - started, error=True)
+        raise
+    breaker.record_success()
+    if not from_cache:
+        get_metrics().observe(ATTEMPT_STAGE, provider, generation.model_for(provider), time.perf_counter() - started)
+    return images, from_cache
+
+
+# keys: 제공자 → API 키 (앞쪽이 주 제공자)
+# (결과를 낸 제공자, 이미지 bytes 목록, 캐시 적중 여부, 보조 제공자에도 보냈는지) 반환, 모두 실패하면 첫 오류를 올림
+# on_image는 처음 이미지를 넘긴 제공자의 것만 전달 (두 제공자의 결과가 섞이지 않게), 그 제공자의 결과를 최종 결과로 사용
+# 그 제공자가 도중에 실패하면 on_discard()를 호출하고 (이미 넘긴 이미지는 버려야 함) 다른 제공자가 처음부터 다시 넘김
+def generate_routed(keys, prompt, num_outputs=1, resolution=generation.RESOLUTIONS[0], cache=None, force=False,
+                    on_image=None, on_discard=None):
+    order = route_order(list(keys))
+    stream = {"owner": None}
+    stream_lock = threading.Lock()
+
+    def image_forwarder(provider):
+        def forward(image_data):
+            with stream_lock:
+                if stream["owner"] is None:
+                    stream["owner"] = provider
+                if stream["owner"] != provider:
+                    return
+            if on_image is not None:
+                on_image(image_data)
+        return forward
+
+    executor = ThreadPoolExecutor(max_workers=len(order), thread_name_prefix="hairstyle-route")
+    pending = {}
+    errors = []
+    finished = {}
+    next_idx = 0
+    hedged = False
+
+    # 다음 제공자 시작 (그 사이 브레이커가 막은 제공자는 건너뜀, 처음 시도는 막혀 있어도 진행), 시작했으면 True
+    def start_next():
+        nonlocal next_idx
+        while next_idx < len(order):
+            provider = order[next_idx]
+            next_idx += 1
+            if not get_circuit_breaker(provider).allow() and (pending or errors or next_idx < len(order)):
+                continue
+            future = executor.submit(
+                _attempt, provider, keys[provider], prompt, num_outputs, resolution, cache, force, image_forwarder(provider)
+            )
+            pending[future] = provider
+            return True
+        return False
+
+    try:
+        start_next()
+        hedge_at = time.monotonic() + hedge_delay(order[0])
+        while pending:
+            timeout = max(0.0, hedge_at - time.monotonic()) if next_idx < len(order) else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 주 제공자가 지연 기준을 넘김 → 보조 제공자에도 요청
+                hedged = start_next() or hedged
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    finished[provider] = future.result()
+                except Exception as exc:
+                    errors.append(exc)
+                    # 이미지를 넘기던 제공자가 실패 → 넘긴 이미지를 버리고 다른 제공자가 넘길 수 있게 함
+                    with stream_lock:
+                        if stream["owner"] == provider:
+                            stream["owner"] = None
+                            if on_discard is not None:
+                                on_discard()
+
+            with stream_lock:
+                owner = stream["owner"]
+            for provider, (images, from_cache) in finished.items():
+                if owner is None or owner == provider:
+                    return provider, images, from_cache, hedged
+
+            # 기다리던 제공자가 모두 실패 → 남은 제공자로 바로 넘김
+            if not pending and next_idx < len(order):
+                start_next()
+    finally:
+        # 진 쪽 호출은 기다리지 않음
+        executor.shutdown(wait=False)
+
+    raise errors[0]
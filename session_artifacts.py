@@ -0,0 +1,181 @@
+# 세션별 이미지 bytes 보관 (업로드 이미지)
+# - 세션 상태에는 핸들(내용 해시)만 두고 bytes는 여기서 보관 (같은 세션에서 같은 이미지는 한 번만)
+#   같은 이미지를 여러 칸에 올리면 핸들을 함께 쓰므로 put/discard 횟수를 세서 마지막 discard에서만 지움
+# - 세션별/전체 메모리 예산을 넘으면 오래 쓰지 않은 이미지부터 임시 파일로 내보내고 mmap으로 읽음
+#   임시 파일은 mmap 직후 지워서 프로세스가 죽어도 남지 않고, 내용은 OS 페이지 캐시에만 있어 메모리가 부족하면 커널이 회수
+# - 연결이 끊긴 채 유휴 시간이 지난 세션의 이미지는 sweep에서 정리
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import settings
+
+
+class _Entry:
+    def __init__(self, data):
+        self.size = len(data)
+        # 이 핸들을 가리키는 곳(업로드 칸) 수
+        self.refs = 1
+        # 메모리에 있으면 bytes, 내보냈으면 None
+        self.data = data
+        self.mmap = None
+
+    def read(self):
+        return self.data if self.data is not None else self.mmap[:]
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.data = None
+
+
+class SessionArtifactManager:
+    def __init__(self, spill_dir=settings.SESSION_SPILL_DIR, session_budget=settings.SESSION_MEMORY_BUDGET_BYTES,
+                 global_budget=settings.SESSION_MEMORY_GLOBAL_BUDGET_BYTES, idle_seconds=settings.SESSION_IDLE_SECONDS):
+        self.spill_dir = spill_dir
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.idle_seconds = idle_seconds
+        os.makedirs(self.spill_dir, exist_ok=True)
+        # 세션 ID → {핸들: 항목}
+        self._sessions = {}
+        self._last_seen = {}
+        # 메모리에 있는 항목만, 오래 쓰지 않은 순서 ((세션 ID, 핸들) → 항목)
+        self._hot = OrderedDict()
+        self._session_hot_bytes = {}
+        self._hot_bytes = 0
+        self._spilled_bytes = 0
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def put(self, session_id, data):
+        if not data:
+            raise ValueError("빈 이미지는 보관할 수 없습니다")
+        handle = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+            entries = self._sessions.setdefault(session_id, {})
+            if handle in entries:
+                entries[handle].refs += 1
+                self._mark_used(session_id, handle, entries[handle])
+                return handle
+            entry = entries[handle] = _Entry(bytes(data))
+            self._hot[(session_id, handle)] = entry
+            self._session_hot_bytes[session_id] = self._session_hot_bytes.get(session_id, 0) + entry.size
+            self._hot_bytes += entry.size
+            self._enforce_budgets(session_id)
+        return handle
+
+    # 없는 핸들이면 KeyError
+    def read(self, session_id, handle):
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+            entry = self._sessions.get(session_id, {})[handle]
+            self._mark_used(session_id, handle, entry)
+            return entry.read()
+
+    def contains(self, session_id, handle):
+        with self._lock:
+            return handle in self._sessions.get(session_id, {})
+
+    # put 한 번에 discard 한 번 (다른 칸이 아직 쓰고 있으면 남겨둠)
+    def discard(self, session_id, handle):
+        with self._lock:
+            entries = self._sessions.get(session_id, {})
+            entry = entries.get(handle)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del entries[handle]
+                self._drop(session_id, handle, entry)
+
+    def release_session(self, session_id):
+        with self._lock:
+            for handle, entry in self._sessions.pop(session_id, {}).items():
+                self._drop(session_id, handle, entry)
+            self._session_hot_bytes.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+
+    # is_active(세션 ID)가 False이고 유휴 시간이 지난 세션 정리 (재접속할 수 있는 동안은 남겨둠), 정리한 세션 수 반환
+    def sweep(self, is_active):
+        now = time.monotonic()
+        with self._lock:
+            self._last_sweep = now
+            idle = [session_id for session_id, last_seen in self._last_seen.items() if now - last_seen >= self.idle_seconds]
+        expired = [session_id for session_id in idle if not is_active(session_id)]
+        for session_id in expired:
+            self.release_session(session_id)
+        return len(expired)
+
+    # 최소 간격을 두고 sweep (스크립트 실행마다 호출)
+    def maybe_sweep(self, is_active, min_interval=60):
+        with self._lock:
+            if time.monotonic() - self._last_sweep < min_interval:
+                return 0
+        return self.sweep(is_active)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "entries": sum(len(entries) for entries in self._sessions.values()),
+                "memory_bytes": self._hot_bytes,
+                "spilled_bytes": self._spilled_bytes,
+            }
+
+    def _mark_used(self, session_id, handle, entry):
+        if entry.data is not None:
+            self._hot.move_to_end((session_id, handle))
+
+    # 세션 예산 → 전체 예산 순서로, 오래 쓰지 않은 것부터 내보냄
+    def _enforce_budgets(self, session_id):
+        if self._session_hot_bytes.get(session_id, 0) > self.session_budget:
+            for key in [key for key in self._hot if key[0] == session_id]:
+                if self._session_hot_bytes[session_id] <= self.session_budget:
+                    break
+                self._spill(*key)
+        while self._hot_bytes > self.global_budget and self._hot:
+            self._spill(*next(iter(self._hot)))
+
+    def _spill(self, session_id, handle):
+        entry = self._hot[(session_id, handle)]
+        fd, path = tempfile.mkstemp(dir=self.spill_dir, suffix=".spill")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(entry.data)
+            with open(path, "rb") as f:
+                entry.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            os.remove(path)
+        del self._hot[(session_id, handle)]
+        entry.data = None
+        self._session_hot_bytes[session_id] -= entry.size
+        self._hot_bytes -= entry.size
+        self._spilled_bytes += entry.size
+
+    def _drop(self, session_id, handle, entry):
+        if entry.data is not None:
+            del self._hot[(session_id, handle)]
+            self._session_hot_bytes[session_id] -= entry.size
+            self._hot_bytes -= entry.size
+        else:
+            self._spilled_bytes -= entry.size
+        entry.close()
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_session_artifacts():
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = SessionArtifactManager()
+        return _default_manager
@@ -0,0 +1,128 @@
+# 앱 전역 설정 (환경변수로 덮어쓸 수 있음)
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 캐시/작업/히스토리 등 로컬 데이터 저장 위치
+DATA_DIR = os.environ.get("HAIRSTYLE_DATA_DIR", os.path.join(BASE_DIR, ".hairstyle_data"))
+
+# 결과 캐시 / 작업 테이블 / 히스토리 / 속도 제한 카운터를 둘 공유 상태 백엔드 (backends.py)
+# local: DATA_DIR의 파일시스템 + SQLite (같은 호스트의 여러 레플리카가 공유), memory: 프로세스 안에서만 공유
+STATE_BACKEND = os.environ.get("HAIRSTYLE_STATE_BACKEND", "local")
+
+# 모델 ID
+GOOGLE_IMAGE_MODEL = "gemini-2.5-flash-image"
+SEEDREAM_MODEL = "bytedance/seedream-4"
+
+# 모델 입력 이미지 최대 긴 변 (이보다 크면 전송 전에 축소)
+GOOGLE_MAX_INPUT_SIDE = int(os.environ.get("HAIRSTYLE_GOOGLE_MAX_INPUT_SIDE", "3072"))
+SEEDREAM_MAX_INPUT_SIDE = int(os.environ.get("HAIRSTYLE_SEEDREAM_MAX_INPUT_SIDE", "4096"))
+
+# 생성 결과 캐시
+RESULT_CACHE_DIR = os.path.join(DATA_DIR, "results")
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("HAIRSTYLE_CACHE_MAX_MB", "2048")) * 1024 * 1024
+
+# 배치 생성 결과 저장 위치
+BATCH_OUTPUT_DIR = os.path.join(DATA_DIR, "batches")
+# 배치 생성 시 제공자별 최대 동시 요청 수 (프로세스 전체 공유)
+BATCH_GOOGLE_CONCURRENCY = int(os.environ.get("HAIRSTYLE_BATCH_GOOGLE_CONCURRENCY", "2"))
+BATCH_REPLICATE_CONCURRENCY = int(os.environ.get("HAIRSTYLE_BATCH_REPLICATE_CONCURRENCY", "4"))
+
+# 백그라운드 작업 큐
+JOB_DB_PATH = os.path.join(DATA_DIR, "jobs.db")
+JOB_WORKERS = int(os.environ.get("HAIRSTYLE_JOB_WORKERS", "4"))
+JOB_POLL_SECONDS = float(os.environ.get("HAIRSTYLE_JOB_POLL_SECONDS", "2"))
+
+# API 키별 클라이언트 풀 크기 (초과 시 오래 쓰지 않은 키부터 정리)
+CLIENT_POOL_SIZE = int(os.environ.get("HAIRSTYLE_CLIENT_POOL_SIZE", "64"))
+
+# API 키 검증 캐시
+AUTH_DB_PATH = os.path.join(DATA_DIR, "auth.db")
+AUTH_SALT_PATH = os.path.join(DATA_DIR, "auth_salt")
+AUTH_CACHE_TTL_SECONDS = int(os.environ.get("HAIRSTYLE_AUTH_CACHE_TTL", str(12 * 60 * 60)))
+AUTH_TIMEOUT_SECONDS = float(os.environ.get("HAIRSTYLE_AUTH_TIMEOUT", "5"))
+
+# 결과/입력 이미지 아티팩트 저장소
+ARTIFACT_DIR = os.path.join(DATA_DIR, "artifacts")
+DOWNLOAD_TIMEOUT_SECONDS = float(os.environ.get("HAIRSTYLE_DOWNLOAD_TIMEOUT", "120"))
+
+# 화면 표시용 미리보기
+PREVIEW_DIR = os.path.join(DATA_DIR, "previews")
+PREVIEW_MAX_SIDE = int(os.environ.get("HAIRSTYLE_PREVIEW_MAX_SIDE", "768"))
+PREVIEW_QUALITY = int(os.environ.get("HAIRSTYLE_PREVIEW_QUALITY", "80"))
+CONTACT_SHEET_CELL_SIZE = int(os.environ.get("HAIRSTYLE_CONTACT_SHEET_CELL", "512"))
+
+# 업로드 이미지 준비 (모델 입력용 변환 결과 메모리 캐시)
+UPLOAD_JPEG_QUALITY = int(os.environ.get("HAIRSTYLE_UPLOAD_JPEG_QUALITY", "92"))
+UPLOAD_PREP_CACHE_MAX_BYTES = int(os.environ.get("HAIRSTYLE_UPLOAD_PREP_CACHE_MB", "128")) * 1024 * 1024
+
+# 생성/편집 히스토리
+HISTORY_DB_PATH = os.path.join(DATA_DIR, "history.db")
+HISTORY_PAGE_SIZE = int(os.environ.get("HAIRSTYLE_HISTORY_PAGE_SIZE", "12"))
+
+# 제공자 호출 속도 제한 (API 키 + 모델별 토큰 버킷, 분당 요청 수)
+GOOGLE_REQUESTS_PER_MINUTE = float(os.environ.get("HAIRSTYLE_GOOGLE_RPM", "60"))
+SEEDREAM_REQUESTS_PER_MINUTE = float(os.environ.get("HAIRSTYLE_SEEDREAM_RPM", "120"))
+RATE_LIMIT_BURST = int(os.environ.get("HAIRSTYLE_RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_DB_PATH = os.path.join(DATA_DIR, "ratelimit.db")
+
+# Gemini 여러 장 생성 시 동시 호출 수
+GOOGLE_FANOUT_WORKERS = int(os.environ.get("HAIRSTYLE_GOOGLE_FANOUT_WORKERS", "4"))
+
+# 429/5xx 재시도 (지터를 넣은 지수 백오프, Retry-After 우선)
+PROVIDER_MAX_ATTEMPTS = int(os.environ.get("HAIRSTYLE_PROVIDER_MAX_ATTEMPTS", "4"))
+PROVIDER_BACKOFF_BASE_SECONDS = float(os.environ.get("HAIRSTYLE_PROVIDER_BACKOFF_BASE", "2"))
+PROVIDER_BACKOFF_MAX_SECONDS = float(os.environ.get("HAIRSTYLE_PROVIDER_BACKOFF_MAX", "60"))
+PROVIDER_DEADLINE_SECONDS = float(os.environ.get("HAIRSTYLE_PROVIDER_DEADLINE", "300"))
+
+# 호출별 제한 시간
+GOOGLE_CALL_TIMEOUT_SECONDS = float(os.environ.get("HAIRSTYLE_GOOGLE_CALL_TIMEOUT", "120"))
+REPLICATE_HTTP_TIMEOUT_SECONDS = float(os.environ.get("HAIRSTYLE_REPLICATE_HTTP_TIMEOUT", "30"))
+SEEDREAM_PREDICTION_TIMEOUT_SECONDS = float(os.environ.get("HAIRSTYLE_SEEDREAM_TIMEOUT", "240"))
+REPLICATE_POLL_SECONDS = float(os.environ.get("HAIRSTYLE_REPLICATE_POLL_SECONDS", "1"))
+
+# 로컬 CPU 업스케일 (타일 크기는 입력 기준 px, 작업 프로세스 수 기본값은 CPU 코어 수)
+UPSCALE_TILE_SIZE = int(os.environ.get("HAIRSTYLE_UPSCALE_TILE_SIZE", "256"))
+UPSCALE_WORKERS = int(os.environ.get("HAIRSTYLE_UPSCALE_WORKERS", str(os.cpu_count() or 1)))
+UPSCALE_SHARPEN_AMOUNT = float(os.environ.get("HAIRSTYLE_UPSCALE_SHARPEN", "0.6"))
+UPSCALE_MAX_OUTPUT_SIDE = int(os.environ.get("HAIRSTYLE_UPSCALE_MAX_SIDE", "8192"))
+
+# 헤어 컬러 매트릭스 동시 편집 수
+COLOR_MATRIX_CONCURRENCY = int(os.environ.get("HAIRSTYLE_COLOR_MATRIX_CONCURRENCY", "4"))
+
+# 단계별 지연 시간 계측 (Prometheus 텍스트 파일, JSON 한 줄 추적 로그; 로그 경로를 비우면 로그는 남기지 않음)
+METRICS_PATH = os.environ.get("HAIRSTYLE_METRICS_PATH", os.path.join(DATA_DIR, "metrics.prom"))
+METRICS_WRITE_SECONDS = float(os.environ.get("HAIRSTYLE_METRICS_WRITE_SECONDS", "15"))
+METRICS_RECENT_SAMPLES = int(os.environ.get("HAIRSTYLE_METRICS_RECENT_SAMPLES", "1000"))
+TRACE_LOG_PATH = os.environ.get("HAIRSTYLE_TRACE_LOG_PATH", os.path.join(DATA_DIR, "trace.log"))
+
+# 콜드 스타트 예산 (프로세스 첫 스크립트 실행, 모듈 import 포함): 넘으면 경고 로그, bench.py --startup은 실패 처리
+STARTUP_BUDGET_SECONDS = float(os.environ.get("HAIRSTYLE_STARTUP_BUDGET", "1.5"))
+
+# HTTP API (api.py): 업로드 크기, ?wait= 최대 대기 시간, 대기 중 상태 확인 간격, 생성 요청당 최대 이미지 수, CORS 허용 출처(쉼표 구분)
+API_MAX_UPLOAD_BYTES = int(os.environ.get("HAIRSTYLE_API_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+API_MAX_WAIT_SECONDS = float(os.environ.get("HAIRSTYLE_API_MAX_WAIT_SECONDS", "120"))
+API_POLL_SECONDS = float(os.environ.get("HAIRSTYLE_API_POLL_SECONDS", "0.25"))
+API_MAX_OUTPUTS = int(os.environ.get("HAIRSTYLE_API_MAX_OUTPUTS", "4"))
+API_CORS_ORIGINS = [origin.strip() for origin in os.environ.get("HAIRSTYLE_API_CORS_ORIGINS", "").split(",") if origin.strip()]
+
+# 두 제공자 라우팅 (두 제공자 키를 모두 등록한 세션의 이미지 생성)
+# - 주 제공자 호출이 최근 지연 분포의 이 백분위를 넘도록 끝나지 않으면 보조 제공자에도 요청 (샘플이 부족하면 기본값, 최소/최대로 제한)
+# - 연속으로 이만큼 실패한 제공자는 일정 시간 건너뜀 (서킷 브레이커)
+ROUTING_HEDGE_PERCENTILE = float(os.environ.get("HAIRSTYLE_HEDGE_PERCENTILE", "0.95"))
+ROUTING_HEDGE_MIN_SAMPLES = int(os.environ.get("HAIRSTYLE_HEDGE_MIN_SAMPLES", "20"))
+ROUTING_HEDGE_DEFAULT_SECONDS = float(os.environ.get("HAIRSTYLE_HEDGE_DEFAULT_SECONDS", "45"))
+ROUTING_HEDGE_MIN_SECONDS = float(os.environ.get("HAIRSTYLE_HEDGE_MIN_SECONDS", "5"))
+ROUTING_HEDGE_MAX_SECONDS = float(os.environ.get("HAIRSTYLE_HEDGE_MAX_SECONDS", "120"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("HAIRSTYLE_CIRCUIT_FAILURES", "3"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("HAIRSTYLE_CIRCUIT_RESET_SECONDS", "60"))
+
+# 세션별 업로드 이미지 보관 (세션/전체 메모리 예산을 넘으면 오래 쓰지 않은 것부터 임시 파일로 내보내고 mmap으로 읽음)
+# 연결이 끊긴 세션은 유휴 시간이 지나면 정리
+SESSION_MEMORY_BUDGET_BYTES = int(os.environ.get("HAIRSTYLE_SESSION_MEMORY_MB", "32")) * 1024 * 1024
+SESSION_MEMORY_GLOBAL_BUDGET_BYTES = int(os.environ.get("HAIRSTYLE_SESSION_MEMORY_GLOBAL_MB", "256")) * 1024 * 1024
+SESSION_SPILL_DIR = os.environ.get("HAIRSTYLE_SESSION_SPILL_DIR", os.path.join(DATA_DIR, "spill"))
+SESSION_IDLE_SECONDS = float(os.environ.get("HAIRSTYLE_SESSION_IDLE_SECONDS", str(15 * 60)))
+
+# 결과 일괄 내보내기 (ZIP): 화면 다운로드 버튼은 파일 전체를 메모리에 올리므로 이 크기까지만, 넘으면 HTTP API의 스트리밍 내보내기 안내
+EXPORT_UI_MAX_BYTES = int(os.environ.get("HAIRSTYLE_EXPORT_UI_MAX_MB", "50")) * 1024 * 1024
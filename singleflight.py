@@ -0,0 +1,65 @@
+# 동일 요청 합치기 (single-flight)
+# - 같은 키의 요청이 진행 중이면 새로 호출하지 않고 그 결과를 함께 기다림
+# - 세션/작업 스레드가 달라도 같은 프로세스 안에서는 공유 (프리셋 조합을 여러 명이 동시에 누르는 경우)
+# - 먼저 시작한 호출이 실패하면 같은 scope(예: 같은 API 키)로 기다리던 요청만 같은 예외를 받고,
+#   scope가 다른 요청은 직접 다시 시도 (잘못된 키/할당량 초과 같은 호출자별 실패를 남에게 넘기지 않음)
+import threading
+
+
+class _Call:
+    def __init__(self, scope):
+        self.done = threading.Event()
+        self.scope = scope
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    # (결과, 다른 요청의 결과를 받았는지) 반환
+    def do(self, key, fn, scope=None):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call(scope)
+                    self._calls[key] = call
+
+            if leader:
+                break
+            call.done.wait()
+            if call.error is None:
+                return call.result, True
+            if call.scope == scope:
+                raise call.error
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+_default_flight = None
+_default_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    global _default_flight
+    with _default_flight_lock:
+        if _default_flight is None:
+            _default_flight = SingleFlight()
+        return _default_flight
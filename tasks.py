@@ -0,0 +1,249 @@
+# 작업 큐 핸들러: 생성 / 편집 / 헤어 컬러 매트릭스 / 업스케일(원격, 로컬) / 배치 / 파이프라인
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import settings
+import generation
+import batch
+import pipeline
+import previews
+import prompts
+import routing
+import upscaler
+from jobs import JobQueue
+
+
+def _record_history(ctx, kind, provider, output_ids, started, model=None, **fields):
+    if ctx.queue.history is None or not output_ids:
+        return
+    ctx.queue.history.record(
+        ctx.owner, kind, provider, output_ids,
+        model=model or generation.model_for(provider),
+        latency_ms=int((time.time() - started) * 1000),
+        job_id=ctx.job_id,
+        **fields
+    )
+
+
+def handle_generate(ctx, api_key, params):
+    ctx.set_progress(0.1, "이미지 생성 중...")
+    started = time.time()
+    provider = params["provider"]
+    num_outputs = params.get("num_outputs", 1)
+    resolution = params.get("resolution", generation.RESOLUTIONS[0])
+    prompt = prompts.build_generation_prompt(params["options"])
+    output_ids = []
+
+    # 준비된 이미지부터 바로 결과에 추가 (페이지가 폴링하면서 하나씩 표시)
+    def on_image(image_data):
+        output_ids.append(ctx.add_output(image_data))
+        ctx.set_progress(0.1 + 0.9 * len(output_ids) / num_outputs, f"{len(output_ids)}/{num_outputs} 이미지 완료")
+
+    def on_discard():
+        output_ids.clear()
+        ctx.clear_outputs()
+
+    # 다른 제공자 키도 있으면 지연/장애 시 그쪽으로 보냄 (결과를 낸 제공자로 기록)
+    fallback_keys = {name: key for name, key in ctx.fallback_keys.items() if name != provider}
+    if params.get("routing") and fallback_keys:
+        provider, images, from_cache, hedged = routing.generate_routed(
+            {params["provider"]: api_key, **fallback_keys}, prompt,
+            num_outputs=num_outputs,
+            resolution=resolution,
+            cache=ctx.queue.result_cache,
+            force=params.get("force", False),
+            on_image=on_image,
+            on_discard=on_discard
+        )
+        ctx.set_result({"from_cache": from_cache, "provider": provider, "hedged": hedged})
+    else:
+        images, from_cache = generation.generate_images(
+            provider, api_key, prompt,
+            num_outputs=num_outputs,
+            resolution=resolution,
+            cache=ctx.queue.result_cache,
+            force=params.get("force", False),
+            on_image=on_image
+        )
+        ctx.set_result({"from_cache": from_cache})
+    output_ids.extend(ctx.add_output(image_data) for image_data in images[len(output_ids):])
+    _record_history(
+        ctx, "generate", provider, output_ids, started,
+        options=params["options"],
+        prompt_hash=generation.generation_cache_key(provider, prompt, generation.generation_params(provider, num_outputs, resolution)),
+        from_cache=from_cache
+    )
+
+
+# 입력 이미지 순서: 메인, 샘플1, 샘플2, 샘플3
+def handle_edit(ctx, api_key, params):
+    ctx.set_progress(0.1, "이미지 변경 중...")
+    started = time.time()
+    main_bytes, sample_bytes = ctx.inputs[0], ctx.inputs[1:]
+    images = generation.edit_images(params["provider"], api_key, params["mode"], main_bytes, sample_bytes)
+    output_ids = [ctx.add_output(image_data) for image_data in images]
+    _record_history(ctx, "edit", params["provider"], output_ids, started, mode=params["mode"], input_ids=ctx.input_ids)
+
+
+def handle_upscale(ctx, api_key, params):
+    started = time.time()
+    factor = int(params.get("scale_factor", "4x").rstrip("x"))
+    if params.get("backend", "replicate") == "local":
+        ctx.set_progress(0.1, f"로컬 업스케일 중 ({factor}x)...")
+        output_ids = [ctx.add_output(upscaler.upscale_image_local(ctx.inputs[0], factor))]
+        _record_history(ctx, "upscale", "local", output_ids, started, model=f"lanczos-unsharp-{factor}x", input_ids=ctx.input_ids)
+        return
+
+    ctx.set_progress(0.1, "업스케일 중...")
+    output_ids = [ctx.add_output(image_data) for image_data in generation.upscale_image(api_key, ctx.inputs[0])]
+    _record_history(ctx, "upscale", "replicate", output_ids, started, input_ids=ctx.input_ids)
+
+
+def handle_batch(ctx, api_key, params):
+    output_dir = os.path.join(settings.BATCH_OUTPUT_DIR, datetime.now().strftime('%Y%m%d_%H%M%S') + f"_{ctx.job_id[:8]}")
+
+    def on_progress(done, total, entry):
+        ctx.set_progress(done / total, f"{done}/{total} 완료")
+        if entry["status"] == "ok" and ctx.queue.history is not None:
+            output_ids = []
+            for name in entry["files"]:
+                with open(os.path.join(output_dir, name), "rb") as f:
+                    output_ids.append(ctx.queue.artifacts.put(f.read()))
+            ctx.queue.history.record(
+                ctx.owner, "generate", params["provider"], output_ids,
+                model=generation.model_for(params["provider"]),
+                options=entry["options"],
+                prompt_hash=entry["cache_key"],
+                latency_ms=int(entry["elapsed_seconds"] * 1000),
+                from_cache=entry.get("from_cache", False),
+                job_id=ctx.job_id
+            )
+
+    manifest = batch.run_batch(
+        params["provider"], api_key, params["combinations"], output_dir,
+        num_outputs=params.get("num_outputs", 1),
+        resolution=params.get("resolution", generation.RESOLUTIONS[0]),
+        concurrency=params.get("concurrency"),
+        cache=ctx.queue.result_cache,
+        force=params.get("force", False),
+        progress_callback=on_progress
+    )
+    failed = [entry for entry in manifest["items"] if entry["status"] != "ok"]
+    ctx.set_result({
+        "output_dir": output_dir,
+        "manifest_path": os.path.join(output_dir, batch.MANIFEST_FILE),
+        "succeeded": len(manifest["items"]) - len(failed),
+        "failed": len(failed),
+        "errors": [entry["error"] for entry in failed[:10]],
+        "elapsed_seconds": manifest["elapsed_seconds"],
+    })
+
+
+# 입력 이미지 순서: 메인, 그 다음 컬러 샘플 (샘플 1장 = 컬러 1개)
+def handle_color_matrix(ctx, api_key, params):
+    provider = params["provider"]
+    started = time.time()
+    # (화면 라벨, 컨택트 시트 라벨, 프롬프트, 샘플 이미지)
+    targets = [
+        (name, prompts.OPTIONS["hair_color"].prompt_value(name), prompts.build_color_edit_prompt(name), [])
+        for name in params.get("colors", [])
+    ]
+    targets += [
+        (f"샘플 {idx + 1}", f"sample {idx + 1}", prompts.EDIT_PROMPTS["color"], [sample])
+        for idx, sample in enumerate(ctx.inputs[1:])
+    ]
+    if not targets:
+        raise ValueError("컬러를 하나 이상 선택하거나 샘플 이미지를 올려주세요")
+
+    # 메인 이미지는 한 번만 준비/업로드해서 모든 변형에 재사용
+    ctx.set_progress(0.05, "메인 이미지 준비 중...")
+    main_ref = generation.prepare_edit_main(provider, api_key, ctx.inputs[0], upload=len(targets) > 1)
+
+    variants = [None] * len(targets)
+    done = 0
+    with ThreadPoolExecutor(max_workers=min(len(targets), settings.COLOR_MATRIX_CONCURRENCY)) as executor:
+        futures = {
+            executor.submit(generation.edit_with_main, provider, api_key, prompt, main_ref, samples): idx
+            for idx, (_, _, prompt, samples) in enumerate(targets)
+        }
+        for future in as_completed(futures):
+            idx = futures[future]
+            label = targets[idx][0]
+            try:
+                images = future.result()
+                if not images:
+                    raise RuntimeError("결과 이미지를 받지 못했습니다")
+            except Exception as e:
+                variants[idx] = {"label": label, "error": str(e)}
+            else:
+                artifact_id = ctx.add_output(images[0])
+                variants[idx] = {"label": label, "artifact_id": artifact_id}
+                _record_history(ctx, "edit", provider, [artifact_id], started, mode="color", input_ids=ctx.input_ids[:1])
+            done += 1
+            ctx.set_progress(0.05 + 0.9 * done / len(targets), f"{done}/{len(targets)} 컬러 완료")
+            ctx.set_result({"variants": variants})
+
+    succeeded = [(variant, targets[idx][1]) for idx, variant in enumerate(variants) if "artifact_id" in variant]
+    if not succeeded:
+        raise RuntimeError(variants[0]["error"])
+
+    sheet = previews.make_contact_sheet(
+        [ctx.queue.artifacts.read(variant["artifact_id"]) for variant, _ in succeeded],
+        [sheet_label for _, sheet_label in succeeded]
+    )
+    ctx.set_result({"variants": variants, "contact_sheet": ctx.queue.artifacts.put(sheet)})
+
+
+# 입력 이미지 순서: (생성으로 시작하지 않으면) 메인, 그 다음 편집용 샘플
+def handle_pipeline(ctx, api_key, params):
+    provider = params["provider"]
+    steps = params["steps"]
+    pipeline.validate_steps(steps, provider)
+
+    if pipeline.starts_from_input(steps):
+        current_ids, sample_ids = ctx.input_ids[:1], ctx.input_ids[1:]
+    else:
+        current_ids, sample_ids = [], ctx.input_ids
+
+    step_results = []
+    for idx, step in enumerate(steps):
+        ctx.set_progress(idx / len(steps), f"{idx + 1}/{len(steps)} {pipeline.describe_step(step)} 중...")
+        started = time.time()
+        input_ids = current_ids
+        current_ids, from_cache = pipeline.run_step(
+            step, provider, api_key, ctx.queue.artifacts, input_ids, sample_ids,
+            options=params.get("options"),
+            cache=ctx.queue.result_cache,
+            force=params.get("force", False)
+        )
+        step_results.append({"step": step, "outputs": current_ids, "from_cache": from_cache})
+        ctx.set_result({"steps": step_results})
+
+        # 캐시에서 이어받은 단계는 히스토리에 다시 남기지 않음
+        if from_cache:
+            continue
+        if step["kind"] == "generate":
+            _record_history(ctx, "generate", provider, current_ids, started, options=params.get("options"))
+        elif step["kind"] == "edit":
+            _record_history(ctx, "edit", provider, current_ids, started, mode=step["mode"], input_ids=input_ids[:1] + sample_ids)
+        elif step.get("backend", "local") == "local":
+            _record_history(ctx, "upscale", "local", current_ids, started,
+                            model=f"lanczos-unsharp-{step.get('scale_factor', '2x')}", input_ids=input_ids[:1])
+        else:
+            _record_history(ctx, "upscale", "replicate", current_ids, started, input_ids=input_ids[:1])
+
+    for artifact_id in current_ids:
+        ctx.add_output_id(artifact_id)
+
+
+def create_job_queue(result_cache=None, history=None):
+    queue = JobQueue(result_cache=result_cache, history=history)
+    queue.register("generate", handle_generate)
+    queue.register("edit", handle_edit)
+    queue.register("upscale", handle_upscale)
+    queue.register("batch", handle_batch)
+    queue.register("pipeline", handle_pipeline)
+    queue.register("color_matrix", handle_color_matrix)
+    return queue
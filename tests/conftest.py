@@ -0,0 +1,8 @@
+# 테스트는 임시 데이터 폴더를 쓰고 저장소 루트의 모듈을 바로 import
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("HAIRSTYLE_DATA_DIR", tempfile.mkdtemp(prefix="hairstyle-test-"))
+os.environ.setdefault("HAIRSTYLE_TRACE_LOG_PATH", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
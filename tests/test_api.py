@@ -0,0 +1,85 @@
+import pytest
+from starlette.testclient import TestClient
+
+import api
+import auth
+import jobs
+
+HEADERS = {"X-Provider": "google", "Authorization": "Bearer test-key"}
+
+
+class FakeQueue:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, owner, kind, params, api_key, inputs=(), fallback_keys=None):
+        self.submitted.append((kind, params))
+        return f"job-{len(self.submitted)}"
+
+    def get(self, job_id):
+        return {
+            "id": job_id, "owner": jobs.owner_id("test-key"), "kind": "generate", "status": jobs.JOB_QUEUED,
+            "progress": 0.0, "message": None, "error": None, "result_files": [], "result": None,
+            "created_at": 0.0, "finished_at": None,
+        }
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    fake = FakeQueue()
+    monkeypatch.setattr(api, "_job_queue", fake)
+    monkeypatch.setattr(auth, "verify_api_key", lambda provider, api_key, cache: (api_key == "test-key", "잘못된 키"))
+    return fake
+
+
+@pytest.fixture
+def client():
+    return TestClient(api.create_app(), raise_server_exceptions=False)
+
+
+def test_generate_queues_job_and_points_to_status(queue, client):
+    response = client.post("/v1/generate", headers=HEADERS, json={"options": {"gender": "여성"}, "num_outputs": 2})
+    assert response.status_code == 202
+    assert response.headers["location"].endswith("/v1/jobs/job-1")
+    kind, params = queue.submitted[0]
+    assert kind == "generate" and params["num_outputs"] == 2 and params["options"]["gender"] == "여성"
+
+
+@pytest.mark.parametrize("query, body", [
+    ("?wait=abc", {}),
+    ("?wait=-1", {}),
+    ("?wait=nan", {}),
+    ("?format=png", {}),
+    ("", {"num_outputs": True}),
+    ("", {"num_outputs": 0}),
+    ("", {"force": "false"}),
+    ("", {"options": ["여성"]}),
+    ("", {"options": {"gender": "외계인"}}),
+    ("", {"options": {"unknown": "x"}}),
+])
+def test_invalid_requests_are_rejected_before_queueing(queue, client, query, body):
+    response = client.post(f"/v1/generate{query}", headers=HEADERS, json=body)
+    assert response.status_code == 400
+    assert "error" in response.json()
+    assert queue.submitted == []
+
+
+def test_authentication_is_required(queue, client):
+    assert client.post("/v1/generate", json={}).status_code == 400
+    assert client.post("/v1/generate", headers={"X-Provider": "google"}, json={}).status_code == 401
+    assert client.post("/v1/generate", headers={**HEADERS, "Authorization": "Bearer wrong"}, json={}).status_code == 401
+    assert queue.submitted == []
+
+
+def test_other_owners_jobs_are_hidden(queue, client, monkeypatch):
+    monkeypatch.setattr(FakeQueue, "get", lambda self, job_id: {"owner": "someone-else"})
+    assert client.get("/v1/jobs/job-1", headers=HEADERS).status_code == 404
+
+
+def test_internal_errors_are_not_reported_as_client_errors(queue, client, monkeypatch):
+    def broken_submit(*args, **kwargs):
+        raise ValueError("버그")
+    monkeypatch.setattr(queue, "submit", broken_submit)
+    response = client.post("/v1/generate", headers=HEADERS, json={})
+    assert response.status_code == 500
+    assert "버그" not in response.text
@@ -0,0 +1,58 @@
+import os
+
+import httpx
+import pytest
+
+from artifacts import ArtifactStore
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def _tmp_files(store):
+    return os.listdir(os.path.join(store.root, ".tmp"))
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    data = PNG_HEADER + b"x" * 100
+
+    artifact_id = store.put(data)
+    # 헤더가 여러 청크에 걸쳐 와도 같은 ID와 확장자
+    assert store.put_chunks([data[:1], data[1:3], data[3:]]) == artifact_id
+    assert artifact_id.endswith(".png")
+    assert store.read(artifact_id) == data
+    assert os.listdir(os.path.dirname(store.path(artifact_id))) == [artifact_id]
+    assert _tmp_files(store) == []
+
+
+def test_failed_stream_leaves_no_partial_file(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+
+    def chunks():
+        yield PNG_HEADER
+        raise ConnectionError("끊김")
+
+    with pytest.raises(ConnectionError):
+        store.put_chunks(chunks())
+    assert _tmp_files(store) == []
+    assert sorted(os.listdir(store.root)) == [".tmp"]
+
+
+def test_mirror_urls_keeps_input_order(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    bodies = {f"/out/{idx}.png": PNG_HEADER + bytes([idx]) * 10 for idx in range(3)}
+
+    def handler(request):
+        if request.url.path not in bodies:
+            return httpx.Response(404)
+        return httpx.Response(200, content=bodies[request.url.path])
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    urls = [f"https://example.test{path}" for path in bodies]
+
+    artifact_ids = store.mirror_urls(urls, client)
+
+    assert [store.read(artifact_id) for artifact_id in artifact_ids] == list(bodies.values())
+    with pytest.raises(httpx.HTTPStatusError):
+        store.mirror_url("https://example.test/missing.png", client)
+    assert _tmp_files(store) == []
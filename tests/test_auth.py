@@ -0,0 +1,72 @@
+import os
+import sqlite3
+
+import httpx
+import pytest
+import replicate
+
+import auth
+
+
+@pytest.fixture
+def key_cache(tmp_path):
+    return auth.VerifiedKeyCache(os.path.join(tmp_path, "auth.db"), os.path.join(tmp_path, "auth.salt"), ttl=60)
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    calls = []
+    results = {"good": (True, None), "bad": (False, "유효하지 않은 API 토큰입니다")}
+
+    def fake_check(api_key, timeout):
+        calls.append(api_key)
+        return results[api_key]
+
+    monkeypatch.setattr(auth, "_check_replicate", fake_check)
+    return calls
+
+
+def test_verified_key_skips_provider_call_until_expiry(key_cache, checks, monkeypatch):
+    assert auth.verify_api_key("replicate", "good", key_cache) == (True, None)
+    assert auth.verify_api_key("replicate", "good", key_cache) == (True, None)
+    assert checks == ["good"]
+
+    # 같은 키라도 제공자가 다르면 따로 검증
+    assert not key_cache.is_verified("google", "good")
+
+    now = auth.time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + 61)
+    auth.verify_api_key("replicate", "good", key_cache)
+    assert checks == ["good", "good"]
+
+
+def test_rejected_key_is_not_cached(key_cache, checks):
+    assert auth.verify_api_key("replicate", "bad", key_cache) == (False, "유효하지 않은 API 토큰입니다")
+    assert auth.verify_api_key("replicate", "bad", key_cache)[0] is False
+    assert checks == ["bad", "bad"]
+
+
+def test_cache_stores_only_salted_hashes(tmp_path, key_cache):
+    key_cache.mark_verified("replicate", "r8_secret_token")
+
+    rows = sqlite3.connect(os.path.join(tmp_path, "auth.db")).execute("SELECT key_hash FROM verified_keys").fetchall()
+    assert len(rows) == 1
+    assert "r8_secret_token" not in rows[0][0]
+    other = auth.VerifiedKeyCache(os.path.join(tmp_path, "other.db"), os.path.join(tmp_path, "other.salt"))
+    assert other._hash("replicate", "r8_secret_token") != rows[0][0]
+
+
+@pytest.mark.parametrize("status, expected", [
+    (401, (False, "유효하지 않은 API 토큰입니다")),
+    (200, (True, None)),
+])
+def test_replicate_check_maps_account_lookup(monkeypatch, status, expected):
+    def handler(request):
+        assert request.url.path == "/v1/account"
+        body = {"detail": "Unauthenticated"} if status == 401 else {"type": "user", "username": "me", "name": "Me"}
+        return httpx.Response(status, json=body)
+
+    client_class = replicate.Client
+    monkeypatch.setattr(replicate, "Client", lambda **kwargs: client_class(**kwargs, transport=httpx.MockTransport(handler)))
+
+    assert auth.verify_api_key("replicate", "token") == expected
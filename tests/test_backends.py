@@ -0,0 +1,79 @@
+import threading
+
+import backends
+import ratelimit
+
+
+def test_memory_backend_handles_concurrent_job_and_history_writes():
+    backend = backends.MemoryBackend()
+    job_store = backend.job_store()
+    history_store = backend.history_store()
+    errors = []
+
+    def work(worker):
+        try:
+            for idx in range(50):
+                job_id = f"{worker}-{idx}"
+                job_store.create(job_id, "owner", "generate", {}, [])
+                job_store.update(job_id, progress=0.5, message="진행 중")
+                assert job_store.get(job_id)["progress"] == 0.5
+                history_store.record("owner", "generate", "google", ["a.png"], options={"gender": "여성"})
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert history_store.count("owner") == 400
+    assert history_store.count("owner", {"gender": ["여성"]}) == 400
+
+
+def test_memory_backends_do_not_share_state():
+    first, second = backends.MemoryBackend(), backends.MemoryBackend()
+    first.history_store().record("owner", "generate", "google", ["a.png"])
+    assert second.history_store().count("owner") == 0
+    assert first.job_store() is first.job_store()
+
+
+def test_create_backend_rejects_unknown_name():
+    try:
+        backends.create_backend("redis")
+    except ValueError as exc:
+        assert "redis" in str(exc)
+    else:
+        raise AssertionError("ValueError가 나야 함")
+
+
+def test_non_idempotent_calls_retry_only_429(monkeypatch):
+    monkeypatch.setattr(ratelimit, "backoff_seconds", lambda attempt, retry_after=None: 0)
+    limiter = ratelimit.RateLimiter(limits={"model": 6000}, buckets=ratelimit.MemoryBucketStore())
+
+    class StatusError(Exception):
+        def __init__(self, status):
+            super().__init__(status)
+            self.status = status
+
+    def flaky(status):
+        attempts = []
+
+        def fn():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise StatusError(status)
+            return "ok"
+        return fn, attempts
+
+    fn, attempts = flaky(500)
+    try:
+        limiter.call("key", "model", fn, idempotent=False)
+    except StatusError:
+        pass
+    assert len(attempts) == 1
+
+    fn, attempts = flaky(429)
+    assert limiter.call("key", "model", fn, idempotent=False) == "ok"
+    fn, attempts = flaky(500)
+    assert limiter.call("key", "model", fn) == "ok" and len(attempts) == 2
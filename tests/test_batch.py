@@ -0,0 +1,41 @@
+import batch
+from prompts import OPTION_KEYS, OPTIONS
+
+
+def _single_selections():
+    return {key: spec.all_choices()[:1] for key, spec in OPTIONS.items()}
+
+
+def test_expand_combinations_is_cartesian_product_in_schema_order():
+    selections = _single_selections()
+    selections["age_group"] = ["20대", "30대"]
+    selections["gender"] = ["여성"]
+    selections["hair_length"] = OPTIONS["hair_length"].choices_for({"gender": "여성"})[:2]
+    selections["hair_color"] = OPTIONS["hair_color"].all_choices()[:2]
+
+    combinations = batch.expand_combinations(selections)
+
+    assert len(combinations) == 2 * 2 * 2
+    assert all(list(options) == OPTION_KEYS for options in combinations)
+    assert len({tuple(options.values()) for options in combinations}) == len(combinations)
+
+
+def test_expand_combinations_pairs_lengths_with_matching_gender():
+    female_lengths = OPTIONS["hair_length"].choices_for({"gender": "여성"})
+    male_lengths = OPTIONS["hair_length"].choices_for({"gender": "남성"})
+    selections = _single_selections()
+    selections["gender"] = ["여성", "남성"]
+    selections["hair_length"] = [female_lengths[0], male_lengths[0]]
+
+    combinations = batch.expand_combinations(selections)
+
+    assert [(options["gender"], options["hair_length"]) for options in combinations] == [
+        ("여성", female_lengths[0]), ("남성", male_lengths[0])
+    ]
+
+
+def test_expand_combinations_empty_selection_yields_nothing():
+    selections = _single_selections()
+    selections["hair_color"] = []
+
+    assert batch.expand_combinations(selections) == []
@@ -0,0 +1,94 @@
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+import generation
+import jobs
+import prompts
+import settings
+import tasks
+from artifacts import ArtifactStore
+
+
+def _png(color):
+    buffered = io.BytesIO()
+    Image.new("RGB", (40, 60), color).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = jobs.JobQueue(jobs.JobStore(os.path.join(tmp_path, "jobs.db")), ArtifactStore(os.path.join(tmp_path, "artifacts")))
+    queue.register("color_matrix", tasks.handle_color_matrix)
+    return queue
+
+
+@pytest.fixture
+def edits(monkeypatch):
+    calls = {"prepare": [], "edit": []}
+
+    def fake_prepare(provider, api_key, main_bytes, upload=False):
+        calls["prepare"].append(upload)
+        return "main-ref"
+
+    def fake_edit(provider, api_key, prompt, main_ref, sample_bytes=()):
+        assert main_ref == "main-ref"
+        calls["edit"].append((prompt, list(sample_bytes)))
+        if "fail" in prompt:
+            raise RuntimeError("편집 실패")
+        return [_png("red" if sample_bytes else "blue")]
+
+    monkeypatch.setattr(generation, "prepare_edit_main", fake_prepare)
+    monkeypatch.setattr(generation, "edit_with_main", fake_edit)
+    return calls
+
+
+def _run(queue, colors, samples=()):
+    job_id = queue.submit("me", "color_matrix", {"provider": "google", "colors": colors}, "key",
+                          inputs=[_png("white"), *samples])
+    deadline = time.monotonic() + 5
+    while queue.get(job_id)["status"] in jobs.ACTIVE_STATUSES:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def test_variants_share_one_prepared_main_and_keep_target_order(queue, edits, monkeypatch):
+    colors = prompts.OPTIONS["hair_color"].all_choices()[:2]
+    monkeypatch.setattr(prompts, "build_color_edit_prompt", lambda name: "fail" if name == colors[1] else f"dye {name}")
+
+    job = _run(queue, colors, samples=[_png("green")])
+
+    assert job["status"] == jobs.JOB_DONE
+    assert edits["prepare"] == [True]
+    variants = job["result"]["variants"]
+    assert [variant["label"] for variant in variants] == [colors[0], colors[1], "샘플 1"]
+    assert variants[1] == {"label": colors[1], "error": "편집 실패"}
+    assert sorted(job["result_files"]) == sorted([variants[0]["artifact_id"], variants[2]["artifact_id"]])
+    # 샘플 이미지는 해당 변형에만 전달
+    assert [len(samples) for prompt, samples in edits["edit"] if prompt == prompts.EDIT_PROMPTS["color"]] == [1]
+
+    sheet = Image.open(io.BytesIO(queue.artifacts.read(job["result"]["contact_sheet"])))
+    cell = settings.CONTACT_SHEET_CELL_SIZE
+    assert sheet.format == "JPEG"
+    assert sheet.size == (2 * cell, cell + cell // 10)
+
+
+def test_all_variants_failing_fails_the_job(queue, edits, monkeypatch):
+    monkeypatch.setattr(prompts, "build_color_edit_prompt", lambda name: "fail")
+
+    job = _run(queue, prompts.OPTIONS["hair_color"].all_choices()[:1])
+
+    assert (job["status"], job["error"]) == (jobs.JOB_ERROR, "편집 실패")
+    # 변형이 하나면 업로드 없이 메인을 바로 사용
+    assert edits["prepare"] == [False]
+
+
+def test_requires_a_color_or_sample(queue, edits):
+    job = _run(queue, [])
+
+    assert job["status"] == jobs.JOB_ERROR
+    assert edits["prepare"] == []
@@ -0,0 +1,39 @@
+import io
+import json
+import os
+import zipfile
+
+import exports
+import history
+from artifacts import ArtifactStore
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def test_history_export_streams_images_and_manifest(tmp_path):
+    store = history.HistoryStore(os.path.join(tmp_path, "history.db"))
+    artifact_store = ArtifactStore(os.path.join(tmp_path, "artifacts"))
+    for idx in range(3):
+        artifact_id = artifact_store.put(PNG_HEADER + bytes([idx]) * (exports.CHUNK_SIZE + 10))
+        store.record("me", "generate", "google", [artifact_id], options={"gender": "여성" if idx else "남성"})
+
+    chunks = exports.export_history(store, artifact_store, "me", {"gender": ["여성"]})
+    # 첫 청크는 ZIP 전체를 만들기 전에 나옴
+    assert len(next(chunks)) <= exports.CHUNK_SIZE + 1024
+    buffer = io.BytesIO()
+    chunks = exports.export_history(store, artifact_store, "me", {"gender": ["여성"]})
+    exports.write_zip(chunks, buffer)
+
+    archive = zipfile.ZipFile(buffer)
+    assert archive.testzip() is None
+    assert archive.namelist() == ["images/generate_3_1.png", "images/generate_2_1.png", "manifest.csv", "manifest.json"]
+    rows = json.loads(archive.read("manifest.json"))
+    assert [row["gender"] for row in rows] == ["여성", "여성"]
+    assert archive.read("manifest.csv").decode("utf-8-sig").splitlines()[0].startswith("file,history_id")
+
+
+def test_write_zip_stops_at_limit(tmp_path):
+    path = os.path.join(tmp_path, "image.png")
+    with open(path, "wb") as f:
+        f.write(PNG_HEADER + b"x" * 4096)
+    assert exports.write_zip(exports.iter_zip([("image.png", path)]), io.BytesIO(), max_bytes=1024) is None
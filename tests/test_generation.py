@@ -0,0 +1,84 @@
+import httpx
+import pytest
+
+import generation
+import ratelimit
+import settings
+
+
+class FakePrediction:
+    def __init__(self, reloads):
+        # reloads: reload()마다 (상태, 결과) 또는 올릴 예외
+        self.reloads = list(reloads)
+        self.status = "starting"
+        self.output = None
+        self.canceled = 0
+
+    def reload(self):
+        step = self.reloads.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        self.status, self.output = step
+
+    def cancel(self):
+        self.canceled += 1
+        raise httpx.ConnectError("취소 요청도 실패")
+
+
+@pytest.fixture
+def seedream(monkeypatch):
+    holder = {}
+
+    class Predictions:
+        def create(self, model, input):
+            return holder["prediction"]
+
+    class Client:
+        class models:
+            predictions = Predictions()
+
+    class Pool:
+        def replicate_client(self, api_key):
+            return Client()
+
+    monkeypatch.setattr(generation, "get_client_pool", lambda: Pool())
+    monkeypatch.setattr(generation, "get_rate_limiter",
+                        lambda: ratelimit.RateLimiter(limits={settings.SEEDREAM_MODEL: 6000}, buckets=ratelimit.MemoryBucketStore()))
+    monkeypatch.setattr(generation, "backoff_seconds", lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(settings, "REPLICATE_POLL_SECONDS", 0)
+
+    def run(reloads, on_output=None):
+        holder["prediction"] = FakePrediction(reloads)
+        return holder["prediction"], lambda: generation._run_seedream("key", {"prompt": "p"}, on_output=on_output)
+    return run
+
+
+def transient():
+    return httpx.ReadTimeout("잠깐 끊김", request=httpx.Request("GET", "https://api.replicate.com"))
+
+
+def test_transient_poll_errors_are_retried_and_outputs_stream(seedream):
+    streamed = []
+    prediction, call = seedream([
+        ("processing", ["u1"]),
+        transient(),
+        ("succeeded", ["u1", "u2"]),
+    ], on_output=streamed.append)
+    assert call() == ["u1", "u2"]
+    assert streamed == ["u1", "u2"]
+    assert prediction.canceled == 0
+
+
+def test_permanent_poll_error_cancels_prediction_and_keeps_original_error(seedream):
+    prediction, call = seedream([("processing", None), PermissionError("401")])
+    with pytest.raises(PermissionError):
+        call()
+    assert prediction.canceled == 1
+
+
+def test_timeout_cancels_and_raises_timeout_even_if_cancel_fails(seedream, monkeypatch):
+    monkeypatch.setattr(settings, "SEEDREAM_PREDICTION_TIMEOUT_SECONDS", 0)
+    prediction, call = seedream([])
+    with pytest.raises(TimeoutError):
+        call()
+    assert prediction.canceled == 1
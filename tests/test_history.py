@@ -0,0 +1,36 @@
+import os
+
+import history
+
+
+def test_parse_query_matches_korean_option_names():
+    filters = history.parse_query("30대 여성 웨이브 애쉬 브라운")
+    assert filters == {"age_group": ["30대"], "gender": ["여성"], "hair_texture": ["웨이브"], "hair_color": ["애쉬 브라운"]}
+
+
+def test_parse_query_prefers_longest_value_and_short_names():
+    # "애쉬 브라운"이 "브라운"으로 잡히지 않아야 함
+    assert history.parse_query("애쉬 브라운")["hair_color"] == ["애쉬 브라운"]
+    assert history.parse_query("브라운")["hair_color"] == ["브라운"]
+    # 괄호 안 영문 없이 한글만 입력
+    assert history.parse_query("숏컷")["hair_length"] == ["숏컷 (pixie cut)"]
+    assert history.parse_query("xyz") == {}
+    assert history.parse_query("") == {}
+
+
+def test_search_and_iter_search(tmp_path):
+    store = history.HistoryStore(os.path.join(tmp_path, "history.db"))
+    for idx in range(5):
+        store.record("me", "generate", "google", [f"{idx}.png"], options={"gender": "여성" if idx % 2 else "남성"})
+    store.record("other", "generate", "google", ["x.png"], options={"gender": "여성"})
+
+    assert store.count("me") == 5
+    assert store.count("me", {"gender": ["여성"]}) == 2
+    assert [entry["output_ids"] for entry in store.search("me", limit=2)] == [["4.png"], ["3.png"]]
+
+    entries = store.iter_search("me", page_size=2)
+    first = next(entries)
+    # 순회 중에 새로 기록해도 빠지거나 겹치지 않음
+    store.record("me", "generate", "google", ["new.png"])
+    rest = list(entries)
+    assert [entry["output_ids"][0] for entry in [first, *rest]] == ["4.png", "3.png", "2.png", "1.png", "0.png"]
@@ -0,0 +1,64 @@
+import base64
+import io
+
+from PIL import Image
+
+import image_prep
+
+
+def _image_bytes(size, mode="RGB", fmt="PNG", **save_args):
+    buffered = io.BytesIO()
+    Image.new(mode, size).save(buffered, format=fmt, **save_args)
+    return buffered.getvalue()
+
+
+def test_accepted_upload_within_limit_is_passed_through():
+    data = _image_bytes((100, 80))
+
+    prepared = image_prep.UploadPreparer().prepare(data, max_side=200)
+
+    assert prepared.data is data
+    assert prepared.mime_type == "image/png"
+    assert prepared.to_data_uri() == "data:image/png;base64," + base64.b64encode(data).decode()
+    assert prepared.to_gemini_blob() == {"mime_type": "image/png", "data": data}
+
+
+def test_oversized_or_unsupported_upload_is_transcoded():
+    preparer = image_prep.UploadPreparer()
+
+    large = preparer.prepare(_image_bytes((400, 200)), max_side=100)
+    bmp = preparer.prepare(_image_bytes((50, 50), fmt="BMP"))
+    transparent = preparer.prepare(_image_bytes((50, 50), mode="RGBA", fmt="TIFF"))
+
+    assert large.mime_type == "image/jpeg"
+    assert Image.open(io.BytesIO(large.data)).size == (100, 50)
+    assert bmp.mime_type == "image/jpeg"
+    # 투명도는 PNG로 유지
+    assert transparent.mime_type == "image/png"
+
+
+def test_rotated_jpeg_is_transposed():
+    exif = Image.Exif()
+    exif[0x0112] = 6
+
+    prepared = image_prep.UploadPreparer().prepare(_image_bytes((200, 100), fmt="JPEG", exif=exif))
+
+    assert Image.open(io.BytesIO(prepared.data)).size == (100, 200)
+
+
+def test_prepared_uploads_are_reused_and_bounded(monkeypatch):
+    calls = []
+    real_prepare = image_prep._prepare
+    monkeypatch.setattr(image_prep, "_prepare", lambda data, max_side: calls.append(max_side) or real_prepare(data, max_side))
+    images = [_image_bytes((60 + idx, 60)) for idx in range(3)]
+    preparer = image_prep.UploadPreparer(max_bytes=max(len(data) for data in images) * 2)
+
+    for data in images:
+        preparer.prepare(data)
+    assert preparer.prepare(images[2]) is preparer.prepare(images[2])
+    assert preparer._total_bytes <= preparer.max_bytes
+    assert len(preparer._entries) == 2
+
+    # 크기 제한이 다르면 따로 준비
+    preparer.prepare(images[2], max_side=30)
+    assert calls == [None, None, None, 30]
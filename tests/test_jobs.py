@@ -0,0 +1,69 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import jobs
+from artifacts import ArtifactStore
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _wait_finished(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] not in jobs.ACTIVE_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("작업이 끝나지 않았습니다")
+
+
+def test_fail_interrupted_only_touches_jobs_of_dead_local_workers(tmp_path):
+    store = jobs.JobStore(os.path.join(tmp_path, "jobs.db"))
+    workers = {
+        "dead": f"{socket.gethostname()}:{_dead_pid()}",
+        "alive": jobs.WORKER_ID,
+        "remote": "other-host:1",
+        "unknown": None,
+    }
+    for job_id, worker in workers.items():
+        store.create(job_id, "me", "generate", {}, [])
+        store.update(job_id, worker=worker)
+    store.update("alive", status=jobs.JOB_RUNNING)
+
+    store.fail_interrupted()
+
+    statuses = {job_id: store.get(job_id)["status"] for job_id in workers}
+    assert statuses == {"dead": jobs.JOB_ERROR, "alive": jobs.JOB_RUNNING, "remote": jobs.JOB_QUEUED, "unknown": jobs.JOB_ERROR}
+    assert "재시작" in store.get("dead")["error"]
+
+
+def test_queue_records_outputs_and_errors(tmp_path):
+    queue = jobs.JobQueue(jobs.JobStore(os.path.join(tmp_path, "jobs.db")), ArtifactStore(os.path.join(tmp_path, "artifacts")),
+                          max_workers=2)
+
+    def echo(ctx, api_key, params):
+        for data in ctx.inputs:
+            ctx.add_output(data[::-1])
+        ctx.set_result({"count": len(ctx.inputs)})
+
+    def broken(ctx, api_key, params):
+        raise RuntimeError("boom")
+
+    queue.register("echo", echo)
+    queue.register("broken", broken)
+
+    done = _wait_finished(queue, queue.submit("me", "echo", {"provider": "google"}, "key", inputs=[b"ab", b"cd"]))
+    failed = _wait_finished(queue, queue.submit("me", "broken", {}, "key"))
+
+    assert done["status"] == jobs.JOB_DONE
+    assert done["result"] == {"count": 2}
+    assert queue.read_outputs(done) == [b"ba", b"dc"]
+    assert (failed["status"], failed["error"]) == (jobs.JOB_ERROR, "boom")
+    assert [job["id"] for job in queue.list_jobs("me")] == [failed["id"], done["id"]]
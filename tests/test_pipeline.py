@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+import generation
+import pipeline
+import prompts
+from artifacts import ArtifactStore
+from result_cache import ResultCache
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def stores(tmp_path):
+    return ArtifactStore(os.path.join(tmp_path, "artifacts")), ResultCache(os.path.join(tmp_path, "results"))
+
+
+@pytest.fixture
+def edit_calls(monkeypatch):
+    calls = []
+
+    def fake_edit(provider, api_key, mode, main_bytes, sample_bytes):
+        calls.append(prompts.EDIT_PROMPTS[mode])
+        return [PNG_HEADER + b"edited" + bytes([len(calls)])]
+
+    monkeypatch.setattr(generation, "edit_images", fake_edit)
+    return calls
+
+
+@pytest.mark.parametrize("steps, provider, message", [
+    ([], "google", "단계가 없습니다"),
+    ([{"kind": "edit", "mode": "outfit"}, {"kind": "generate"}], "google", "첫 단계에만"),
+    ([{"kind": "edit", "mode": "unknown"}], "google", "편집 유형"),
+    ([{"kind": "upscale", "backend": "replicate"}], "google", "Replicate 키에서만"),
+])
+def test_validate_steps_rejects_invalid_recipes(steps, provider, message):
+    with pytest.raises(ValueError, match=message):
+        pipeline.validate_steps(steps, provider)
+
+
+def test_edit_step_is_served_from_cache_on_rerun(stores, edit_calls):
+    artifact_store, cache = stores
+    main_id = artifact_store.put(PNG_HEADER + b"main")
+    step = {"kind": "edit", "mode": "background"}
+
+    first_ids, first_cached = pipeline.run_step(step, "google", "key", artifact_store, [main_id], cache=cache)
+    second_ids, second_cached = pipeline.run_step(step, "google", "key", artifact_store, [main_id], cache=cache)
+
+    assert (first_cached, second_cached) == (False, True)
+    assert first_ids == second_ids
+    assert len(edit_calls) == 1
+
+
+def test_edit_prompt_change_invalidates_step_cache(stores, edit_calls, monkeypatch):
+    artifact_store, cache = stores
+    main_id = artifact_store.put(PNG_HEADER + b"main")
+    step = {"kind": "edit", "mode": "background"}
+    pipeline.run_step(step, "google", "key", artifact_store, [main_id], cache=cache)
+
+    monkeypatch.setitem(prompts.EDIT_PROMPTS, "background", prompts.EDIT_PROMPTS["background"] + " Keep the studio lighting.")
+    _, from_cache = pipeline.run_step(step, "google", "key", artifact_store, [main_id], cache=cache)
+
+    assert not from_cache
+    assert len(edit_calls) == 2
+    assert edit_calls[0] != edit_calls[1]
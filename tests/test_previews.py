@@ -0,0 +1,55 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from artifacts import ArtifactStore
+from previews import PreviewCache
+
+
+def _image_bytes(size, mode="RGB", fmt="PNG", exif=None):
+    buffered = io.BytesIO()
+    image = Image.new(mode, size)
+    if exif is not None:
+        image.save(buffered, format=fmt, exif=exif)
+    else:
+        image.save(buffered, format=fmt)
+    return buffered.getvalue()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PreviewCache(os.path.join(tmp_path, "previews"), max_side=64, quality=70)
+
+
+def test_preview_is_downscaled_webp(cache):
+    preview = Image.open(io.BytesIO(cache.preview(_image_bytes((400, 200)))))
+
+    assert preview.format == "WEBP"
+    assert preview.size == (64, 32)
+
+
+def test_preview_applies_exif_orientation_and_converts_palette(cache):
+    exif = Image.Exif()
+    # 6 = 90도 회전해서 표시
+    exif[0x0112] = 6
+    rotated = Image.open(io.BytesIO(cache.preview(_image_bytes((400, 200), fmt="JPEG", exif=exif))))
+    palette = Image.open(io.BytesIO(cache.preview(_image_bytes((100, 100), mode="P"))))
+
+    assert rotated.size == (32, 64)
+    assert palette.mode in ("RGB", "RGBA")
+
+
+def test_preview_artifact_reuses_cached_file_without_reading_original(cache, tmp_path, monkeypatch):
+    store = ArtifactStore(os.path.join(tmp_path, "artifacts"))
+    artifact_id = store.put(_image_bytes((300, 300)))
+    first = cache.preview_artifact(store, artifact_id)
+
+    def fail_read(artifact_id):
+        raise AssertionError("원본을 다시 읽음")
+
+    monkeypatch.setattr(store, "read", fail_read)
+    assert cache.preview_artifact(store, artifact_id) == first
+    # 같은 내용의 bytes로 요청해도 같은 미리보기 파일을 씀
+    assert cache.preview(_image_bytes((300, 300))) == first
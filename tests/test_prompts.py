@@ -0,0 +1,47 @@
+import string
+
+import prompts
+from prompts import OPTION_KEYS, OPTION_SCHEMA, OPTIONS
+
+
+def _sample_options(offset):
+    options = {}
+    for spec in OPTION_SCHEMA:
+        choices = spec.choices_for(options)
+        options[spec.key] = choices[offset % len(choices)]
+    return options
+
+
+def test_template_fields_and_translations_cover_the_schema():
+    fields = {field for _, field, _, _ in string.Formatter().parse(prompts.GENERATION_TEMPLATE) if field}
+
+    assert fields == set(OPTION_KEYS)
+    for spec in OPTION_SCHEMA:
+        if spec.english:
+            assert set(spec.english) >= set(spec.all_choices()), spec.key
+
+
+def test_generation_prompt_matches_plain_template_formatting():
+    for offset in range(3):
+        options = _sample_options(offset)
+        expected = prompts.GENERATION_TEMPLATE.format(**{key: OPTIONS[key].prompt_value(options[key]) for key in OPTION_KEYS})
+
+        assert prompts.build_generation_prompt(options) == expected
+
+
+def test_option_key_round_trips():
+    for offset in range(3):
+        options = _sample_options(offset)
+        key = prompts.option_key(options)
+
+        assert len(key.split(".")) == len(OPTION_KEYS)
+        assert prompts.options_from_key(key) == options
+    assert prompts.option_key(_sample_options(0)) != prompts.option_key(_sample_options(1))
+
+
+def test_default_options_respect_dependent_choices():
+    options = prompts.default_options()
+
+    assert list(options) == OPTION_KEYS
+    for spec in OPTION_SCHEMA:
+        assert options[spec.key] in spec.choices_for(options)
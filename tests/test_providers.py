@@ -0,0 +1,64 @@
+import threading
+
+import providers
+
+
+class FakeClient:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+
+def _close(client):
+    client.closed = True
+
+
+def test_evicted_clients_are_closed():
+    pool = providers.ClientPool(max_clients=2)
+    first = pool._get_or_create(("a",), lambda: FakeClient("a"), close=_close)
+    pool._get_or_create(("b",), lambda: FakeClient("b"), close=_close)
+    # a를 다시 써서 b가 가장 오래된 항목이 됨
+    assert pool._get_or_create(("a",), lambda: FakeClient("a2"), close=_close) is first
+    second = pool._clients[("b",)][0]
+
+    pool._get_or_create(("c",), lambda: FakeClient("c"), close=_close)
+
+    assert second.closed
+    assert not first.closed
+    assert list(pool._clients) == [("a",), ("c",)]
+
+
+def test_concurrent_creation_keeps_one_client_and_closes_the_rest():
+    pool = providers.ClientPool()
+    barrier = threading.Barrier(4)
+    created = []
+
+    def factory():
+        client = FakeClient(len(created))
+        created.append(client)
+        # 모든 스레드가 잠금 밖에서 동시에 만들도록 맞춤
+        barrier.wait(timeout=5)
+        return client
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool._get_or_create(("k",), factory, close=_close)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 4
+    assert len({id(client) for client in results}) == 1
+    assert [client.closed for client in created].count(False) == 1
+    assert not results[0].closed
+
+
+def test_close_errors_do_not_break_lookup():
+    def failing_close(client):
+        raise RuntimeError("already closed")
+
+    pool = providers.ClientPool(max_clients=1)
+    pool._get_or_create(("a",), lambda: FakeClient("a"), close=failing_close)
+
+    assert pool._get_or_create(("b",), lambda: FakeClient("b"), close=failing_close).name == "b"
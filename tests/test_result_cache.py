@@ -0,0 +1,40 @@
+import os
+
+from result_cache import ResultCache, guess_image_ext, make_cache_key
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def test_cache_key_ignores_whitespace_but_not_params():
+    key = make_cache_key("google", "model", "short  hair,\n  wavy", {"num_outputs": 2})
+
+    assert key == make_cache_key("google", "model", "short hair, wavy", {"num_outputs": 2})
+    assert key != make_cache_key("google", "model", "short hair, wavy", {"num_outputs": 1})
+    assert key != make_cache_key("replicate", "model", "short hair, wavy", {"num_outputs": 2})
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    images = [PNG_HEADER + b"a", b"\xff\xd8\xff" + b"b"]
+    cache.put("ab" + "0" * 62, images, {"provider": "google"})
+
+    assert cache.get("ab" + "0" * 62) == images
+    assert cache.get("cd" + "0" * 62) is None
+    assert [guess_image_ext(data) for data in images] == ["png", "jpg"]
+
+
+def test_evicts_least_recently_used_entries_over_limit(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    keys = [f"{idx:02d}" + "0" * 62 for idx in range(3)]
+    for idx, key in enumerate(keys):
+        cache.put(key, [PNG_HEADER + bytes(1000)])
+        # meta.json의 mtime이 마지막 사용 시각
+        os.utime(os.path.join(cache._entry_dir(key), "meta.json"), (1000 + idx, 1000 + idx))
+    cache.get(keys[0])
+
+    cache.max_bytes = 2500
+    cache.put("99" + "0" * 62, [PNG_HEADER + bytes(10)])
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+import generation
+import routing
+from ratelimit import RateLimitTimeout
+from routing import CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(routing, "_default_breakers", {})
+    monkeypatch.setattr(routing, "hedge_delay", lambda provider: 0.05)
+
+
+def fake_generate(behaviors):
+    # 제공자 → fn(on_image) 로 가짜 generate_images
+    def generate_images(provider, api_key, prompt, num_outputs=1, resolution=None, cache=None, force=False, on_image=None):
+        return behaviors[provider](on_image or (lambda image_data: None)), False
+    return generate_images
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.available() and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    # 시험 호출은 하나만
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED and breaker.failures == 0
+
+
+def test_half_open_failure_reopens_and_release_returns_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.allow()
+
+
+def test_route_order_does_not_take_the_probe_of_an_unused_secondary(monkeypatch):
+    routing._default_breakers["replicate"] = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    routing.get_circuit_breaker("replicate").record_failure()
+    monkeypatch.setattr(generation, "generate_images", fake_generate({"google": lambda on_image: [b"G1"]}))
+
+    for _ in range(3):
+        assert routing.route_order(["google", "replicate"]) == ["google", "replicate"]
+        provider, images, _, hedged = routing.generate_routed({"google": "g", "replicate": "r"}, "prompt")
+        assert (provider, images, hedged) == ("google", [b"G1"], False)
+    assert routing.route_order(["replicate", "google"]) == ["replicate", "google"]
+
+
+def test_failover_when_primary_fails(monkeypatch):
+    calls = []
+
+    def failing(on_image):
+        calls.append("google")
+        raise TimeoutError("느림")
+
+    def working(on_image):
+        calls.append("replicate")
+        return [b"R1"]
+
+    monkeypatch.setattr(generation, "generate_images", fake_generate({"google": failing, "replicate": working}))
+    provider, images, _, _ = routing.generate_routed({"google": "g", "replicate": "r"}, "prompt")
+    assert (provider, images) == ("replicate", [b"R1"])
+    assert calls == ["google", "replicate"]
+    assert routing.get_circuit_breaker("google").failures == 1
+
+
+def test_failed_streaming_provider_is_discarded_before_winner_streams(monkeypatch):
+    replicate_streamed = threading.Event()
+
+    def replicate(on_image):
+        on_image(b"R1")
+        replicate_streamed.set()
+        time.sleep(0.2)
+        raise TimeoutError("느림")
+
+    def google(on_image):
+        replicate_streamed.wait()
+        on_image(b"G1")
+        on_image(b"G2")
+        return [b"G1", b"G2"]
+
+    monkeypatch.setattr(generation, "generate_images", fake_generate({"replicate": replicate, "google": google}))
+    streamed = []
+    discarded = []
+
+    def on_discard():
+        discarded.append(list(streamed))
+        streamed.clear()
+
+    provider, images, _, hedged = routing.generate_routed(
+        {"replicate": "r", "google": "g"}, "prompt", num_outputs=2, on_image=streamed.append, on_discard=on_discard
+    )
+    assert provider == "google" and images == [b"G1", b"G2"] and hedged
+    assert discarded == [[b"R1"]]
+    # Gemini 이미지는 Replicate가 넘기는 동안 막혔으므로 호출한 쪽이 결과 목록에서 이어서 추가
+    assert b"R1" not in streamed and all(image_data in images for image_data in streamed)
+
+
+def test_local_rate_limit_timeout_is_not_a_provider_failure():
+    assert not routing.is_provider_failure(RateLimitTimeout("대기 초과"))
+    assert routing.is_provider_failure(TimeoutError("응답 없음"))
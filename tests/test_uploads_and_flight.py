@@ -0,0 +1,58 @@
+import threading
+import time
+
+from session_artifacts import SessionArtifactManager
+from singleflight import SingleFlight
+
+
+def test_shared_upload_handle_survives_until_last_slot_discards(tmp_path):
+    manager = SessionArtifactManager(spill_dir=str(tmp_path), session_budget=1024, global_budget=4096)
+    main = manager.put("session", b"same image")
+    sample = manager.put("session", b"same image")
+    assert main == sample
+
+    manager.discard("session", main)
+    assert manager.read("session", sample) == b"same image"
+    manager.discard("session", sample)
+    assert not manager.contains("session", sample)
+    assert manager.stats()["memory_bytes"] == 0
+
+
+def test_spilled_upload_is_still_readable(tmp_path):
+    manager = SessionArtifactManager(spill_dir=str(tmp_path), session_budget=10, global_budget=100)
+    first = manager.put("session", b"a" * 8)
+    manager.put("session", b"b" * 8)
+    assert manager.stats()["spilled_bytes"] == 8
+    assert manager.read("session", first) == b"a" * 8
+
+
+def test_single_flight_shares_success_but_not_other_keys_failures():
+    flight = SingleFlight()
+    results = {}
+
+    def call(name, scope):
+        def fn():
+            time.sleep(0.1)
+            if scope == "bad":
+                raise PermissionError("잘못된 키")
+            return f"image-{scope}"
+        try:
+            results[name] = flight.do("same-prompt", fn, scope=scope)
+        except PermissionError as exc:
+            results[name] = exc
+
+    leader = threading.Thread(target=call, args=("leader", "bad"))
+    leader.start()
+    time.sleep(0.02)
+    followers = [threading.Thread(target=call, args=(name, scope)) for name, scope in
+                 [("same_key", "bad"), ("good_1", "good"), ("good_2", "good")]]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert isinstance(results["leader"], PermissionError)
+    assert isinstance(results["same_key"], PermissionError)
+    assert {results["good_1"][0], results["good_2"][0]} == {"image-good"}
+    # 다른 키는 한 번만 다시 호출하고 나머지는 그 결과를 공유
+    assert sorted(shared for _, shared in (results["good_1"], results["good_2"])) == [False, True]
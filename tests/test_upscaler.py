@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import settings
+import upscaler
+
+
+def _image_bytes(mode, size=(70, 50)):
+    rng = np.random.default_rng(0)
+    height, width = size[1], size[0]
+    # 완만한 그라디언트 + 약간의 노이즈 (타일 경계가 보이면 차이가 커짐)
+    base = np.add.outer(np.linspace(0, 200, height), np.linspace(0, 50, width))
+    channels = {"L": 1, "RGB": 3, "RGBA": 4}[mode]
+    array = np.clip(base[..., None] + rng.normal(0, 8, (height, width, channels)), 0, 255).astype(np.uint8)
+    buffered = io.BytesIO()
+    Image.fromarray(array[..., 0] if channels == 1 else array, mode).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def _decode(data):
+    return np.asarray(Image.open(io.BytesIO(data))).astype(np.int16)
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L"])
+def test_tiled_output_matches_single_tile(mode):
+    data = _image_bytes(mode)
+
+    whole = upscaler.upscale_image_local(data, 2, tile_size=1024, workers=1)
+    tiled = upscaler.upscale_image_local(data, 2, tile_size=16, workers=1)
+
+    image = Image.open(io.BytesIO(tiled))
+    assert (image.size, image.mode) == ((140, 100), mode)
+    # 섞는 구간의 반올림 차이만 허용
+    assert np.abs(_decode(whole) - _decode(tiled)).max() <= 2
+
+
+def test_process_pool_matches_serial_tiles():
+    data = _image_bytes("RGB")
+
+    assert upscaler.upscale_image_local(data, 2, tile_size=16, workers=2) == \
+        upscaler.upscale_image_local(data, 2, tile_size=16, workers=1)
+
+
+def test_rejects_outputs_over_the_size_limit(monkeypatch):
+    monkeypatch.setattr(settings, "UPSCALE_MAX_OUTPUT_SIDE", 100)
+
+    with pytest.raises(ValueError, match="최대 100px"):
+        upscaler.upscale_image_local(_image_bytes("RGB"), 2)
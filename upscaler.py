@@ -0,0 +1,165 @@
+# 로컬 CPU 업스케일 (네트워크 호출 없음, 원본 내용 그대로 확대)
+# - Lanczos 리샘플링 + 언샤프 마스크(NumPy 벡터 연산)로 선명도 보정
+# - 입력을 타일로 나눠 처리: 타일마다 주변 여백을 함께 계산하고, 이웃 타일과 겹치는 부분은 선형 가중치로 섞어 경계가 보이지 않게 함
+# - 타일은 프로세스 풀에서 병렬 처리하고 동시에 메모리에 올라오는 타일 수를 제한 (출력 이미지 외의 최대 메모리가 타일 크기에 비례)
+import io
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+import settings
+from metrics import span
+
+# 입력 기준 타일 주변 여백 (Lanczos 커널 반경 + 언샤프 마스크 반경보다 커야 함)
+TILE_HALO = 8
+# 여백 중 이웃 타일과 섞는 폭 (나머지는 커널 계산용 문맥)
+TILE_BLEND = 4
+
+
+def _gaussian_kernel(sigma):
+    radius = max(1, int(round(sigma * 3)))
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-(x * x) / (2 * sigma * sigma))
+    return kernel / kernel.sum()
+
+
+# 분리 가능한 가우시안 블러: 축마다 이동한 슬라이스(뷰)의 가중합 (가장자리는 복제 패딩)
+def _blur(array, sigma):
+    kernel = _gaussian_kernel(sigma)
+    radius = len(kernel) // 2
+    height, width = array.shape[:2]
+
+    padded = np.pad(array, ((radius, radius), (0, 0), (0, 0)), mode="edge")
+    blurred = kernel[0] * padded[:height]
+    for offset in range(1, len(kernel)):
+        blurred += kernel[offset] * padded[offset:offset + height]
+
+    padded = np.pad(blurred, ((0, 0), (radius, radius), (0, 0)), mode="edge")
+    blurred = kernel[0] * padded[:, :width]
+    for offset in range(1, len(kernel)):
+        blurred += kernel[offset] * padded[:, offset:offset + width]
+    return blurred
+
+
+def _unsharp(array, sigma, amount, threshold):
+    channels = array[..., :3]
+    detail = channels - _blur(channels, sigma)
+    # 평탄한 영역의 노이즈는 키우지 않음
+    detail[np.abs(detail) < threshold] = 0
+    array[..., :3] = channels + amount * detail
+    return array
+
+
+# 프로세스 풀에서 실행: 여백 포함 입력 타일 → 확대 + 선명화된 출력 타일 (uint8)
+def _process_tile(tile, factor, sigma, amount, threshold):
+    height, width = tile.shape[:2]
+    resized = Image.fromarray(tile).resize((width * factor, height * factor), Image.LANCZOS)
+    array = np.asarray(resized, dtype=np.float32)
+    if array.ndim == 2:
+        array = array[..., None]
+    array = _unsharp(array.copy(), sigma, amount, threshold)
+    return np.clip(array + 0.5, 0, 255).astype(np.uint8)
+
+
+def _tile_spans(length, tile_size):
+    return [(start, min(start + tile_size, length)) for start in range(0, length, tile_size)]
+
+
+def _ramp(length, overlap, has_before):
+    weights = np.ones(length, dtype=np.float32)
+    if has_before and overlap > 0:
+        overlap = min(overlap, length)
+        weights[:overlap] = (np.arange(overlap, dtype=np.float32) + 0.5) / overlap
+    return weights
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# 프로세스 풀은 한 번만 만들어 재사용 (spawn: 스레드가 많은 서버 프로세스에서 fork하지 않음)
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.UPSCALE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def upscale_image_local(image_bytes, factor, tile_size=settings.UPSCALE_TILE_SIZE, workers=settings.UPSCALE_WORKERS,
+                        sharpen_amount=settings.UPSCALE_SHARPEN_AMOUNT):
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes)))
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    width, height = image.size
+    out_width, out_height = width * factor, height * factor
+    if max(out_width, out_height) > settings.UPSCALE_MAX_OUTPUT_SIDE:
+        raise ValueError(
+            f"결과 크기 {out_width}x{out_height}가 최대 {settings.UPSCALE_MAX_OUTPUT_SIDE}px을 넘습니다. 배율을 낮춰주세요."
+        )
+
+    source = np.asarray(image)
+    channels = 1 if source.ndim == 2 else source.shape[2]
+    output = np.empty((out_height, out_width, channels), dtype=np.uint8)
+    sigma = 0.5 * factor
+    threshold = 2.0
+
+    tiles = []
+    for row, (y0, y1) in enumerate(_tile_spans(height, tile_size)):
+        for col, (x0, x1) in enumerate(_tile_spans(width, tile_size)):
+            tiles.append((row, col, y0, y1, x0, x1))
+
+    def tile_input(y0, y1, x0, x1):
+        return source[max(y0 - TILE_HALO, 0):min(y1 + TILE_HALO, height), max(x0 - TILE_HALO, 0):min(x1 + TILE_HALO, width)]
+
+    def write_tile(spec, result):
+        row, col, y0, y1, x0, x1 = spec
+        # 출력에 쓸 영역: 코어 + 양쪽 섞는 폭 (이미지 가장자리에서는 잘림)
+        by0, by1 = max(y0 - TILE_BLEND, 0), min(y1 + TILE_BLEND, height)
+        bx0, bx1 = max(x0 - TILE_BLEND, 0), min(x1 + TILE_BLEND, width)
+        cy0, cx0 = max(y0 - TILE_HALO, 0), max(x0 - TILE_HALO, 0)
+        tile = result[(by0 - cy0) * factor:(by1 - cy0) * factor, (bx0 - cx0) * factor:(bx1 - cx0) * factor]
+
+        # 위/왼쪽 이웃과 겹치는 부분만 섞음 (타일은 행 우선 순서로 기록됨)
+        overlap = 2 * TILE_BLEND * factor
+        weight = (_ramp(tile.shape[0], overlap, row > 0)[:, None] * _ramp(tile.shape[1], overlap, col > 0)[None, :])[..., None]
+        target = output[by0 * factor:by1 * factor, bx0 * factor:bx1 * factor]
+        if row == 0 and col == 0:
+            target[...] = tile
+        else:
+            target[...] = np.clip(target * (1 - weight) + tile * weight + 0.5, 0, 255).astype(np.uint8)
+
+    args = (factor, sigma, sharpen_amount, threshold)
+    model = f"lanczos-unsharp-{factor}x"
+    with span("upscale_tiles", provider="local", model=model, nbytes=output.nbytes):
+        if workers <= 1 or len(tiles) == 1:
+            for spec in tiles:
+                write_tile(spec, _process_tile(tile_input(*spec[2:]), *args))
+        else:
+            # 진행 중인 타일 수를 제한해서 결과가 한꺼번에 메모리에 쌓이지 않게 함
+            pool = _get_pool()
+            pending = deque()
+            for spec in tiles:
+                pending.append((spec, pool.submit(_process_tile, tile_input(*spec[2:]), *args)))
+                if len(pending) >= workers * 2:
+                    spec_done, future = pending.popleft()
+                    write_tile(spec_done, future.result())
+            while pending:
+                spec_done, future = pending.popleft()
+                write_tile(spec_done, future.result())
+
+    with span("encode_png", provider="local", model=model) as current:
+        result_image = Image.fromarray(output[..., 0] if channels == 1 else output)
+        buffered = io.BytesIO()
+        # 큰 결과는 압축 수준을 낮춰 인코딩 시간을 줄임 (무손실은 유지)
+        result_image.save(buffered, format="PNG", compress_level=1)
+        current.bytes = buffered.tell()
+    return buffered.getvalue()